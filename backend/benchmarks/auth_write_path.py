@@ -0,0 +1,98 @@
+# Benchmark for the authenticated write path.
+# Posts tweets through the API (in-process, via TestClient) as a handful of logged-in
+# accounts, with the principal cache on and off, and reports tweets/sec and SQL
+# statements per request, plus the time spent resolving the caller alone (token
+# decode + account lookup, as get_current_user does per request).
+# In-process SQLite answers in microseconds, so a simulated network round trip
+# (--rtt-ms, added to every statement) stands in for a database across the network.
+#
+# Run with: python -m backend.benchmarks.auth_write_path
+import os
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchsecret")
+
+import time
+import argparse
+from itertools import cycle
+
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import principals
+from backend.auth import create_access_token
+from backend.database import Base
+from backend.main import app
+from backend.models import Account
+from backend.routes import tweet_routes, account_routes
+
+
+def run(client, engine, headers, count: int):
+    statements = [0]
+
+    def count_statement(*args):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    start = time.perf_counter()
+    try:
+        for _, auth in zip(range(count), cycle(headers)):
+            client.post("/api/tweets", json={"content": "benchmark tweet", "hashtags": ["bench"]}, headers=auth).raise_for_status()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+    return count / (time.perf_counter() - start), statements[0] / count
+
+
+def resolve(Session, tokens, count: int):
+    # Microseconds per get_current_user call
+    start = time.perf_counter()
+    for _, token in zip(range(count), cycle(tokens)):
+        account_routes.get_current_user(account_routes.token_subject(token), Session)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tweets", type=int, default=1000)
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Account), [
+            {"username": f"user{i}", "handle": f"user{i}", "email": f"user{i}@example.com", "password": "x"}
+            for i in range(args.accounts)
+        ])
+    if args.rtt_ms:
+        event.listen(engine, "before_cursor_execute", lambda *a: time.sleep(args.rtt_ms / 1000))
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_bench_db(request: Request):
+        request.app.state.db_accesses += 1
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    for dependency in (tweet_routes.get_db, tweet_routes.get_read_db, account_routes.get_db, account_routes.get_read_db):
+        app.dependency_overrides[dependency] = get_bench_db
+    tokens = [create_access_token({"sub": f"user{i}"}) for i in range(args.accounts)]
+    headers = [{"Authorization": f"Bearer {token}"} for token in tokens]
+
+    print(f"{args.tweets} tweets from {args.accounts} accounts, {args.rtt_ms} ms per statement")
+    with TestClient(app) as client:
+        for name, ttl in (("uncached", 0), ("cached", principals.PRINCIPAL_TTL)):
+            principals.PRINCIPAL_TTL = ttl
+            principals.principal_cache.clear()
+            rate, statements = run(client, engine, headers, args.tweets)
+            auth_us = resolve(Session, tokens, args.tweets)
+            print(f"{name:<9} {rate:>8.0f} tweets/s   {statements:>5.1f} statements/request   {auth_us:>8.1f} us/auth")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Microbenchmark for the cache engine.
+# Shows that get/set cost stays flat as the number of keys grows, compared with
+# the old dict cache that scanned every entry on each call.
+#
+# Run with: python -m backend.benchmarks.cache_engine
+import random
+import time
+import argparse
+
+from backend.cachingsystem.engine import Cache
+
+
+class LegacyCache:
+    # The previous implementation, kept here only for comparison
+    def __init__(self, expiration_time: int = 60):
+        self.cache = {}
+        self.expiration_time = expiration_time
+
+    def _invalidate(self):
+        current_time = time.time()
+        keys_to_delete = [key for key, value in self.cache.items() if current_time - value['timestamp'] > self.expiration_time]
+        for key in keys_to_delete:
+            del self.cache[key]
+
+    def get(self, key: str):
+        self._invalidate()
+        if key in self.cache:
+            return self.cache[key]['value']
+        return None
+
+    def set(self, key: str, value):
+        self._invalidate()
+        self.cache[key] = {'value': value, 'timestamp': time.time()}
+
+
+def fill(cache, size):
+    if isinstance(cache, LegacyCache):
+        # Filling through set() would itself be O(n^2)
+        now = time.time()
+        cache.cache = {f"key{i}": {"value": i, "timestamp": now} for i in range(size)}
+        return
+    for i in range(size):
+        cache.set(f"key{i}", i)
+
+
+def time_ops(cache, size, ops):
+    keys = [f"key{random.randrange(size)}" for _ in range(ops)]
+    start = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    get_ns = (time.perf_counter() - start) / ops * 1e9
+
+    start = time.perf_counter()
+    for key in keys:
+        cache.set(key, 1)
+    set_ns = (time.perf_counter() - start) / ops * 1e9
+    return get_ns, set_ns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--ops", type=int, default=100_000)
+    parser.add_argument("--legacy-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'engine':<8} {'keys':>10} {'get ns/op':>12} {'set ns/op':>12}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        cache = Cache(expiration_time=3600, max_entries=size)
+        fill(cache, size)
+        get_ns, set_ns = time_ops(cache, size, args.ops)
+        print(f"{'lru+ttl':<8} {size:>10} {get_ns:>12.0f} {set_ns:>12.0f}")
+
+        if size <= args.legacy_max:
+            legacy = LegacyCache(expiration_time=3600)
+            fill(legacy, size)
+            # The legacy cache is O(n) per call, so use far fewer operations
+            get_ns, set_ns = time_ops(legacy, size, max(args.ops // size, 10))
+            print(f"{'legacy':<8} {size:>10} {get_ns:>12.0f} {set_ns:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
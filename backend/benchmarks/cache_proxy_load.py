@@ -0,0 +1,113 @@
+# Load test for the cache proxy against a local stub upstream.
+# Compares the old blocking `requests` passthrough with the pooled async client.
+# Every request goes to an uncached path, so each one is an upstream miss.
+# A final burst on one cold cached key shows the single-flight counters.
+#
+# Run with: python -m backend.benchmarks.cache_proxy_load
+import time
+import asyncio
+import argparse
+import statistics
+from multiprocessing import Process
+
+import httpx
+import requests
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from backend.cachingsystem import cache as cache_module
+from backend.cachingsystem.upstream import UpstreamClient
+
+stub = FastAPI()
+STUB_LATENCY = 0.02
+
+@stub.api_route("/api/{path:path}", methods=["GET", "POST"])
+async def stub_api(path: str):
+    # Simulates the API tier doing some I/O
+    await asyncio.sleep(STUB_LATENCY)
+    return {"path": path}
+
+
+def run_stub(port: int):
+    uvicorn.run(stub, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_stub(port: int):
+    # Separate process so the stub does not share the event loop or GIL with the proxy
+    process = Process(target=run_stub, args=(port,), daemon=True)
+    process.start()
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/ready", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError("Stub upstream did not start")
+
+
+def legacy_app(upstream_url: str):
+    # The previous passthrough: blocking requests call inside an async handler
+    app = FastAPI()
+
+    @app.api_route("/api/{path:path}", methods=["GET", "POST"])
+    async def proxy_api(path: str, request: Request):
+        resp = requests.request(request.method, f"{upstream_url}/api/{path}", timeout=5)
+        return Response(content=resp.content, status_code=resp.status_code)
+
+    return app
+
+
+async def drive(app, total: int, concurrency: int, path=None):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://cache", timeout=60) as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                resp = await client.get(path or f"/api/accounts/user{i}")
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return total / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def report(name, result):
+    rps, p50, p99 = result
+    print(f"{name:<8} {rps:>10.0f} req/s   p50 {p50 * 1000:>7.1f} ms   p99 {p99 * 1000:>7.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    upstream_url = f"http://127.0.0.1:{args.port}"
+    stub_process = start_stub(args.port)
+    print(f"{args.requests} misses, {args.concurrency} concurrent, stub latency {STUB_LATENCY * 1000:.0f} ms")
+
+    report("before", await drive(legacy_app(upstream_url), args.requests, args.concurrency))
+
+    cache_module.upstream = UpstreamClient(upstream_url, pool_size=args.pool_size, keepalive=args.pool_size)
+    try:
+        report("after", await drive(cache_module.app, args.requests, args.concurrency))
+
+        # Thundering herd on one cold key: single-flight should turn it into one upstream call
+        cache_module.cache.clear()
+        cache_module.stats.clear()
+        report("herd", await drive(cache_module.app, args.concurrency, args.concurrency, path="/api/tweets"))
+        print(f"herd stats: {dict(cache_module.stats)}")
+    finally:
+        await cache_module.upstream.aclose()
+        stub_process.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
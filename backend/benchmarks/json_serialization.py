@@ -0,0 +1,118 @@
+# Benchmark for the list endpoints' JSON serialization, at 10k-row responses.
+# Compares the regular path (ORM objects with eager loading, then Pydantic/TweetRead
+# or to_dict() + json.dumps) with the fast path in backend/fastjson.py (Core result
+# tuples + orjson) for:
+# - tweets: 10k TweetRead payloads, as /api/tweets and search build them on a cache miss
+# - accounts: the /api/accounts body with 10k tweets spread over the accounts
+# Both paths produce the same bytes; that is checked before timing.
+#
+# Run with: python -m backend.benchmarks.json_serialization
+import os
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchsecret")
+
+import json
+import time
+import random
+import argparse
+import statistics
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.cachingsystem.etags import json_body
+from backend.tweet_cache import serialize_tweet, compose_list
+from backend.database import Base
+from backend.fastjson import load_tweet_payloads, account_list_body
+from backend.models import Account, Tweet, Hashtag, Media
+from backend.models.association_model import tweet_hashtag_table
+from backend.routes.account_routes import ACCOUNT_TWEETS
+from backend.routes.tweet_routes import TWEET_GRAPH
+
+
+def generate(engine, tweets: int, accounts: int):
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(Account), [
+            {"username": f"user{i}", "handle": f"user{i}", "email": f"user{i}@example.com", "password": "x"}
+            for i in range(accounts)
+        ])
+        conn.execute(insert(Hashtag), [{"tag": f"tag{i}"} for i in range(200)])
+        conn.execute(insert(Tweet), [
+            {"content": f"tweet number {i} with some text", "account_id": rng.randint(1, accounts), "likes": rng.randint(0, 50)}
+            for i in range(tweets)
+        ])
+        conn.execute(insert(tweet_hashtag_table), [
+            {"tweet_id": tweet_id, "hashtag_id": hashtag_id}
+            for tweet_id in range(1, tweets + 1)
+            for hashtag_id in rng.sample(range(1, 201), 2)
+        ])
+        conn.execute(insert(Media), [
+            {"url": f"/media/{i}.jpg", "media_type": "image", "tweet_id": i} for i in range(1, tweets + 1, 3)
+        ])
+
+
+def regular_tweets(db, ids):
+    tweets = {tweet.id: tweet for tweet in db.query(Tweet).options(*TWEET_GRAPH).filter(Tweet.id.in_(ids))}
+    return compose_list([serialize_tweet(tweets[i]) for i in ids])
+
+
+def fast_tweets(db, ids):
+    payloads = load_tweet_payloads(db, ids)
+    return compose_list([payloads[i] for i in ids])
+
+
+def regular_accounts(db):
+    # The body get_all_accounts builds
+    return json_body([
+        {
+            "id": account.id,
+            "username": account.username,
+            "handle": account.handle,
+            "email": account.email,
+            "created_at": account.created_at.isoformat(),
+            "tweets": [tweet.to_dict() for tweet in account.tweets],
+        }
+        for account in db.query(Account).options(*ACCOUNT_TWEETS).all()
+    ])
+
+
+def timed(Session, fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        # A fresh session each time, like a request: nothing left in the identity map
+        with Session() as db:
+            start = time.perf_counter()
+            body = fn(db)
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    generate(engine, args.rows, args.accounts)
+    Session = sessionmaker(bind=engine)
+    ids = list(range(args.rows, 0, -1))
+
+    print(f"{'response':<10} {'rows':>7} {'regular ms':>11} {'fast ms':>9} {'speedup':>8} {'MB':>6}")
+    for name, regular, fast in (
+        ("tweets", lambda db: regular_tweets(db, ids), lambda db: fast_tweets(db, ids)),
+        ("accounts", regular_accounts, account_list_body),
+    ):
+        regular_ms, expected = timed(Session, regular, args.repeat)
+        fast_ms, body = timed(Session, fast, args.repeat)
+        assert body == expected, f"{name}: fast path output differs"
+        json.loads(body)
+        print(f"{name:<10} {args.rows:>7} {regular_ms:>11.1f} {fast_ms:>9.1f} {regular_ms / fast_ms:>7.1f}x {len(body) / 1e6:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Benchmark for streaming NDJSON (backend/streaming.py) against the regular list bodies.
+# For growing result sizes, reports the peak Python memory (tracemalloc) while
+# producing the whole /api/tweets and /api/accounts response, either as one JSON
+# body (fast path, load_tweet_payloads / account_list_body) or as the NDJSON stream,
+# consumed chunk by chunk like a client would.
+#
+# Run with: python -m backend.benchmarks.streaming_memory
+import os
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchsecret")
+
+import time
+import argparse
+import tracemalloc
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.benchmarks.json_serialization import generate
+from backend.tweet_cache import compose_list
+from backend.fastjson import load_tweet_payloads, account_list_body
+from backend.models import Tweet
+from backend.streaming import tweet_lines, tweet_stream, account_lines
+
+
+def list_tweets(Session):
+    with Session() as db:
+        ids = [row.id for row in db.execute(tweet_stream("sqlite"))]
+        payloads = load_tweet_payloads(db, ids)
+        return len(compose_list([payloads[i] for i in ids]))
+
+
+def list_accounts(Session):
+    with Session() as db:
+        return len(account_list_body(db))
+
+
+def consume(chunks):
+    return sum(len(chunk) for chunk in chunks)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6, elapsed * 1000, size / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--accounts", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'response':<10} {'rows':>7} {'mode':<7} {'peak MB':>8} {'ms':>8} {'body MB':>8}")
+    for rows in args.rows:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        generate(engine, rows, args.accounts)
+        Session = sessionmaker(bind=engine)
+        for name, regular, streamed in (
+            ("tweets", lambda: list_tweets(Session), lambda: consume(tweet_lines(Session, tweet_stream("sqlite")))),
+            ("accounts", lambda: list_accounts(Session), lambda: consume(account_lines(Session))),
+        ):
+            for mode, fn in (("list", regular), ("ndjson", streamed)):
+                peak, ms, size = measure(fn)
+                print(f"{name:<10} {rows:>7} {mode:<7} {peak:>8.1f} {ms:>8.0f} {size:>8.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Microbenchmark for the in-process typeahead index.
+# Times top-K prefix lookups for prefixes of different lengths, with and without
+# the per-prefix result cache.
+#
+# Run with: python -m backend.benchmarks.typeahead
+import os
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import time
+import random
+import string
+import argparse
+
+from backend.typeahead import PrefixIndex
+
+
+def generate(size: int):
+    rng = random.Random(42)
+    for i in range(size):
+        tag = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12)))
+        yield i, tag, (tag,), int(rng.paretovariate(1.2))
+
+
+def time_lookups(index, prefixes, k, cached):
+    if cached:
+        # Warm the result cache first so only repeat lookups are timed
+        for prefix in prefixes:
+            index.top(prefix, k)
+    start = time.perf_counter()
+    for prefix in prefixes:
+        if not cached:
+            index._top.clear()
+        index.top(prefix, k)
+    return (time.perf_counter() - start) / len(prefixes) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'entries':>9} {'prefix':>7} {'uncached us':>12} {'cached us':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        index = PrefixIndex()
+        index.load(generate(size))
+        for length in (1, 2, 3, 5):
+            prefixes = ["".join(rng.choices(string.ascii_lowercase, k=length)) for _ in range(args.ops)]
+            uncached = time_lookups(index, prefixes, args.k, cached=False)
+            cached = time_lookups(index, prefixes, args.k, cached=True)
+            print(f"{size:>9} {length:>7} {uncached:>12.1f} {cached:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
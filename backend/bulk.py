@@ -0,0 +1,316 @@
+import io
+import os
+import gzip
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from sqlalchemy import select, insert, delete, tuple_, text, func, DateTime, Integer
+from sqlalchemy.orm import Session
+from backend.cachingsystem.settings import env_int
+from backend.database import Base
+from backend.fastjson import dumps
+from backend.models import BulkImport
+from backend.timeline import rebuild_timelines
+
+# Bulk export/import of the core tables, for moving data between environments and
+# restoring snapshots (CLI: backend/scripts/bulk_data.py, admin: routes/admin_routes.py).
+#
+# A snapshot is a directory with one folder of gzip-compressed NDJSON chunks per table
+# (BULK_CHUNK_ROWS rows each, one JSON object per row) and a manifest.json listing
+# them. Export walks each table in primary key order within one transaction, so
+# the tables agree with each other. The manifest is rewritten after every chunk, so
+# a rerun of an interrupted export continues after the last finished chunk.
+#
+# Import loads the tables parent first. Postgres (psycopg2) loads with COPY; other
+# databases use batched multi-row INSERTs (BULK_INSERT_BATCH rows per statement).
+# Secondary indexes are dropped before loading and rebuilt once at the end. Every
+# chunk is committed together with its row in the bulk_imports ledger, so a rerun
+# skips the chunks that are already in and never loads a chunk twice. Dropped indexes
+# are recorded in the ledger too, so a killed import still rebuilds them on the rerun.
+# Import into a database without these rows: ids are kept as exported.
+#
+# Timeline entries and follower counts are derived from tweets and follows, so they
+# are not loaded; import rebuilds them once every chunk is in.
+
+CHUNK_ROWS = env_int("BULK_CHUNK_ROWS", 50_000)
+INSERT_BATCH = env_int("BULK_INSERT_BATCH", 5_000)
+GZIP_LEVEL = env_int("BULK_GZIP_LEVEL", 6)
+
+# Parents before children, the order import needs
+TABLES = ("accounts", "hashtags", "tweets", "media", "tweet_hashtag", "follows")
+
+MANIFEST = "manifest.json"
+FORMAT = 1
+INDEX_ITEM = "index:"
+
+
+class BulkError(Exception):
+    pass
+
+
+class BulkReport:
+    # Rows and rows/sec per table, updated as chunks finish; on_chunk is called for each
+    def __init__(self, on_chunk=None):
+        self.on_chunk = on_chunk
+        self.tables = {}
+        self.started = time.monotonic()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def chunk(self, table: str, file: str, rows: int, seconds: float, skipped: bool = False):
+        with self._lock:
+            entry = self.tables.setdefault(table, {"rows": 0, "chunks": 0, "skipped_chunks": 0, "seconds": 0.0})
+            if skipped:
+                entry["skipped_chunks"] += 1
+            else:
+                entry["rows"] += rows
+                entry["chunks"] += 1
+                entry["seconds"] += seconds
+        if self.on_chunk:
+            self.on_chunk(table, file, rows, seconds, skipped)
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            tables = {
+                name: {**entry, "rows_per_sec": entry["rows"] / entry["seconds"] if entry["seconds"] else None}
+                for name, entry in self.tables.items()
+            }
+        seconds = (self.finished or time.monotonic()) - self.started
+        rows = sum(entry["rows"] for entry in tables.values())
+        return {
+            "rows": rows,
+            "seconds": seconds,
+            "rows_per_sec": rows / seconds if seconds else None,
+            "tables": tables,
+        }
+
+
+def key_columns(table):
+    # Export order and resume point; tables without a primary key are ordered by every column
+    return list(table.primary_key.columns) or list(table.columns)
+
+
+def read_manifest(directory: str):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(directory: str, manifest: dict):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def _write_chunk(directory: str, file: str, columns, rows):
+    # Writes rows to file; returns (row count, last row as a dict). Nothing is left behind for no rows.
+    path = os.path.join(directory, file)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    count, last = 0, None
+    with gzip.open(path + ".tmp", "wb", compresslevel=GZIP_LEVEL) as out:
+        for row in rows:
+            last = dict(zip(columns, row))
+            out.write(dumps(last) + b"\n")
+            count += 1
+    if count:
+        os.replace(path + ".tmp", path)
+    else:
+        os.remove(path + ".tmp")
+    return count, last
+
+
+def export_snapshot(db: Session, directory: str, chunk_rows: int = CHUNK_ROWS, report: BulkReport = None) -> dict:
+    report = report or BulkReport()
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory) or {
+        "format": FORMAT,
+        "snapshot": uuid.uuid4().hex,
+        "created_at": datetime.now(ZoneInfo("UTC")).isoformat(),
+        "tables": {},
+    }
+    if db.get_bind().dialect.name == "postgresql":
+        # One snapshot of the database for every table
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    for name in TABLES:
+        table = Base.metadata.tables[name]
+        # Plain str names: orjson refuses the str subclass SQLAlchemy uses for keys
+        columns = [str(c.name) for c in table.columns]
+        entry = manifest["tables"].setdefault(name, {"columns": columns, "chunks": [], "done": False})
+        if entry["done"]:
+            for chunk in entry["chunks"]:
+                report.chunk(name, chunk["file"], chunk["rows"], 0.0, skipped=True)
+            continue
+        keys = key_columns(table)
+        last = entry["chunks"][-1]["last"] if entry["chunks"] else None
+        while True:
+            stmt = select(*table.columns).order_by(*keys).limit(chunk_rows)
+            if last is not None:
+                stmt = stmt.filter(tuple_(*keys) > tuple(last))
+            file = f"{name}/{len(entry['chunks']):05d}.ndjson.gz"
+            started = time.monotonic()
+            rows = db.execute(stmt.execution_options(yield_per=INSERT_BATCH))
+            count, last_row = _write_chunk(directory, file, columns, rows)
+            if not count:
+                break
+            last = [last_row[key.name] for key in keys]
+            entry["chunks"].append({"file": file, "rows": count, "last": last})
+            _write_manifest(directory, manifest)
+            report.chunk(name, file, count, time.monotonic() - started)
+            if count < chunk_rows:
+                break
+        entry["done"] = True
+        _write_manifest(directory, manifest)
+    db.rollback()
+    report.finish()
+    return manifest
+
+
+def read_chunk(directory: str, file: str) -> list:
+    with gzip.open(os.path.join(directory, file), "rb") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _copy_value(value) -> str:
+    # COPY text format
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_rows(db: Session, table, columns, rows):
+    quote = db.get_bind().dialect.identifier_preparer.quote
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row.get(column)) for column in columns) + "\n")
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {quote(table.name)} ({', '.join(quote(c) for c in columns)}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+
+
+def insert_rows(db: Session, table, columns, rows):
+    # JSON has no datetimes; the DateTime columns come back from their ISO strings
+    dates = [c for c in columns if isinstance(table.c[c].type, DateTime)]
+    for start in range(0, len(rows), INSERT_BATCH):
+        batch = [{column: row.get(column) for column in columns} for row in rows[start:start + INSERT_BATCH]]
+        for row in batch:
+            for column in dates:
+                if row[column] is not None:
+                    row[column] = datetime.fromisoformat(row[column])
+        db.execute(insert(table), batch)
+
+
+def uses_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+def secondary_indexes(db: Session, table_name: str) -> list:
+    # (name, CREATE INDEX statement) of the indexes import can drop: not unique, not a primary key
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = text(
+            "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x "
+            "JOIN pg_class i ON i.oid = x.indexrelid JOIN pg_class t ON t.oid = x.indrelid "
+            "WHERE t.relname = :table AND t.relnamespace = current_schema()::regnamespace AND NOT x.indisunique"
+        )
+    elif dialect == "sqlite":
+        stmt = text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table "
+            "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%'"
+        )
+    else:
+        return []
+    return [tuple(row) for row in db.execute(stmt, {"table": table_name})]
+
+
+def drop_indexes(db: Session, snapshot: str):
+    quote = db.get_bind().dialect.identifier_preparer.quote
+    for name in TABLES:
+        for index, ddl in secondary_indexes(db, name):
+            db.add(BulkImport(snapshot=snapshot, item=INDEX_ITEM + index, ddl=ddl))
+            db.execute(text(f"DROP INDEX {quote(index)}"))
+    db.commit()
+
+
+def rebuild_indexes(db: Session, snapshot: str):
+    dropped = db.execute(
+        select(BulkImport.item, BulkImport.ddl)
+        .filter(BulkImport.snapshot == snapshot, BulkImport.item.startswith(INDEX_ITEM))
+    ).all()
+    for item, ddl in dropped:
+        db.execute(text(ddl))
+        db.execute(delete(BulkImport).filter(BulkImport.snapshot == snapshot, BulkImport.item == item))
+        db.commit()
+
+
+def reset_sequences(db: Session):
+    # Imported rows keep their ids, so Postgres sequences have to continue after them
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for name in TABLES:
+        pk = list(Base.metadata.tables[name].primary_key.columns)
+        if len(pk) == 1 and isinstance(pk[0].type, Integer):
+            column = pk[0]
+            db.execute(select(func.setval(func.pg_get_serial_sequence(name, column.name), func.coalesce(func.max(column), 0) + 1, False)))
+    db.commit()
+
+
+def import_snapshot(db: Session, directory: str, report: BulkReport = None) -> dict:
+    report = report or BulkReport()
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise BulkError(f"No {MANIFEST} in {directory}")
+    if manifest.get("format") != FORMAT or not all(manifest["tables"].get(name, {}).get("done") for name in TABLES):
+        raise BulkError(f"{directory} is not a complete snapshot")
+    snapshot = manifest["snapshot"]
+    imported = set(db.execute(select(BulkImport.item).filter(BulkImport.snapshot == snapshot)).scalars())
+    load = copy_rows if uses_copy(db) else insert_rows
+
+    drop_indexes(db, snapshot)
+    try:
+        for name in TABLES:
+            table = Base.metadata.tables[name]
+            columns = [column for column in manifest["tables"][name]["columns"] if column in table.c]
+            for chunk in manifest["tables"][name]["chunks"]:
+                if chunk["file"] in imported:
+                    report.chunk(name, chunk["file"], chunk["rows"], 0.0, skipped=True)
+                    continue
+                started = time.monotonic()
+                rows = read_chunk(directory, chunk["file"])
+                load(db, table, columns, rows)
+                db.add(BulkImport(snapshot=snapshot, item=chunk["file"], rows=len(rows)))
+                db.commit()
+                report.chunk(name, chunk["file"], len(rows), time.monotonic() - started)
+        reset_sequences(db)
+    except Exception:
+        # Put the indexes back for the tables as they are, but report the load's error, not the rebuild's
+        db.rollback()
+        try:
+            rebuild_indexes(db, snapshot)
+        except Exception as e:
+            db.rollback()
+            print(f"[BULK] Rebuilding indexes after the failed import failed too, the rerun will retry: {e}")
+        raise
+    rebuild_indexes(db, snapshot)
+    rebuild_timelines(db)
+    db.commit()
+    if db.get_bind().dialect.name == "postgresql":
+        for name in (*TABLES, "timeline_entries"):
+            db.execute(text(f"ANALYZE {db.get_bind().dialect.identifier_preparer.quote(name)}"))
+        db.commit()
+    report.finish()
+    return manifest
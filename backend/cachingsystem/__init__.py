@@ -0,0 +1 @@
+# Caching system init file
@@ -1,9 +1,23 @@
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-import time
-import requests
+from contextlib import asynccontextmanager
+from collections import Counter
+from typing import List
+import asyncio
+import json
+import httpx
 import os
+from urllib.parse import urlencode
+from .engine import Cache, estimate_size
+from .settings import env_int, env_float
+from .upstream import UpstreamClient, forwardable_headers
+from .singleflight import SingleFlight
+from .policy import RoutePolicy, ROUTE_POLICIES, DEFAULT_POLICY
+from .invalidation import response_tags
+from .ring import HashRing
+from .etags import make_etag, etag_matches
+from .encoding import CachedResponse, build_cached_response, choose_encoding
 
 # JWT decoding to get username for /accounts/me cache key
 try:
@@ -12,98 +26,241 @@ except ImportError:
     jwt = None
     JWTError = Exception
 
-app = FastAPI()
+# Shared keep-alive connection pool to the API tier
+upstream = UpstreamClient.from_env()
 
-class Cache:
-    def __init__(self, expiration_time: int = 60):
-        self.cache = {}
-        self.expiration_time = expiration_time
+# Key ownership across cache nodes. CACHE_NODES lists every node's base URL and
+# CACHE_SELF is this node's entry; without both, this node owns every key.
+SELF_NODE = os.getenv("CACHE_SELF", "").rstrip("/")
+CACHE_NODES = [node.strip().rstrip("/") for node in os.getenv("CACHE_NODES", "").split(",") if node.strip()]
+ring = HashRing(CACHE_NODES) if SELF_NODE in CACHE_NODES else HashRing()
 
-    def _invalidate(self):
-        current_time = time.time()
-        keys_to_delete = [key for key, value in self.cache.items() if current_time - value['timestamp'] > self.expiration_time]
-        for key in keys_to_delete:
-            del self.cache[key]
+# Header marking a request forwarded by a peer, so the owner never forwards it again
+PEER_HEADER = "X-Cache-Peer"
 
-    def get(self, key: str):
-        self._invalidate()
-        if key in self.cache:
-            return self.cache[key]['value']
+# Upstream response headers stored with a cached body and sent back on every hit
+REPLAYED_HEADERS = ("x-next-cursor",)
+
+# Keep-alive pools to the other cache nodes, created on first use
+peers = {}
+
+def peer_client(node: str) -> UpstreamClient:
+    if node not in peers:
+        peers[node] = UpstreamClient(
+            node,
+            pool_size=env_int("CACHE_PEER_POOL_SIZE", 50),
+            keepalive=env_int("CACHE_PEER_POOL_SIZE", 50),
+            read_timeout=env_float("CACHE_PEER_TIMEOUT", 2.0),
+        )
+    return peers[node]
+
+def owner_of(cache_key: str):
+    # Returns the owning peer, or None when this node should serve the key itself
+    owner = ring.owner(cache_key)
+    if owner is None or owner == SELF_NODE:
         return None
+    return owner
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await upstream.aclose()
+    for client in peers.values():
+        await client.aclose()
+
+app = FastAPI(lifespan=lifespan)
+
+def entry_size(value):
+    # Proxied responses are byte bodies, so the byte budget counts their real size
+    if isinstance(value, CachedResponse):
+        return value.size
+    return estimate_size(value)
+
+cache = Cache(
+    sizeof=entry_size,
+    expiration_time=env_int("CACHE_TTL_SECONDS", 60),
+    max_entries=env_int("CACHE_MAX_ENTRIES", 100_000),
+    max_bytes=env_int("CACHE_MAX_BYTES", 256 * 1024 * 1024),
+)
+
+# Only one upstream fetch per key at a time on this node
+flights = SingleFlight()
 
-    def set(self, key: str, value):
-        self._invalidate()
-        self.cache[key] = {'value': value, 'timestamp': time.time()}
+# Background revalidation tasks, kept referenced until they finish
+refresh_tasks = set()
 
-cache = Cache()
+# hit/miss/coalesced counters, exposed on /cache/stats
+stats = Counter()
 
 class CacheItem(BaseModel):
     key: str
     value: str
 
+class InvalidationMessage(BaseModel):
+    keys: List[str] = []
+    tags: List[str] = []
+
 SECRET_KEY = os.getenv("SECRET_KEY", "dummysecretkey")
 ALGORITHM = "HS256"
 
+@app.get("/cache/stats")
+def get_cache_stats():
+    return {
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "coalesced": stats["coalesced"],
+        "stale_hits": stats["stale_hits"],
+        "stale_if_error": stats["stale_if_error"],
+        "refreshes": stats["refreshes"],
+        "revalidated": stats["revalidated"],
+        "not_modified": stats["not_modified"],
+        "forwarded": stats["forwarded"],
+        "peer_errors": stats["peer_errors"],
+        "invalidations": stats["invalidations"],
+        "invalidated_entries": stats["invalidated_entries"],
+        "upstream_errors": stats["upstream_errors"],
+        "in_flight": len(flights),
+        "entries": len(cache),
+        "bytes": cache.total_bytes,
+        "evictions": cache.evictions,
+    }
+
+@app.post("/cache/invalidate")
+def invalidate_cache(message: InvalidationMessage):
+    removed = cache.invalidate(keys=message.keys, tags=message.tags)
+    stats["invalidations"] += 1
+    stats["invalidated_entries"] += removed
+    print(f"[CACHE] Invalidated {removed} entries (keys={message.keys}, tags={message.tags})")
+    return {"removed": removed}
+
 @app.get("/cache/{key}")
 def get_cache(key: str):
     value = cache.get(key)
-    if value is not None:
-        return {"key": key, "value": value}
-    return {"error": "Key not found"}, 404
+    if value is None:
+        return JSONResponse(content={"error": "Key not found"}, status_code=404)
+    if isinstance(value, CachedResponse):
+        # Cached API responses: the identity body and its metadata, never the compressed variants
+        body = json.loads(value.body) if value.media_type == "application/json" else value.body.decode("utf-8", "replace")
+        value = {
+            "body": body,
+            "etag": value.etag,
+            "media_type": value.media_type,
+            "encodings": [encoding for encoding in ("gzip", "br") if value.variant(encoding) is not None],
+            "headers": dict(value.headers),
+        }
+    return {"key": key, "value": value}
 
 @app.post("/cache")
 def set_cache(item: CacheItem):
     cache.set(item.key, item.value)
     return {"message": "Value set"}
 
-@app.get("/api/tweets")
-def get_tweets():
-    cached = cache.get("tweets")
-    if cached is not None:
-        print("[CACHE] HIT for /api/tweets")
-        return cached
-    print("[CACHE] MISS for /api/tweets, fetching from API...")
+def respond(cached: CachedResponse, if_none_match: str = None, accept_encoding: str = None):
+    encoding = choose_encoding(accept_encoding, cached)
+    etag = cached.etag_for(encoding)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", **dict(cached.headers)}
+    if etag_matches(if_none_match, etag) or etag_matches(if_none_match, cached.etag):
+        stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=cached.variant(encoding), media_type=cached.media_type, headers=headers)
+
+def store(cache_key: str, path: str, cached: CachedResponse, policy: RoutePolicy, generation: int):
+    if cache.generation != generation:
+        # An invalidation arrived while we were fetching; this data may predate it
+        print(f"[CACHE] Not storing /api/{path} ({cache_key}), invalidated during fetch")
+        return
+    # Only per-user entries need their payload to work out tags
+    data = json.loads(cached.body) if path == "accounts/me" else None
+    cache.set(cache_key, cached, ttl=policy.ttl, stale_ttl=policy.stale_ttl, tags=response_tags(path, data))
+    print(f"[CACHE] Stored new data for /api/{path} ({cache_key})")
+
+async def fetch_upstream(cache_key: str, path: str, headers: dict = None, policy: RoutePolicy = DEFAULT_POLICY, previous: CachedResponse = None, params=None):
+    # Runs once per key no matter how many requests are waiting on it.
+    # With a previous version, asks the API whether it changed instead of refetching it.
+    generation = cache.generation
+    request_headers = dict(headers or {})
+    if previous is not None:
+        request_headers["If-None-Match"] = previous.etag
+    resp = await upstream.get(f"/api/{path}", headers=request_headers, params=params)
+    if resp.status_code == 304 and previous is not None:
+        stats["revalidated"] += 1
+        print(f"[CACHE] /api/{path} ({cache_key}) not modified, extending cached entry")
+        store(cache_key, path, previous, policy, generation)
+        return 200, previous
+    if resp.status_code == 200:
+        # Compress off the event loop: large lists take a while and this runs once per insert
+        cached = await asyncio.to_thread(
+            build_cached_response,
+            resp.content,
+            resp.headers.get("etag") or make_etag(resp.content),
+            resp.headers.get("content-type", "application/json"),
+            tuple((name, resp.headers[name]) for name in REPLAYED_HEADERS if name in resp.headers),
+        )
+        store(cache_key, path, cached, policy, generation)
+        return resp.status_code, cached
+    print(f"[CACHE] API returned status {resp.status_code}: {resp.text}")
+    return resp.status_code, resp.text
+
+async def _background_refresh(cache_key: str, path: str, headers: dict, policy: RoutePolicy, previous: CachedResponse, params=None):
     try:
-        resp = requests.get("http://api:8000/api/tweets", timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            cache.set("tweets", data)
-            print("[CACHE] Stored new data for /api/tweets")
-            return data
-        else:
-            print(f"[CACHE] API returned status {resp.status_code}: {resp.text}")
-            return {"error": f"API error: {resp.status_code}", "details": resp.text}, resp.status_code
-    except Exception as e:
-        print(f"[CACHE] Exception contacting API: {e}")
-        return {"error": "Could not contact API", "details": str(e)}, 502
-
-@app.get("/api/accounts")
-def get_accounts():
-    cached = cache.get("accounts")
-    if cached is not None:
-        print("[CACHE] HIT for /api/accounts")
-        return cached
-    print("[CACHE] MISS for /api/accounts, fetching from API...")
+        await flights.do(cache_key, lambda: fetch_upstream(cache_key, path, headers, policy, previous, params))
+        stats["refreshes"] += 1
+    except httpx.HTTPError as e:
+        stats["upstream_errors"] += 1
+        print(f"[CACHE] Background refresh of {cache_key} failed: {e}")
+
+def schedule_refresh(cache_key: str, path: str, headers: dict, policy: RoutePolicy, previous: CachedResponse = None, params=None):
+    # At most one refresh per key: skip if a fetch for it is already running
+    if flights.in_flight(cache_key):
+        return
+    task = asyncio.ensure_future(_background_refresh(cache_key, path, headers, policy, previous, params))
+    refresh_tasks.add(task)
+    task.add_done_callback(refresh_tasks.discard)
+
+async def cached_get(cache_key: str, path: str, headers: dict = None, policy: RoutePolicy = DEFAULT_POLICY, if_none_match: str = None, accept_encoding: str = None, params=None):
+    entry = cache.get_entry(cache_key)
+    now = cache.clock()
+    if entry is not None:
+        if entry.is_fresh(now):
+            stats["hits"] += 1
+            print(f"[CACHE] HIT for /api/{path} ({cache_key})")
+            if policy.should_refresh_ahead(entry, now):
+                schedule_refresh(cache_key, path, headers, policy, entry.value, params)
+            return respond(entry.value, if_none_match, accept_encoding)
+        if policy.can_serve_stale(entry, now):
+            stats["stale_hits"] += 1
+            print(f"[CACHE] STALE HIT for /api/{path} ({cache_key}), revalidating in background")
+            schedule_refresh(cache_key, path, headers, policy, entry.value, params)
+            return respond(entry.value, if_none_match, accept_encoding)
+    print(f"[CACHE] MISS for /api/{path} ({cache_key}), fetching from API...")
+    previous = entry.value if entry is not None else None
     try:
-        resp = requests.get("http://api:8000/api/accounts", timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            cache.set("accounts", data)
-            print("[CACHE] Stored new data for /api/accounts")
-            return data
-        else:
-            print(f"[CACHE] API returned status {resp.status_code}: {resp.text}")
-            return {"error": f"API error: {resp.status_code}", "details": resp.text}, resp.status_code
-    except Exception as e:
+        (status_code, data), shared = await flights.do(cache_key, lambda: fetch_upstream(cache_key, path, headers, policy, previous, params))
+    except httpx.HTTPError as e:
+        stats["upstream_errors"] += 1
         print(f"[CACHE] Exception contacting API: {e}")
-        return {"error": "Could not contact API", "details": str(e)}, 502
-
-@app.get("/api/accounts/me")
-def get_accounts_me(request: Request):
-    auth = request.headers.get("authorization")
-    if not auth or not auth.startswith("Bearer "):
-        return {"error": "Missing or invalid token"}, 401
-    token = auth.split(" ", 1)[1]
+        if entry is not None and policy.can_serve_on_error(entry, now):
+            stats["stale_if_error"] += 1
+            return respond(entry.value, if_none_match, accept_encoding)
+        return JSONResponse(content={"error": "Could not contact API", "details": str(e)}, status_code=502)
+    stats["coalesced" if shared else "misses"] += 1
+    if status_code == 200:
+        return respond(data, if_none_match, accept_encoding)
+    if status_code >= 500 and entry is not None and policy.can_serve_on_error(entry, now):
+        stats["stale_if_error"] += 1
+        print(f"[CACHE] Serving stale /api/{path} ({cache_key}) after API error {status_code}")
+        return respond(entry.value, if_none_match, accept_encoding)
+    return JSONResponse(content={"error": f"API error: {status_code}", "details": data}, status_code=status_code)
+
+def tweets_cache_key(query_params) -> str:
+    # Each page/search of the tweet list is its own entry; params are sorted so
+    # ?limit=20&cursor=x and ?cursor=x&limit=20 share one key
+    items = sorted(query_params.multi_items())
+    return f"tweets?{urlencode(items)}" if items else "tweets"
+
+def accounts_me_cache_key(token: str) -> str:
     # Try to decode the JWT to get the username for cache key
     # If decoding fails, use the token as the cache key
     cache_key = f"accounts_me:{token}"
@@ -115,116 +272,110 @@ def get_accounts_me(request: Request):
                 cache_key = f"accounts_me:{username}"
         except JWTError:
             pass
-    cached = cache.get(cache_key)
-    if cached is not None:
-        print(f"[CACHE] HIT for /api/accounts/me ({cache_key})")
-        return cached
-    print(f"[CACHE] MISS for /api/accounts/me ({cache_key}), fetching from API...")
+    return cache_key
+
+async def routed_get(request: Request, cache_key: str, path: str, headers: dict = None, policy: RoutePolicy = DEFAULT_POLICY, params=None):
+    # Serve keys this node owns; forward the rest to their owner so each key is
+    # cached on one node only. Falls back to a local fetch if the owner is down.
+    owner = owner_of(cache_key)
+    if_none_match = request.headers.get("if-none-match")
+    accept_encoding = request.headers.get("accept-encoding")
+    if owner is None or request.headers.get(PEER_HEADER):
+        return await cached_get(cache_key, path, headers, policy, if_none_match, accept_encoding, params)
+    peer_headers = {**(headers or {}), PEER_HEADER: SELF_NODE}
+    if if_none_match:
+        peer_headers["If-None-Match"] = if_none_match
+    # The owner picks the encoding for this client, and its body is relayed as is
+    peer_headers["Accept-Encoding"] = accept_encoding or "identity"
     try:
-        headers = {"Authorization": auth}
-        resp = requests.get("http://api:8000/api/accounts/me", headers=headers, timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            cache.set(cache_key, data)
-            print(f"[CACHE] Stored new data for /api/accounts/me ({cache_key})")
-            return data
-        else:
-            print(f"[CACHE] API returned status {resp.status_code}: {resp.text}")
-            return {"error": f"API error: {resp.status_code}", "details": resp.text}, resp.status_code
-    except Exception as e:
-        print(f"[CACHE] Exception contacting API: {e}")
-        return {"error": "Could not contact API", "details": str(e)}, 502
+        resp = await peer_client(owner).stream("GET", f"/api/{path}", headers=peer_headers, params=params)
+        try:
+            content = b"".join([chunk async for chunk in resp.aiter_raw()])
+        finally:
+            await resp.aclose()
+    except httpx.HTTPError as e:
+        stats["peer_errors"] += 1
+        print(f"[CACHE] Owner {owner} unreachable for {cache_key}, serving locally: {e}")
+        return await cached_get(cache_key, path, headers, policy, if_none_match, accept_encoding, params)
+    stats["forwarded"] += 1
+    print(f"[CACHE] FORWARDED /api/{path} ({cache_key}) to owner {owner}")
+    relayed = ("etag", "content-encoding", "vary", *REPLAYED_HEADERS)
+    response_headers = {name: resp.headers[name] for name in relayed if name in resp.headers}
+    if resp.status_code == 304:
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=content, status_code=resp.status_code, media_type=resp.headers.get("content-type"), headers=response_headers)
+
+# Streaming NDJSON, asked for like the API expects it (see backend/streaming.py)
+NDJSON = "application/x-ndjson"
+
+def is_stream_request(request: Request) -> bool:
+    return request.query_params.get("stream", "").lower() in ("1", "true", "yes", "on") or NDJSON in request.headers.get("accept", "")
+
+async def relay(resp: httpx.Response):
+    try:
+        async for chunk in resp.aiter_bytes():
+            yield chunk
+    finally:
+        # Also runs when the client goes away mid-stream, so the upstream connection is released
+        await resp.aclose()
+
+async def stream_upstream(path: str, request: Request):
+    # Relays the upstream body chunk by chunk as it arrives instead of buffering it
+    body = await request.body() if request.method in ["POST", "PUT", "PATCH"] else None
+    try:
+        resp = await upstream.stream(
+            request.method,
+            f"/api/{path}",
+            headers=forwardable_headers(request.headers),
+            content=body,
+            params=request.query_params,
+        )
+    except httpx.HTTPError as e:
+        print(f"[CACHE] Exception streaming {request.method} /api/{path}: {e}")
+        return JSONResponse(content={"error": "Proxy error", "details": str(e)}, status_code=502)
+    # httpx decodes the chunks, so drop the upstream encoding headers
+    headers = {k: v for k, v in forwardable_headers(resp.headers).items() if k.lower() != "content-encoding"}
+    return StreamingResponse(relay(resp), status_code=resp.status_code, headers=headers)
 
 @app.api_route("/api/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_api(path: str, request: Request):
+    # Streamed (NDJSON) responses go straight through, never cached
+    if is_stream_request(request):
+        return await stream_upstream(path, request)
     # cache GET /api/tweets
     if request.method == "GET" and path == "tweets":
-        cached = cache.get("tweets")
-        if cached is not None:
-            print("[CACHE] HIT for /api/tweets")
-            return cached
-        print("[CACHE] MISS for /api/tweets, fetching from API...")
-        try:
-            resp = requests.get(f"http://api:8000/api/tweets", timeout=5)
-            if resp.status_code == 200:
-                data = resp.json()
-                cache.set("tweets", data)
-                print("[CACHE] Stored new data for /api/tweets")
-                return data
-            else:
-                print(f"[CACHE] API returned status {resp.status_code}: {resp.text}")
-                return JSONResponse(content={"error": f"API error: {resp.status_code}", "details": resp.text}, status_code=resp.status_code)
-        except Exception as e:
-            print(f"[CACHE] Exception contacting API: {e}")
-            return JSONResponse(content={"error": "Could not contact API", "details": str(e)}, status_code=502)
+        params = sorted(request.query_params.multi_items())
+        return await routed_get(request, tweets_cache_key(request.query_params), path, policy=ROUTE_POLICIES[path], params=params or None)
     # cache GET /api/accounts
     if request.method == "GET" and path == "accounts":
-        cached = cache.get("accounts")
-        if cached is not None:
-            print("[CACHE] HIT for /api/accounts")
-            return cached
-        print("[CACHE] MISS for /api/accounts, fetching from API...")
-        try:
-            resp = requests.get(f"http://api:8000/api/accounts", timeout=5)
-            if resp.status_code == 200:
-                data = resp.json()
-                cache.set("accounts", data)
-                print("[CACHE] Stored new data for /api/accounts")
-                return data
-            else:
-                print(f"[CACHE] API returned status {resp.status_code}: {resp.text}")
-                return JSONResponse(content={"error": f"API error: {resp.status_code}", "details": resp.text}, status_code=resp.status_code)
-        except Exception as e:
-            print(f"[CACHE] Exception contacting API: {e}")
-            return JSONResponse(content={"error": "Could not contact API", "details": str(e)}, status_code=502)
+        return await routed_get(request, "accounts", path, policy=ROUTE_POLICIES[path])
     # cache GET /api/accounts/me
     if request.method == "GET" and path == "accounts/me":
         auth = request.headers.get("authorization")
         if not auth or not auth.startswith("Bearer "):
             return JSONResponse(content={"error": "Missing or invalid token"}, status_code=401)
         token = auth.split(" ", 1)[1]
-        cache_key = f"accounts_me:{token}"
-        if jwt is not None:
-            try:
-                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-                username = payload.get("sub")
-                if username:
-                    cache_key = f"accounts_me:{username}"
-            except JWTError:
-                pass
-        cached = cache.get(cache_key)
-        if cached is not None:
-            print(f"[CACHE] HIT for /api/accounts/me ({cache_key})")
-            return cached
-        print(f"[CACHE] MISS for /api/accounts/me ({cache_key}), fetching from API...")
-        try:
-            headers = {"Authorization": auth}
-            resp = requests.get(f"http://api:8000/api/accounts/me", headers=headers, timeout=5)
-            if resp.status_code == 200:
-                data = resp.json()
-                cache.set(cache_key, data)
-                print(f"[CACHE] Stored new data for /api/accounts/me ({cache_key})")
-                return data
-            else:
-                print(f"[CACHE] API returned status {resp.status_code}: {resp.text}")
-                return JSONResponse(content={"error": f"API error: {resp.status_code}", "details": resp.text}, status_code=resp.status_code)
-        except Exception as e:
-            print(f"[CACHE] Exception contacting API: {e}")
-            return JSONResponse(content={"error": "Could not contact API", "details": str(e)}, status_code=502)
+        return await routed_get(request, accounts_me_cache_key(token), path, headers={"Authorization": auth}, policy=ROUTE_POLICIES[path])
     # Proxy all other /api/ requests to the API service
-    api_url = f"http://api:8000/api/{path}"
+    method = request.method
     try:
-        method = request.method
-        headers = dict(request.headers)
         body = None
         if method in ["POST", "PUT", "PATCH"]:
             body = await request.body()
-        resp = requests.request(method, api_url, headers=headers, data=body, timeout=5)
-        return Response(content=resp.content, status_code=resp.status_code, headers=dict(resp.headers))
-    except Exception as e:
-        print(f"[CACHE] Exception proxying {method} {api_url}: {e}")
+        resp = await upstream.request(
+            method,
+            f"/api/{path}",
+            headers=forwardable_headers(request.headers),
+            content=body,
+            params=request.query_params,
+        )
+    except httpx.HTTPError as e:
+        print(f"[CACHE] Exception proxying {method} /api/{path}: {e}")
         return JSONResponse(content={"error": "Proxy error", "details": str(e)}, status_code=502)
+    # httpx has already decoded the body, so drop the upstream encoding headers
+    headers = {k: v for k, v in forwardable_headers(resp.headers).items() if k.lower() != "content-encoding"}
+    return Response(content=resp.content, status_code=resp.status_code, headers=headers)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=5000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -0,0 +1,92 @@
+import gzip
+from dataclasses import dataclass
+
+from .settings import env_int
+
+# Cached responses are stored as finished byte bodies, with gzip and brotli
+# variants built once when the entry is inserted. A hit just picks the variant
+# matching Accept-Encoding; nothing is re-encoded or re-compressed per request.
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = env_int("CACHE_MIN_COMPRESS_BYTES", 1024)
+GZIP_LEVEL = env_int("CACHE_GZIP_LEVEL", 6)
+BROTLI_QUALITY = env_int("CACHE_BROTLI_QUALITY", 5)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    media_type: str = "application/json"
+    gzip: bytes = None
+    br: bytes = None
+    # Upstream headers replayed on every hit, e.g. (("X-Next-Cursor", "..."),)
+    headers: tuple = ()
+
+    @property
+    def size(self) -> int:
+        # Real bytes held by this entry, used for the cache's byte budget
+        return len(self.body) + len(self.gzip or b"") + len(self.br or b"")
+
+    def variant(self, encoding: str) -> bytes:
+        if encoding == "br":
+            return self.br
+        if encoding == "gzip":
+            return self.gzip
+        return self.body
+
+    def etag_for(self, encoding: str) -> str:
+        # Each content-coding is a different representation, so it gets its own strong ETag
+        if encoding is None:
+            return self.etag
+        return self.etag[:-1] + f'-{encoding}"'
+
+
+def build_cached_response(body: bytes, etag: str, media_type: str = "application/json", headers: tuple = ()) -> CachedResponse:
+    if len(body) < MIN_COMPRESS_BYTES:
+        return CachedResponse(body, etag, media_type, headers=headers)
+    gzipped = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    brotlied = brotli.compress(body, quality=BROTLI_QUALITY) if brotli is not None else None
+    return CachedResponse(
+        body,
+        etag,
+        media_type,
+        gzip=gzipped if len(gzipped) < len(body) else None,
+        br=brotlied if brotlied is not None and len(brotlied) < len(body) else None,
+        headers=headers,
+    )
+
+
+def parse_accept_encoding(header: str) -> dict:
+    # {"gzip": 1.0, "br": 0.8, ...}; codings with q=0 are kept so they can be refused
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, cached: CachedResponse):
+    # Best available compressed variant the client accepts, or None for the plain body
+    accepted = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in ("br", "gzip"):
+        if cached.variant(coding) is None:
+            continue
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
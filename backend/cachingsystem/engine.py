@@ -0,0 +1,210 @@
+import sys
+import time
+import heapq
+import threading
+from collections import OrderedDict
+
+# Bounded LRU + TTL cache engine.
+# - get/set are O(1): entries live in an OrderedDict that doubles as the LRU list
+# - expiry is driven by a coarse timer wheel: every entry is filed in the slot of
+#   the second it expires in, and whole slots are dropped once the clock passes them
+# - an entry-count and a byte budget bound the cache, evicting least recently used first
+# - entries can be kept for a grace period after they expire (stale_ttl) so callers
+#   can serve stale data while revalidating; get() never returns them, get_entry() does
+# - entries can carry tags (e.g. "tweet:12", "account:3") so writes can evict every
+#   key that depends on a record without knowing the keys themselves
+
+
+def estimate_size(value):
+    # Rough byte size of a cached value, used for the byte budget
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class CacheEntry:
+    __slots__ = ("value", "created_at", "expires_at", "stale_until", "size", "slot", "hits", "tags")
+
+    def __init__(self, value, created_at, expires_at, stale_until, size, slot, tags=()):
+        self.value = value
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+        self.slot = slot
+        self.hits = 0
+        self.tags = tags
+
+    def is_fresh(self, now):
+        return now < self.expires_at
+
+
+class Cache:
+    def __init__(
+        self,
+        expiration_time: int = 60,
+        max_entries: int = None,
+        max_bytes: int = None,
+        sizeof=estimate_size,
+        resolution: float = 1.0,
+        clock=time.monotonic,
+    ):
+        self.expiration_time = expiration_time
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.resolution = resolution
+        self.clock = clock
+        self.cache = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        # Bumped on every invalidation so in-flight fetches can tell their data may be stale
+        self.generation = 0
+        self._tags = {}
+        self._slots = {}
+        self._slot_heap = []
+        self._lock = threading.Lock()
+
+    def _slot_for(self, timestamp):
+        return int(timestamp // self.resolution)
+
+    def _expire(self, now):
+        # Drop every slot the clock has fully moved past. Entries expiring in the
+        # current slot are caught lazily by get().
+        current_slot = self._slot_for(now)
+        while self._slot_heap and self._slot_heap[0] < current_slot:
+            slot = heapq.heappop(self._slot_heap)
+            for key in self._slots.pop(slot, ()):
+                entry = self.cache.pop(key, None)
+                if entry is not None:
+                    self.total_bytes -= entry.size
+                    self._untag(key, entry)
+
+    def _remove(self, key):
+        entry = self.cache.pop(key, None)
+        if entry is None:
+            return None
+        self.total_bytes -= entry.size
+        keys = self._slots.get(entry.slot)
+        if keys is not None:
+            keys.discard(key)
+        self._untag(key, entry)
+        return entry
+
+    def _untag(self, key, entry):
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _enforce_budget(self):
+        while self.cache and (
+            (self.max_entries is not None and len(self.cache) > self.max_entries)
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            key = next(iter(self.cache))
+            self._remove(key)
+            self.evictions += 1
+
+    def get_entry(self, key: str):
+        # Returns the entry even if it is stale, as long as its grace period has not ended
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            entry = self.cache.get(key)
+            if entry is None:
+                return None
+            if entry.stale_until <= now:
+                self._remove(key)
+                return None
+            entry.hits += 1
+            self.cache.move_to_end(key)
+            return entry
+
+    def get(self, key: str):
+        entry = self.get_entry(key)
+        if entry is None or not entry.is_fresh(self.clock()):
+            return None
+        return entry.value
+
+    def get_many(self, keys):
+        # Multi-get under one lock: {key: value} for every fresh key found
+        found = {}
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            for key in keys:
+                entry = self.cache.get(key)
+                if entry is None:
+                    continue
+                if entry.stale_until <= now:
+                    self._remove(key)
+                    continue
+                if entry.is_fresh(now):
+                    entry.hits += 1
+                    self.cache.move_to_end(key)
+                    found[key] = entry.value
+        return found
+
+    def set(self, key: str, value, ttl: float = None, stale_ttl: float = 0, tags=()):
+        size = self.sizeof(value)
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            expires_at = now + (self.expiration_time if ttl is None else ttl)
+            stale_until = expires_at + stale_ttl
+            slot = self._slot_for(stale_until)
+            tags = tuple(tags)
+            self.cache[key] = CacheEntry(value, now, expires_at, stale_until, size, slot, tags)
+            self.total_bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            keys = self._slots.get(slot)
+            if keys is None:
+                keys = self._slots[slot] = set()
+                heapq.heappush(self._slot_heap, slot)
+            keys.add(key)
+            self._enforce_budget()
+
+    def delete(self, key: str):
+        with self._lock:
+            return self._remove(key) is not None
+
+    def invalidate(self, keys=(), tags=()):
+        # Drops the given keys and every key carrying one of the given tags
+        with self._lock:
+            self.generation += 1
+            removed = 0
+            for key in keys:
+                removed += self._remove(key) is not None
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    removed += self._remove(key) is not None
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._tags.clear()
+            self.cache.clear()
+            self._slots.clear()
+            self._slot_heap.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
@@ -0,0 +1,34 @@
+import json
+import hashlib
+from starlette.responses import Response
+
+# Strong ETags from a hash of the exact response body, shared by the API routes
+# and the cache proxy so both sides agree on the validator for the same bytes.
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def json_body(content) -> bytes:
+    # Same encoding as FastAPI's JSONResponse, so hashes match what clients receive
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix on either side is ignored
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in candidates)
+
+
+def conditional_response(if_none_match: str, body: bytes, etag: str = None, media_type: str = "application/json", headers: dict = None) -> Response:
+    # 304 without a body when the client already has this version, else the full body
+    etag = etag or make_etag(body)
+    headers = {**(headers or {}), "ETag": etag}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
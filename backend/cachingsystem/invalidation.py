@@ -0,0 +1,149 @@
+import os
+import time
+import queue
+from threading import Thread, Lock
+
+import httpx
+
+# Event-driven cache invalidation.
+# The API publishes the keys and tags touched by a write right after it commits.
+# Subscribers are callables taking (keys, tags): the in-process route cache
+# subscribes directly, and HttpFanout forwards every message to the cache nodes'
+# /cache/invalidate endpoint. In tests the bus itself is the broker stand-in.
+
+# Tags shared by the API (publisher) and the cache nodes (when storing entries)
+TWEETS_TAG = "tweets"
+ACCOUNTS_TAG = "accounts"
+# Only published when the set of tweets in a list can change (create/delete),
+# or, for search lists, when a tweet's content changes
+TWEET_LISTS_TAG = "tweet_lists"
+TWEET_SEARCH_TAG = "tweet_search"
+
+
+def tweet_tag(tweet_id) -> str:
+    return f"tweet:{tweet_id}"
+
+
+def account_tag(account_id) -> str:
+    return f"account:{account_id}"
+
+
+def hashtag_tag(tag) -> str:
+    return f"hashtag:{tag}"
+
+
+def principal_tag(username) -> str:
+    # The cached identity of a logged-in account (see backend/principals.py)
+    return f"principal:{username}"
+
+
+def tweet_change_tags(tweet_id, account_id, hashtags=()) -> list:
+    # Everything that can embed a tweet: the tweet lists, the account lists
+    # (accounts include their tweets), the author and the tweet's hashtags
+    tags = [TWEETS_TAG, ACCOUNTS_TAG, tweet_tag(tweet_id), account_tag(account_id)]
+    tags.extend(hashtag_tag(tag) for tag in hashtags)
+    return tags
+
+
+def response_tags(path: str, data) -> list:
+    # Tags for a cached API response, so the cache node can evict it on a matching event
+    if path == "tweets":
+        return [TWEETS_TAG]
+    if path == "accounts":
+        return [ACCOUNTS_TAG]
+    if path == "accounts/me" and isinstance(data, dict) and "id" in data:
+        return [account_tag(data["id"])]
+    return []
+
+
+class InvalidationBus:
+    # With replay_after set, every message is delivered a second time that many
+    # seconds later. Used with read replicas: a reader right after the write can
+    # refill a cache from a replica that has not caught up yet, and the replay
+    # evicts that stale entry once the replica should have the write.
+    def __init__(self, replay_after: float = 0.0):
+        self._subscribers = []
+        self.replay_after = replay_after
+        self._replays = queue.Queue()
+        self._replayer = None
+        self._replayer_lock = Lock()
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, keys=(), tags=()):
+        keys, tags = list(keys), list(tags)
+        self._deliver(keys, tags)
+        if self.replay_after > 0:
+            self._schedule_replay(keys, tags)
+
+    def _schedule_replay(self, keys, tags):
+        with self._replayer_lock:
+            if self._replayer is None:
+                self._replayer = Thread(target=self._replay, daemon=True)
+                self._replayer.start()
+        self._replays.put((time.monotonic() + self.replay_after, keys, tags))
+
+    def _replay(self):
+        # The delay is the same for every message, so they come due in queue order
+        while True:
+            due, keys, tags = self._replays.get()
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._deliver(keys, tags)
+
+    def _deliver(self, keys, tags):
+        for callback in list(self._subscribers):
+            try:
+                callback(keys, tags)
+            except Exception as e:
+                # A failing subscriber must never fail the write that published
+                print(f"[INVALIDATION] Subscriber {callback} failed: {e}")
+
+
+class HttpFanout:
+    # Sends invalidations to every cache node from a background thread so the
+    # publishing request does not wait on the network
+
+    def __init__(self, nodes, timeout: float = 2.0, max_queue: int = 10_000):
+        self.nodes = [node.rstrip("/") for node in nodes if node]
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __call__(self, keys, tags):
+        try:
+            self.queue.put_nowait({"keys": keys, "tags": tags})
+        except queue.Full:
+            print("[INVALIDATION] Queue full, dropping message (TTL still applies)")
+
+    def _run(self):
+        with httpx.Client(timeout=self.timeout) as client:
+            while True:
+                message = self.queue.get()
+                for node in self.nodes:
+                    try:
+                        client.post(f"{node}/cache/invalidate", json=message)
+                    except httpx.HTTPError as e:
+                        print(f"[INVALIDATION] Could not reach {node}: {e}")
+                self.queue.task_done()
+
+
+# Process-wide bus used by the API routes
+invalidation_bus = InvalidationBus()
+
+
+def connect_cache_nodes(bus: InvalidationBus = invalidation_bus):
+    # Subscribes an HttpFanout to the cache nodes listed in CACHE_NODES
+    # (comma separated base URLs, e.g. "http://cache1:5000,http://cache2:5000")
+    nodes = [node.strip() for node in os.getenv("CACHE_NODES", "").split(",") if node.strip()]
+    if not nodes:
+        return None
+    return bus.subscribe(HttpFanout(nodes))
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from .settings import env_float
+
+# Per-route freshness rules for the cache proxy.
+# ttl                     seconds an entry is served as fresh
+# stale_while_revalidate  seconds after ttl where the stale value is served at once
+#                         while one background task refreshes it
+# stale_if_error          seconds after ttl where the stale value is served if the
+#                         API returns 5xx or cannot be reached
+# refresh_ahead           fraction of ttl, counted back from expiry, in which a hot
+#                         entry is refreshed before it goes stale
+# hot_rate                hits per second an entry needs to count as hot
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    ttl: float
+    stale_while_revalidate: float = 0
+    stale_if_error: float = 0
+    refresh_ahead: float = 0
+    hot_rate: float = 1.0
+
+    @property
+    def stale_ttl(self):
+        # How long an entry has to be kept after it expires
+        return max(self.stale_while_revalidate, self.stale_if_error)
+
+    def can_serve_stale(self, entry, now):
+        return now < entry.expires_at + self.stale_while_revalidate
+
+    def can_serve_on_error(self, entry, now):
+        return now < entry.expires_at + self.stale_if_error
+
+    def should_refresh_ahead(self, entry, now):
+        if not self.refresh_ahead or now < entry.expires_at - self.refresh_ahead * self.ttl:
+            return False
+        age = max(now - entry.created_at, 1e-3)
+        return entry.hits / age >= self.hot_rate
+
+
+DEFAULT_TTL = env_float("CACHE_TTL_SECONDS", 60)
+
+ROUTE_POLICIES = {
+    "tweets": RoutePolicy(
+        ttl=DEFAULT_TTL,
+        stale_while_revalidate=env_float("CACHE_TWEETS_SWR_SECONDS", 30),
+        stale_if_error=env_float("CACHE_TWEETS_SIE_SECONDS", 600),
+        refresh_ahead=0.2,
+    ),
+    "accounts": RoutePolicy(
+        ttl=DEFAULT_TTL,
+        stale_while_revalidate=env_float("CACHE_ACCOUNTS_SWR_SECONDS", 30),
+        stale_if_error=env_float("CACHE_ACCOUNTS_SIE_SECONDS", 600),
+        refresh_ahead=0.2,
+    ),
+    # Per-user data: short grace periods and no refresh-ahead
+    "accounts/me": RoutePolicy(
+        ttl=DEFAULT_TTL,
+        stale_while_revalidate=env_float("CACHE_ME_SWR_SECONDS", 5),
+        stale_if_error=env_float("CACHE_ME_SIE_SECONDS", 60),
+    ),
+}
+
+DEFAULT_POLICY = RoutePolicy(ttl=DEFAULT_TTL)
@@ -0,0 +1,15 @@
+import os
+
+# Small helpers for reading cache node settings from the environment
+
+def env_int(name: str, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def env_float(name: str, default=None):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+def env_bool(name: str, default=False):
+    value = os.getenv(name)
+    return value.strip().lower() in ("1", "true", "yes", "on") if value else default
@@ -0,0 +1,27 @@
+import asyncio
+
+# Per-key request coalescing ("single flight").
+# The first caller for a key starts the fetch; every caller that arrives while it
+# is still running awaits the same task instead of starting its own.
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key: str, fn):
+        # Returns (result, shared) where shared is True if another caller did the work
+        task = self._inflight.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one cancelled waiter does not cancel the fetch for everyone else
+        return await asyncio.shield(task), shared
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    def __len__(self):
+        return len(self._inflight)
@@ -0,0 +1,81 @@
+import os
+import httpx
+from .settings import env_int, env_float
+
+# Async keep-alive connection pool to the API tier.
+# One client is shared by every request on a cache node so misses reuse open
+# connections instead of opening a new TCP connection each time.
+
+# Headers that only make sense for a single hop and must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host", "content-length",
+}
+
+
+def forwardable_headers(headers) -> dict:
+    return {k: v for k, v in headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+
+
+class UpstreamClient:
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 100,
+        keepalive: int = 100,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 5.0,
+        pool_timeout: float = 5.0,
+        keepalive_expiry: float = 4.0,
+        transport: httpx.AsyncBaseTransport = None,
+    ):
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=pool_timeout)
+        self.transport = transport
+        self._client = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base_url=os.getenv("CACHE_UPSTREAM_URL", "http://api:8000"),
+            pool_size=env_int("CACHE_POOL_SIZE", 100),
+            keepalive=env_int("CACHE_POOL_KEEPALIVE", 100),
+            connect_timeout=env_float("CACHE_CONNECT_TIMEOUT", 2.0),
+            read_timeout=env_float("CACHE_READ_TIMEOUT", 5.0),
+            pool_timeout=env_float("CACHE_POOL_TIMEOUT", 5.0),
+            # Keep below uvicorn's 5s keep-alive so we never reuse a socket the API just closed
+            keepalive_expiry=env_float("CACHE_KEEPALIVE_EXPIRY", 4.0),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+        return self._client
+
+    async def request(self, method: str, path: str, headers: dict = None, content: bytes = None, params=None) -> httpx.Response:
+        return await self.client.request(method, path, headers=headers, content=content, params=params)
+
+    async def stream(self, method: str, path: str, headers: dict = None, content: bytes = None, params=None) -> httpx.Response:
+        # Returns once the headers arrive; the caller reads the body as it comes and must aclose() it
+        request = self.client.build_request(method, path, headers=headers, content=content, params=params)
+        return await self.client.send(request, stream=True)
+
+    async def get(self, path: str, headers: dict = None, params=None) -> httpx.Response:
+        return await self.request("GET", path, headers=headers, params=params)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -1,12 +1,150 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from itertools import cycle
+import threading
+import time
 import os
 from dotenv import load_dotenv
+from backend.cachingsystem.settings import env_int, env_float, env_bool
 
 load_dotenv()
 
+# Primary (read/write) database plus optional read replicas.
+# DATABASE_URL is the primary; DATABASE_REPLICA_URLS is a comma-separated list of
+# replicas. Read-only routes take a session from get_read_db-style dependencies,
+# which round-robin over the replicas, except for a caller who wrote recently:
+# they stay on the primary for DB_STICKY_SECONDS so they read their own writes.
+# Pool settings are per role, e.g. DB_PRIMARY_POOL_SIZE / DB_REPLICA_POOL_SIZE.
+# With DB_ASYNC set, the hot read routes run on an asyncio engine instead
+# (asyncpg for Postgres, aiosqlite for SQLite) built from the same URLs and settings.
+
 DATABASE_URL = os.getenv("DATABASE_URL")
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+ASYNC_ROUTES = env_bool("DB_ASYNC", False)
+
+# Long enough to cover normal replication lag
+STICKY_SECONDS = env_float("DB_STICKY_SECONDS", 5.0)
+
+
+def engine_options(url: str, role: str, is_async: bool = False) -> dict:
+    # role is "PRIMARY" or "REPLICA"; every setting can be overridden per role
+    options = {
+        "echo": env_bool("DB_ECHO", False),
+        "pool_pre_ping": env_bool(f"DB_{role}_POOL_PRE_PING", True),
+    }
+    if url.startswith("sqlite") and (url.endswith("://") or ":memory:" in url):
+        # In-memory SQLite (tests) keeps SQLAlchemy's single-connection pool
+        return options
+    options.update(
+        pool_size=env_int(f"DB_{role}_POOL_SIZE", 10),
+        max_overflow=env_int(f"DB_{role}_MAX_OVERFLOW", 20),
+        pool_timeout=env_float(f"DB_{role}_POOL_TIMEOUT", 10.0),
+        pool_recycle=env_int(f"DB_{role}_POOL_RECYCLE", 1800),
+    )
+    timeout_ms = env_int(f"DB_{role}_STATEMENT_TIMEOUT_MS")
+    if timeout_ms and url.startswith("postgresql"):
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+def make_engine(url: str, role: str = "PRIMARY"):
+    return create_engine(url, **engine_options(url, role))
+
 
-engine = create_engine(DATABASE_URL, echo=True)
+engine = make_engine(DATABASE_URL, "PRIMARY")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+replica_engines = [make_engine(url, "REPLICA") for url in REPLICA_URLS]
+_replica_sessions = cycle([sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines])
+
+# Caller (bearer token) -> time until which their reads go to the primary
+_sticky = {}
+_sticky_lock = threading.Lock()
+
+
+def stick_to_primary(caller: str):
+    # Call after a write commits so the same caller's next reads see it
+    if not caller or not replica_engines:
+        return
+    now = time.monotonic()
+    with _sticky_lock:
+        if len(_sticky) > 10_000:
+            # Forget callers whose window has passed
+            for expired in [c for c, until in _sticky.items() if until <= now]:
+                del _sticky[expired]
+        _sticky[caller] = now + STICKY_SECONDS
+
+
+def is_sticky(caller: str) -> bool:
+    if not caller or not _sticky:
+        return False
+    with _sticky_lock:
+        until = _sticky.get(caller)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del _sticky[caller]
+            return False
+        return True
+
+
+def ReadSessionLocal(caller: str = None):
+    # Session for a read-only request: a replica, or the primary without replicas / for sticky callers
+    if not replica_engines or is_sticky(caller):
+        return SessionLocal()
+    with _sticky_lock:
+        factory = next(_replica_sessions)
+    return factory()
+
+
+# Async engines, created on first use so the async drivers are only needed with DB_ASYNC
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme.split("+")[0], scheme) + sep + rest
+
+
+def make_async_engine(url: str, role: str = "PRIMARY"):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    return create_async_engine(async_url(url), **engine_options(url, role, is_async=True))
+
+
+_async = {}
+
+
+def _async_sessions():
+    if not _async:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        primary = make_async_engine(DATABASE_URL, "PRIMARY")
+        replicas = [make_async_engine(url, "REPLICA") for url in REPLICA_URLS]
+        _async["engines"] = [primary] + replicas
+        _async["primary"] = async_sessionmaker(primary, expire_on_commit=False)
+        _async["replicas"] = cycle([async_sessionmaker(e, expire_on_commit=False) for e in replicas])
+    return _async
+
+
+def AsyncSessionLocal():
+    return _async_sessions()["primary"]()
+
+
+def AsyncReadSessionLocal(caller: str = None):
+    # Async twin of ReadSessionLocal, with the same replica choice and stickiness
+    sessions = _async_sessions()
+    if not REPLICA_URLS or is_sticky(caller):
+        return sessions["primary"]()
+    with _sticky_lock:
+        factory = next(sessions["replicas"])
+    return factory()
+
+
+async def dispose_async_engines():
+    for async_engine in _async.get("engines", ()):
+        await async_engine.dispose()
+    _async.clear()
@@ -0,0 +1,106 @@
+import json
+from collections import defaultdict
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from backend.cachingsystem.settings import env_bool
+from backend.models import Account, Tweet, Hashtag, Media
+from backend.models.association_model import tweet_hashtag_table
+
+# Fast-path JSON for the list endpoints, switched on with API_FAST_JSON=1.
+# Rows come straight from SQL result tuples (Core selects: no ORM objects, identity
+# map or Pydantic validation), are assembled into the same dicts the response
+# schemas / to_dict() produce, and encoded with orjson. The bytes are identical to
+# the regular path, so cached entries and ETags do not depend on which path made them.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_JSON = env_bool("API_FAST_JSON", False)
+
+ACCOUNT_COLUMNS = (Account.id, Account.username, Account.handle, Account.email, Account.created_at)
+TWEET_COLUMNS = (Tweet.id, Tweet.content, Tweet.created_at, Tweet.account_id, Tweet.likes)
+
+
+def dumps(content) -> bytes:
+    # Compact UTF-8 JSON, datetimes in ISO 8601 (what FastAPI/Pydantic send)
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, separators=(",", ":"), default=lambda value: value.isoformat()
+    ).encode("utf-8")
+
+
+def tweet_statements(ids):
+    # Tweets, their hashtags and their media for a list of ids; the sync and async
+    # routes run these and pass the rows to tweet_payloads
+    return (
+        select(*TWEET_COLUMNS)
+        .filter(Tweet.id.in_(ids)),
+        select(tweet_hashtag_table.c.tweet_id, Hashtag.id, Hashtag.tag)
+        .join(Hashtag, Hashtag.id == tweet_hashtag_table.c.hashtag_id)
+        .filter(tweet_hashtag_table.c.tweet_id.in_(ids)),
+        select(Media.tweet_id, Media.id, Media.media_type)
+        .filter(Media.tweet_id.in_(ids)),
+    )
+
+
+def tweet_payloads(tweets, hashtags, media) -> dict:
+    # {tweet id: TweetRead JSON bytes}
+    tags_by_tweet, media_by_tweet = defaultdict(list), defaultdict(list)
+    for tweet_id, hashtag_id, tag in hashtags:
+        tags_by_tweet[tweet_id].append({"tag": tag, "id": hashtag_id})
+    for tweet_id, media_id, media_type in media:
+        media_by_tweet[tweet_id].append({"media_type": media_type, "id": media_id, "tweet_id": tweet_id})
+    return {
+        tweet_id: dumps({
+            "content": content,
+            "id": tweet_id,
+            "created_at": created_at,
+            "account": {"id": account_id},
+            "likes": likes,
+            "hashtags": tags_by_tweet[tweet_id],
+            "media": media_by_tweet[tweet_id],
+        })
+        for tweet_id, content, created_at, account_id, likes in tweets
+    }
+
+
+def load_tweet_payloads(db: Session, ids) -> dict:
+    tweets, hashtags, media = (db.execute(stmt).all() for stmt in tweet_statements(ids))
+    return tweet_payloads(tweets, hashtags, media)
+
+
+def account_tweet(tweet_id, content, created_at, account_id, likes) -> dict:
+    # A tweet as Tweet.to_dict() produces it
+    return {
+        "id": tweet_id,
+        "content": content,
+        "created_at": int(created_at.timestamp() * 1000),
+        "account_id": account_id,
+        "likes": likes or 0,
+    }
+
+
+def account_item(account_id, username, handle, email, created_at, tweets) -> dict:
+    # One entry of the /api/accounts body
+    return {
+        "id": account_id,
+        "username": username,
+        "handle": handle,
+        "email": email,
+        "created_at": created_at.isoformat(),
+        "tweets": tweets,
+    }
+
+
+def account_list_body(db: Session) -> bytes:
+    # The /api/accounts body: every account with its tweets in Tweet.to_dict() form
+    tweets_by_account = defaultdict(list)
+    for row in db.execute(select(*TWEET_COLUMNS).order_by(Tweet.id)):
+        tweets_by_account[row.account_id].append(account_tweet(*row))
+    return dumps([
+        account_item(*row, tweets_by_account[row.id])
+        for row in db.execute(select(*ACCOUNT_COLUMNS))
+    ])
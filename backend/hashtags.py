@@ -0,0 +1,66 @@
+from sqlalchemy import select, insert, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from backend.models import Hashtag, Media
+from backend.models.association_model import tweet_hashtag_table
+
+# Batched writes for a tweet's hashtags and media.
+# Tags are resolved with one lookup for the ones that exist plus one
+# INSERT ... ON CONFLICT DO NOTHING RETURNING for the new ones, so the number of
+# round trips no longer grows with the number of tags. A tag created by a concurrent
+# post in between is skipped by the insert and picked up by a final lookup, instead
+# of failing on the unique constraint.
+
+# Dialects whose insert() supports ON CONFLICT DO NOTHING
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _lookup(db: Session, tags) -> dict:
+    return dict(db.execute(select(Hashtag.tag, Hashtag.id).filter(Hashtag.tag.in_(tags))).all())
+
+
+def resolve_hashtags(db: Session, tags) -> list:
+    # (id, tag) for every distinct tag, in the given order; creates the missing ones
+    tags = list(dict.fromkeys(tags))
+    if not tags:
+        return []
+    ids = _lookup(db, tags)
+    missing = [tag for tag in tags if tag not in ids]
+    if missing:
+        upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if upsert is None:
+            db.add_all(Hashtag(tag=tag) for tag in missing)
+            db.flush()
+        else:
+            stmt = (
+                upsert(Hashtag)
+                .values([{"tag": tag} for tag in missing])
+                .on_conflict_do_nothing(index_elements=["tag"])
+                .returning(Hashtag.tag, Hashtag.id)
+            )
+            ids.update(db.execute(stmt).all())
+        # Inserted by someone else since the first lookup
+        raced = [tag for tag in missing if tag not in ids]
+        if raced:
+            ids.update(_lookup(db, raced))
+    return [(ids[tag], tag) for tag in tags]
+
+
+def set_tweet_hashtags(db: Session, tweet_id: int, tags, replace: bool = False) -> list:
+    # Links the tweet to tags with one multi-row insert; returns the (id, tag) pairs linked
+    if replace:
+        db.execute(delete(tweet_hashtag_table).where(tweet_hashtag_table.c.tweet_id == tweet_id))
+    hashtags = resolve_hashtags(db, tags)
+    if hashtags:
+        db.execute(
+            insert(tweet_hashtag_table),
+            [{"tweet_id": tweet_id, "hashtag_id": hashtag_id} for hashtag_id, _ in hashtags],
+        )
+    return hashtags
+
+
+def set_tweet_media(db: Session, tweet_id: int, urls, replace: bool = False):
+    if replace:
+        db.execute(delete(Media).where(Media.tweet_id == tweet_id))
+    if urls:
+        db.execute(insert(Media), [{"url": url, "media_type": "image", "tweet_id": tweet_id} for url in urls])
@@ -5,6 +5,7 @@ from collections import defaultdict
 from sqlalchemy.orm import Session
 from backend.database import SessionLocal
 from backend.models import Tweet
+from backend.cachingsystem.invalidation import invalidation_bus, connect_cache_nodes, tweet_change_tags
 
 LOGGER_URL = "http://logger:8001/log"
 
@@ -31,6 +32,7 @@ def flush_likes():
                     if tweet:
                         tweet.likes = (tweet.likes or 0) + data["likes"]
                         db.commit()
+                        invalidation_bus.publish(tags=tweet_change_tags(tweet.id, tweet.account_id))
                         log_db_access(f"Flushed {data['likes']} likes to tweet {tweet_id}")
                     # Safely remove the key if it exists
                     like_batcher.pop(tweet_id, None)
@@ -41,6 +43,7 @@ def start_batcher():
     thread.start()
 
 if __name__ == "__main__":
+    connect_cache_nodes()
     start_batcher()
     print("Like batcher started and running...")
     try:
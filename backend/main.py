@@ -1,12 +1,20 @@
 import uvicorn
 from backend.routes.account_routes import router as account_router
 from backend.routes.tweet_routes import router as tweet_router
+from backend.routes.async_routes import router as async_router
+from backend.routes.admin_routes import router as admin_router
+from backend import database
 from backend.likebatcher.likebatcher import start_batcher
 from backend.logger.logger import LoggingRoute
+from backend.cachingsystem.invalidation import connect_cache_nodes, invalidation_bus
+from backend.typeahead import start_typeahead
+from backend.trending import start_trending
+from backend.passwords import password_hasher
 from fastapi import FastAPI, Request
 from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 import os
 
 load_dotenv()
@@ -24,7 +32,13 @@ class LoggingRoute(APIRoute):
             return await original_route_handler(request)
         return log_request
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await database.dispose_async_engines()
+    password_hasher.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 app.state.logs = []
 app.state.db_accesses = 0
 app.router.route_class = LoggingRoute
@@ -39,17 +53,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Set LoggingRoute as the default route class
 app.router.route_class = LoggingRoute
 
+# With DB_ASYNC, the async timeline/search/me routes are matched before their sync twins
+if database.ASYNC_ROUTES:
+    app.include_router(async_router)
 app.include_router(account_router)
 app.include_router(tweet_router)
+app.include_router(admin_router)
 
 # Start like batching function
 start_batcher()
 
+# Push cache invalidations to the cache nodes after every write
+connect_cache_nodes()
+
+# Only the writer is pinned to the primary, so another reader can refill a cache
+# from a replica still missing the write. Invalidations are delivered again once
+# the sticky window (the expected replication lag) has passed to evict those entries.
+if database.replica_engines:
+    invalidation_bus.replay_after = database.STICKY_SECONDS
+
+# Load the search-box typeahead indexes without holding up startup
+start_typeahead()
+
+# Rebuild the trending hashtag counts from the last day of tweets, also in the background
+start_trending()
+
 app.state.logs = []
 
 @app.get("/logs")
@@ -59,5 +93,10 @@ def get_logs():
         "db_accesses": app.state.db_accesses
     }
 
+# Password pool load: queue wait vs bcrypt time, in-flight and rejected calls
+@app.get("/stats/passwords")
+def get_password_stats():
+    return password_hasher.stats()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,39 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from backend.database import Base
+from backend.models.account_model import ACCOUNT_SEARCH_DDL
+from backend.models.hashtag_model import HASHTAG_SEARCH_DDL
+from backend.models.tweet_model import TWEET_SEARCH_DDL
+
+# Brings a database created by an older version up to the current models.
+# create_all only creates missing tables, so it never adds the columns, indexes,
+# search objects and triggers later added to existing ones. Every step checks first
+# or can be rerun, so this is safe on new and already upgraded databases too.
+# Run by backend/scripts/init_db.py.
+
+SEARCH_DDL = (ACCOUNT_SEARCH_DDL, HASHTAG_SEARCH_DDL, TWEET_SEARCH_DDL)
+
+
+def upgrade_schema(engine):
+    # New tables (follows, timeline_entries, bulk_imports) come with their indexes and DDL
+    Base.metadata.create_all(bind=engine)
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        if "follower_count" not in {column["name"] for column in inspector.get_columns("accounts")}:
+            # No follows could exist before the column, so every count starts at 0
+            conn.execute(text("ALTER TABLE accounts ADD COLUMN follower_count INTEGER NOT NULL DEFAULT 0"))
+            print("[UPGRADE] Added accounts.follower_count")
+        fts_missing = dialect == "sqlite" and not inspector.has_table("tweets_fts")
+
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+        for statements in SEARCH_DDL:
+            for statement in statements.get(dialect, ()):
+                conn.execute(text(statement))
+        if fts_missing:
+            # The triggers only cover tweets written from now on; index the existing ones
+            conn.execute(text("INSERT INTO tweets_fts(tweets_fts) VALUES ('rebuild')"))
+            print("[UPGRADE] Built the tweet search index")
+    print("[UPGRADE] Schema is up to date")
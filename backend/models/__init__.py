@@ -3,3 +3,6 @@ from .tweet_model import Tweet
 from .hashtag_model import Hashtag
 from .media_model import Media
 from .association_model import tweet_hashtag_table
+from .follow_model import Follow
+from .timeline_model import TimelineEntry
+from .bulk_model import BulkImport
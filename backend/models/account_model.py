@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, event
+from sqlalchemy import Column, Integer, String, DateTime, DDL, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -13,6 +13,8 @@ class Account(Base):
     email = Column(String(100), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(ZoneInfo('UTC')))
+    # Kept by the follow routes; decides whether this account's tweets are fanned out
+    follower_count = Column(Integer, default=0, server_default="0", nullable=False)
 
     tweets = relationship("Tweet", back_populates="account", cascade="all, delete-orphan")
 
@@ -30,4 +32,23 @@ class Account(Base):
             "email": self.email,
             "created_at": int(self.created_at.timestamp() * 1000)
         }
-    
\ No newline at end of file
+    
+
+# Search indexes on lower(username) and lower(email), same layout as the hashtag ones
+ACCOUNT_SEARCH_DDL = {
+    "postgresql": (
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_username_prefix ON accounts (lower(username) text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_email_prefix ON accounts (lower(email) text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_username_trgm ON accounts USING GIN (lower(username) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_email_trgm ON accounts USING GIN (lower(email) gin_trgm_ops)",
+    ),
+    "sqlite": (
+        "CREATE INDEX IF NOT EXISTS ix_accounts_username_lower ON accounts (lower(username))",
+        "CREATE INDEX IF NOT EXISTS ix_accounts_email_lower ON accounts (lower(email))",
+    ),
+}
+
+for dialect, statements in ACCOUNT_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Account.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
@@ -1,9 +1,11 @@
-from sqlalchemy import Table, Column, Integer, ForeignKey
+from sqlalchemy import Table, Column, Integer, ForeignKey, Index
 from backend.database import Base
 
 tweet_hashtag_table = Table(
     'tweet_hashtag',
     Base.metadata,
     Column('tweet_id', Integer, ForeignKey('tweets.id')),
-    Column('hashtag_id', Integer, ForeignKey('hashtags.id'))
+    Column('hashtag_id', Integer, ForeignKey('hashtags.id')),
+    # Counting a hashtag's uses (search popularity) without scanning every row
+    Index('ix_tweet_hashtag_hashtag_id', 'hashtag_id'),
 )
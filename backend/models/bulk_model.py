@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from backend.database import Base
+
+class BulkImport(Base):
+    # Ledger of a snapshot import (see backend/bulk.py): one row per imported chunk,
+    # committed with the chunk's rows, plus one per index dropped until the import ends
+    __tablename__ = 'bulk_imports'
+
+    snapshot = Column(String(64), primary_key=True)
+    # "<table>/<chunk file>" or "index:<index name>"
+    item = Column(String(255), primary_key=True)
+    rows = Column(Integer, default=0, nullable=False)
+    # CREATE INDEX statement of a dropped index
+    ddl = Column(Text)
+    created_at = Column(DateTime, default=lambda: datetime.now(ZoneInfo('UTC')))
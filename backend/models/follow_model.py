@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from backend.database import Base
+
+class Follow(Base):
+    __tablename__ = 'follows'
+    __table_args__ = (
+        # Fan-out looks up an author's followers
+        Index('ix_follows_followee_id', 'followee_id'),
+    )
+
+    follower_id = Column(Integer, ForeignKey('accounts.id'), primary_key=True)
+    followee_id = Column(Integer, ForeignKey('accounts.id'), primary_key=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(ZoneInfo('UTC')))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DDL, event
 from sqlalchemy.orm import relationship
 from backend.database import Base
 from .association_model import tweet_hashtag_table
@@ -19,4 +19,22 @@ class Hashtag(Base):
         return {
             "id": self.id,
             "tag": self.tag
-        }
\ No newline at end of file
+        }
+
+# Search indexes on lower(tag) (see backend/search.py):
+# Postgres: text_pattern_ops b-tree for "starts with" and a pg_trgm GIN index for
+# "contains"/similarity. SQLite: a plain lower(tag) index for the prefix range scan.
+HASHTAG_SEARCH_DDL = {
+    "postgresql": (
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_hashtags_tag_prefix ON hashtags (lower(tag) text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_hashtags_tag_trgm ON hashtags USING GIN (lower(tag) gin_trgm_ops)",
+    ),
+    "sqlite": (
+        "CREATE INDEX IF NOT EXISTS ix_hashtags_tag_lower ON hashtags (lower(tag))",
+    ),
+}
+
+for dialect, statements in HASHTAG_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Hashtag.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from backend.database import Base
+
+class TimelineEntry(Base):
+    # One tweet in one account's precomputed home timeline (see backend/timeline.py)
+    __tablename__ = 'timeline_entries'
+    __table_args__ = (
+        # A timeline page is one range scan, newest first
+        Index('ix_timeline_entries_account_created_at', 'account_id', 'created_at', 'tweet_id'),
+        Index('ix_timeline_entries_tweet_id', 'tweet_id'),
+    )
+
+    account_id = Column(Integer, ForeignKey('accounts.id'), primary_key=True)
+    tweet_id = Column(Integer, ForeignKey('tweets.id'), primary_key=True)
+    # Copied from the tweet so pages never join tweets
+    created_at = Column(DateTime, nullable=False)
+    author_id = Column(Integer, ForeignKey('accounts.id'), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index, DDL, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -7,6 +7,10 @@ from .association_model import tweet_hashtag_table
 
 class Tweet(Base):
     __tablename__ = 'tweets'
+    __table_args__ = (
+        # Backs keyset pagination on (created_at, id), newest first
+        Index('ix_tweets_created_at_id', 'created_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
@@ -35,4 +39,34 @@ class Tweet(Base):
             "created_at": int(self.created_at.timestamp() * 1000),
             "account_id": self.account_id,
             "likes": self.likes or 0
-        }
\ No newline at end of file
+        }
+
+# Full-text search index on tweet content, kept up to date by the database itself.
+# Postgres: a generated tsvector column (recomputed on every insert/edit) with a GIN index.
+# SQLite (tests/dev): an external-content FTS5 table synced by triggers.
+# Not mapped on the model; backend/search.py queries it directly.
+# Statements per dialect; all of them can be rerun (backend/migrations.py adds them to older databases).
+TWEET_SEARCH_DDL = {
+    "postgresql": (
+        "ALTER TABLE tweets ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_tweets_search_vector ON tweets USING GIN (search_vector)",
+    ),
+    "sqlite": (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts USING fts5("
+        "content, content='tweets', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS tweets_fts_insert AFTER INSERT ON tweets BEGIN "
+        "INSERT INTO tweets_fts(rowid, content) VALUES (new.id, new.content); END",
+        "CREATE TRIGGER IF NOT EXISTS tweets_fts_delete AFTER DELETE ON tweets BEGIN "
+        "INSERT INTO tweets_fts(tweets_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+        "CREATE TRIGGER IF NOT EXISTS tweets_fts_update AFTER UPDATE OF content ON tweets BEGIN "
+        "INSERT INTO tweets_fts(tweets_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+        "INSERT INTO tweets_fts(rowid, content) VALUES (new.id, new.content); END",
+    ),
+}
+
+for dialect, statements in TWEET_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Tweet.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+
+event.listen(Tweet.__table__, "before_drop", DDL("DROP TABLE IF EXISTS tweets_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,104 @@
+import json
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_
+from backend.models import Tweet
+
+# Keyset (cursor) pagination over tweets, newest first, on (created_at, id).
+# Each page continues strictly after the last row of the previous one, so the
+# database walks the (created_at, id) index from that point instead of skipping
+# over every earlier row like OFFSET would.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Response header carrying the opaque cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+
+def encode_cursor(created_at: datetime, tweet_id: int) -> str:
+    return _encode([created_at.isoformat(), tweet_id])
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, tweet_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(tweet_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_rank_cursor(rank: float, tweet_id: int) -> str:
+    # Ranked search pages continue after (rank, id) instead of (created_at, id)
+    return _encode([rank, tweet_id])
+
+
+def decode_rank_cursor(cursor: str):
+    try:
+        rank, tweet_id = _decode(cursor)
+        return float(rank), int(tweet_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _limited(stmt, limit):
+    return stmt if limit is None else stmt.limit(limit + 1)
+
+
+def recent_page(stmt, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, created_at=Tweet.created_at, id=Tweet.id):
+    # One page of stmt (a select of Tweet.id and Tweet.created_at, or of the given
+    # created_at/id columns, labelled "id" and "created_at"), newest first.
+    # One extra row is fetched to tell whether there is a next page; limit=None
+    # leaves the statement open-ended, for streaming every row after the cursor.
+    stmt = stmt.order_by(created_at.desc(), id.desc())
+    if cursor:
+        stmt = stmt.filter(tuple_(created_at, id) < decode_cursor(cursor))
+    return _limited(stmt, limit)
+
+
+def ranked_page(ranked, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    # ranked is a subquery with id and rank columns; best matches first, ties by newest id
+    stmt = select(ranked.c.id, ranked.c.rank).order_by(ranked.c.rank.desc(), ranked.c.id.desc())
+    if cursor:
+        stmt = stmt.filter(tuple_(ranked.c.rank, ranked.c.id) < decode_rank_cursor(cursor))
+    return _limited(stmt, limit)
+
+
+def recent_cursor(row) -> str:
+    return encode_cursor(row.created_at, row.id)
+
+
+def rank_cursor(row) -> str:
+    return encode_rank_cursor(row.rank, row.id)
+
+
+def split_page(rows, limit: int, cursor_for=recent_cursor):
+    # Rows from a *_page statement -> (ids, next_cursor)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = cursor_for(rows[-1])
+    return [row.id for row in rows], next_cursor
+
+
+def paginate_tweet_ids(db, stmt, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    return split_page(db.execute(recent_page(stmt, cursor, limit)).all(), limit, recent_cursor)
+
+
+def paginate_ranked_ids(db, ranked, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    return split_page(db.execute(ranked_page(ranked, cursor, limit)).all(), limit, rank_cursor)
+
+
+def page_headers(next_cursor: str) -> dict:
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
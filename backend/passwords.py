@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import types
+import asyncio
+import threading
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from passlib.context import CryptContext
+from backend.cachingsystem.settings import env_int
+
+# Password hashing on its own bounded worker pool.
+# bcrypt is deliberately slow (hundreds of ms of CPU per call). Run inline, a burst of
+# logins/signups would hold Starlette's shared threadpool (and the GIL) and stall
+# every other sync route. Instead the async login/signup routes hand the work to a
+# dedicated pool: processes by default (PASSWORD_HASH_POOL=thread for threads), with
+# PASSWORD_HASH_WORKERS workers. At most PASSWORD_HASH_MAX_QUEUE calls may wait on top
+# of the ones running; past that, calls fail fast with HashPoolSaturated (a 503)
+# instead of queueing unboundedly. Queue wait and hash time are tracked separately.
+
+WORKERS = env_int("PASSWORD_HASH_WORKERS", os.cpu_count() or 2)
+MAX_QUEUE = env_int("PASSWORD_HASH_MAX_QUEUE", 64)
+POOL_KIND = os.getenv("PASSWORD_HASH_POOL", "process")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# Spawned workers re-import the parent's __main__ module, which for the API is
+# backend.main: its startup (like batcher, cache fan-out, typeahead and trending
+# loads) would run again in every worker. Workers are started with this empty
+# stand-in as __main__ instead (no __spec__ or __file__, so nothing to re-import).
+_WORKER_MAIN = types.ModuleType("__main__")
+
+
+@contextmanager
+def _plain_main():
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = _WORKER_MAIN
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+class HashPoolSaturated(Exception):
+    pass
+
+
+def _work(op: str, *args):
+    # Runs in the worker; returns (result, started, finished) on the wall clock,
+    # which processes share
+    started = time.time()
+    result = pwd_context.hash(*args) if op == "hash" else pwd_context.verify(*args)
+    return result, started, time.time()
+
+
+def _percentile(samples, fraction: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = WORKERS, max_queue: int = MAX_QUEUE, kind: str = POOL_KIND, samples: int = 1000):
+        self.workers, self.max_queue, self.kind = workers, max_queue, kind
+        self._executor = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self._waits = deque(maxlen=samples)
+        self._hash_times = deque(maxlen=samples)
+
+    def _pool(self):
+        # Created on first use, so importing the app never forks
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _submit(self, op: str, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HashPoolSaturated()
+            self._in_flight += 1
+            submitted = time.time()
+            try:
+                # Workers are started on demand, inside submit()
+                with _plain_main() if self.kind == "process" else nullcontext():
+                    future = self._pool().submit(_work, op, *args)
+            except BaseException:
+                self._in_flight -= 1
+                raise
+        try:
+            result, started, finished = await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        with self._lock:
+            self.completed += 1
+            self._waits.append(max(started - submitted, 0.0))
+            self._hash_times.append(finished - started)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit("verify", password, hashed)
+
+    def stats(self) -> dict:
+        # Seconds, over the last `samples` calls
+        with self._lock:
+            waits, hash_times = list(self._waits), list(self._hash_times)
+            return {
+                "pool": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_p50": _percentile(waits, 0.5),
+                "queue_wait_p99": _percentile(waits, 0.99),
+                "hash_time_p50": _percentile(hash_times, 0.5),
+                "hash_time_p99": _percentile(hash_times, 0.99),
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,53 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+from backend.cachingsystem.engine import Cache
+from backend.cachingsystem.invalidation import invalidation_bus, principal_tag
+from backend.cachingsystem.settings import env_int
+from backend.models import Account
+
+# Authenticated principals, cached per token.
+# Every authenticated route needs the caller's account id (and a few other fields),
+# not the ORM row, so the account is loaded once per token and kept as a small
+# immutable record under (subject, expiry) for PRINCIPAL_CACHE_TTL seconds, never
+# past the token's own expiry. Writes that change those fields publish
+# principal_tag(username) on the invalidation bus; other API instances catch up
+# within the TTL.
+
+PRINCIPAL_TTL = env_int("PRINCIPAL_CACHE_TTL", 30)
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    handle: str
+    follower_count: int
+
+
+principal_cache = Cache(expiration_time=PRINCIPAL_TTL, max_entries=100_000)
+invalidation_bus.subscribe(principal_cache.invalidate)
+
+
+def load_principal(sessions, username: str, expires: int) -> Optional[Principal]:
+    # None when the account does not exist (deleted since the token was issued).
+    # sessions: a session factory, so a cache hit never opens a session
+    key = f"{username}:{expires}"
+    principal = principal_cache.get(key)
+    if principal is not None:
+        return principal
+    generation = principal_cache.generation
+    with sessions() as db:
+        row = (
+            db.query(Account.id, Account.username, Account.handle, Account.follower_count)
+            .filter(Account.username == username)
+            .first()
+        )
+    if row is None:
+        return None
+    principal = Principal(*row)
+    ttl = min(PRINCIPAL_TTL, expires - time.time())
+    # Skip caching if an invalidation ran while the row was being read
+    if ttl > 0 and principal_cache.generation == generation:
+        principal_cache.set(key, principal, ttl=ttl, tags=[principal_tag(username)])
+    return principal
@@ -1,7 +1,7 @@
-from fastapi import FastAPI, HTTPException, Depends, Form, APIRouter, Request
+from fastapi import FastAPI, HTTPException, Depends, Form, APIRouter, Request, Query
 from typing import List
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from backend.database import SessionLocal
 from backend.auth import auth_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, get_current_user
 from datetime import timedelta
@@ -9,8 +9,18 @@ from jose import JWTError, jwt
 from dotenv import load_dotenv
 import os
 from backend import database
+from backend.cachingsystem.invalidation import invalidation_bus, ACCOUNTS_TAG, principal_tag
+from backend.cachingsystem.etags import conditional_response, json_body
 from backend.models import Account, Tweet, Hashtag, Media
-from backend.schemas.account import AccountRead, AccountCreate, AccountBase, AccountCredentials, SearchRequest
+from backend.schemas.account import AccountRead, AccountCreate, AccountBase, AccountCredentials, AccountSearchRequest
+from backend.search import search_accounts as account_matches
+from backend.typeahead import account_index
+from backend.timeline import follow, unfollow
+from backend.principals import Principal, load_principal
+from backend.passwords import password_hasher, HashPoolSaturated
+from backend.fastjson import FAST_JSON, account_list_body
+from backend.streaming import wants_stream, ndjson_response, get_read_sessions, account_lines
+from fastapi.concurrency import run_in_threadpool
 from backend.schemas.tweet import TweetRead, TweetCreate, TweetUpdate, TweetBase
 from backend.schemas.media import MediaBase, MediaCreate, MediaRead
 from fastapi.security import OAuth2PasswordBearer
@@ -35,6 +45,34 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# Same, on the bounded password pool; 503 when it is saturated
+busy_exception = HTTPException(
+    status_code=503,
+    detail="Too many logins right now, try again shortly",
+    headers={"Retry-After": "1"}
+)
+
+async def hash_off_threadpool(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except HashPoolSaturated:
+        raise busy_exception
+
+async def verify_off_threadpool(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HashPoolSaturated:
+        raise busy_exception
+
+# Eager-loading plans. Each relationship is loaded for all parents at once with
+# one SELECT ... WHERE id IN (...), so a request costs a fixed number of queries
+# however many accounts and tweets it returns (no lazy load per row).
+ACCOUNT_TWEETS = (selectinload(Account.tweets),)
+ACCOUNT_GRAPH = (
+    selectinload(Account.tweets).selectinload(Tweet.hashtags),
+    selectinload(Account.tweets).selectinload(Tweet.media),
+)
+
 # Database session dependency
 def get_db(request: Request):
     request.app.state.db_accesses += 1
@@ -44,6 +82,15 @@ def get_db(request: Request):
     finally: 
         db.close()
 
+# Read-only database session: a replica when configured, unless this caller wrote recently
+def get_read_db(request: Request):
+    request.app.state.db_accesses += 1
+    db = database.ReadSessionLocal(request.headers.get("authorization"))
+    try:
+        yield db
+    finally: 
+        db.close()
+
 # Authenticate User (login by username)
 def auth_user(db: Session, username: str, password: str):
     user = db.query(Account).filter(Account.username == username).first()
@@ -54,13 +101,14 @@ def auth_user(db: Session, username: str, password: str):
 # JWT Authentication Dependency
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/accounts/login")
 
-# Function to get the current logged-in user from the token
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"}
-    )
+credentials_exception = HTTPException(
+    status_code=401,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"}
+)
+
+# (username, expiry) from the token, without touching the database
+def token_subject(token: str = Depends(oauth2_scheme)) -> tuple:
     try:
         # Decode the JWT token to get user details
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -69,9 +117,22 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    # Fetch the user from the database
-    user = db.query(Account).filter(Account.username == username).first()
+    return username, payload.get("exp", 0)
+
+def current_username(subject: tuple = Depends(token_subject)) -> str:
+    return subject[0]
+
+# Session factory for the principal lookup; a session is only opened (and counted) on a cache miss
+def get_principal_sessions(request: Request):
+    def open_session():
+        request.app.state.db_accesses += 1
+        return database.SessionLocal()
+    return open_session
+
+# The current logged-in account as a cached, read-only Principal (id, username, ...);
+# load the Account row in the route if it needs more
+def get_current_user(subject: tuple = Depends(token_subject), sessions = Depends(get_principal_sessions)) -> Principal:
+    user = load_principal(sessions, *subject)
     if user is None:
         raise credentials_exception
     return user
@@ -79,47 +140,66 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
 # Routes
 
 # Create account
+# Async so the bcrypt hash waits on the password pool (backend/passwords.py) without
+# holding a threadpool worker; the database part still runs on the threadpool
 @router.post("/api/accounts", response_model=AccountRead)
-def create_account(account: AccountCreate, db: Session = Depends(get_db), request: Request = None):
+async def create_account(account: AccountCreate, db: Session = Depends(get_db), request: Request = None):
     request.app.state.logs.append(f"DB Access: method='{request.method}' Create account")
-    hashed_pw = hash_password(account.password)
+    hashed_pw = await hash_off_threadpool(account.password)
 
-    new_account = Account(
-        username=account.username,
-        email=account.email,
-        handle=account.handle,
-        password=hashed_pw 
-    )
-    db.add(new_account)
-    db.commit()
-    db.refresh(new_account)
-    return new_account
+    def save():
+        new_account = Account(
+            username=account.username,
+            email=account.email,
+            handle=account.handle,
+            password=hashed_pw 
+        )
+        db.add(new_account)
+        db.commit()
+        invalidation_bus.publish(tags=[ACCOUNTS_TAG, principal_tag(new_account.username)])
+        db.refresh(new_account)
+        account_index.add(new_account.id, new_account.username, (new_account.username, new_account.handle))
+        # Serialized here, where loading its (empty) tweets may block
+        return AccountRead.model_validate(new_account)
+
+    return await run_in_threadpool(save)
 
 # Login with username
 @router.post("/api/accounts/login")
-def login(
+async def login(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
     db: Session = Depends(get_db)
 ):
     request.app.state.logs.append(f"DB Access: method='{request.method}' Login")
-    user = auth_user(db, username, password)
-    if not user:
+    user = await run_in_threadpool(lambda: db.query(Account.username, Account.password).filter(Account.username == username).first())
+    if not user or not await verify_off_threadpool(password, user.password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
     access_token = create_access_token(
         data={"sub": user.username},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
+    # A just-created account may not have reached the replicas yet
+    database.stick_to_primary(f"Bearer {access_token}")
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Get all accounts
 @router.get("/api/accounts")
-def get_all_accounts(db: Session = Depends(get_db), request: Request = None):
+def get_all_accounts(
+    stream: bool = Query(False),
+    db: Session = Depends(get_read_db),
+    sessions = Depends(get_read_sessions),
+    request: Request = None,
+):
     request.app.state.logs.append(f"DB Access: method='{request.method}' Fetch all accounts")
-    accounts = db.query(Account).all()
-    return [
+    if wants_stream(request, stream):
+        return ndjson_response(account_lines(sessions))
+    if FAST_JSON:
+        return conditional_response(request.headers.get("if-none-match"), account_list_body(db))
+    accounts = db.query(Account).options(*ACCOUNT_TWEETS).all()
+    payload = [
         {
             "id": account.id,
             "username": account.username,
@@ -130,30 +210,65 @@ def get_all_accounts(db: Session = Depends(get_db), request: Request = None):
         }
         for account in accounts
     ]
+    return conditional_response(request.headers.get("if-none-match"), json_body(payload))
 
 # Search accounts
 @router.post("/api/accounts/search", response_model=List[AccountRead])
-def search_accounts(request: SearchRequest, db: Session = Depends(get_db), req: Request = None):
+def search_accounts(request: AccountSearchRequest, db: Session = Depends(get_read_db), req: Request = None):
     req.app.state.logs.append(f"DB Access: Search accounts with query '{request.query}'")
-    accounts = db.query(Account).filter(
-        Account.username.ilike(f"%{request.query}%") | Account.email.ilike(f"%{request.query}%")
-    ).all()
-    return accounts
+    # The index picks the accounts; they embed their tweets, so those rows still come from the database by id
+    if account_index.ready:
+        ids = account_index.top(request.query, request.limit)
+        if ids:
+            accounts = {a.id: a for a in db.query(Account).options(*ACCOUNT_GRAPH).filter(Account.id.in_(ids))}
+            return [accounts[i] for i in ids if i in accounts]
+    return account_matches(db, request.query, request.limit, options=ACCOUNT_GRAPH)
 
 # Get current logged-in user's data
 @router.get("/api/accounts/me", response_model=AccountRead)
-def get_current_account(current_user: Account = Depends(get_current_user), db: Session = Depends(get_db), request: Request = None):
+def get_current_account(username: str = Depends(current_username), db: Session = Depends(get_read_db), request: Request = None):
+    # One session per request: the token names the user, the read session loads them
     request.app.state.logs.append(f"DB Access: method='{request.method}' Fetch current user's account")
-    user = db.query(Account).filter(Account.username == current_user.username).first()
+    user = db.query(Account).options(*ACCOUNT_GRAPH).filter(Account.username == username).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+# Follow an account; its tweets show up in the follower's home timeline
+@router.post("/api/accounts/{username}/follow")
+def follow_account(username: str, request: Request, db: Session = Depends(get_db), current_account: Principal = Depends(get_current_user)):
+    request.app.state.logs.append(f"DB Access: method='{request.method}' Follow '{username}'")
+    followee = db.query(Account).filter(Account.username == username).first()
+    if not followee:
+        raise HTTPException(status_code=404, detail="Account not found")
+    if followee.id == current_account.id:
+        raise HTTPException(status_code=400, detail="You can't follow yourself")
+    if follow(db, current_account.id, followee):
+        db.commit()
+        database.stick_to_primary(request.headers.get("authorization"))
+        # The followee's follower count is part of their principal
+        invalidation_bus.publish(tags=[principal_tag(username)])
+    return {"message": f"Following {username}"}
+
+# Unfollow an account
+@router.delete("/api/accounts/{username}/follow")
+def unfollow_account(username: str, request: Request, db: Session = Depends(get_db), current_account: Principal = Depends(get_current_user)):
+    request.app.state.logs.append(f"DB Access: method='{request.method}' Unfollow '{username}'")
+    followee = db.query(Account).filter(Account.username == username).first()
+    if not followee:
+        raise HTTPException(status_code=404, detail="Account not found")
+    if unfollow(db, current_account.id, followee):
+        db.commit()
+        database.stick_to_primary(request.headers.get("authorization"))
+        # The followee's follower count is part of their principal
+        invalidation_bus.publish(tags=[principal_tag(username)])
+    return {"message": f"Unfollowed {username}"}
+
 # Get account by username
 @router.get("/api/accounts/{username}", response_model=AccountRead)
-def get_account(username: str, db: Session = Depends(get_db), request: Request = None):
+def get_account(username: str, db: Session = Depends(get_read_db), request: Request = None):
     request.app.state.logs.append(f"DB Access: method='{request.method}' Fetch account with username '{username}'")
-    account = db.query(Account).filter(Account.username == username).first()
+    account = db.query(Account).options(*ACCOUNT_GRAPH).filter(Account.username == username).first()
 
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
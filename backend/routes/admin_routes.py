@@ -0,0 +1,98 @@
+from fastapi import APIRouter, HTTPException, Depends, Header
+from typing import Optional
+import os
+import secrets
+import threading
+import uuid
+from backend import database
+from backend.bulk import export_snapshot, import_snapshot, BulkReport, CHUNK_ROWS
+from backend.schemas import BulkRequest
+from backend.cachingsystem.invalidation import invalidation_bus, TWEETS_TAG, ACCOUNTS_TAG, TWEET_LISTS_TAG, TWEET_SEARCH_TAG
+from backend.typeahead import start_typeahead
+from backend.trending import start_trending
+
+# Admin endpoints for bulk export/import (see backend/bulk.py).
+# Only served with ADMIN_TOKEN set, to callers sending it as X-Admin-Token; they sit
+# outside /api/, so nginx never routes them. Snapshots are directories under BULK_DIR
+# on the API host. A job runs in the background, one at a time; poll its status for
+# rows and rows/sec per table.
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+BULK_DIR = os.getenv("BULK_DIR", "bulk")
+
+router = APIRouter(prefix="/admin")
+
+# Job id -> status dict, newest jobs only
+jobs = {}
+_jobs_lock = threading.Lock()
+
+
+# Jobs run outside the request, so they get a session factory rather than a session
+def get_sessions():
+    return database.SessionLocal
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def after_import():
+    # New rows everywhere: drop the cached lists and reload the in-memory indexes
+    invalidation_bus.publish(tags=[TWEETS_TAG, ACCOUNTS_TAG, TWEET_LISTS_TAG, TWEET_SEARCH_TAG])
+    start_typeahead()
+    start_trending()
+
+
+def _run(job: dict, report: BulkReport, request: BulkRequest, sessions):
+    directory = os.path.join(BULK_DIR, request.snapshot)
+    try:
+        with sessions() as db:
+            if job["kind"] == "export":
+                export_snapshot(db, directory, request.chunk_rows or CHUNK_ROWS, report)
+            else:
+                import_snapshot(db, directory, report)
+                after_import()
+        job["state"] = "done"
+    except Exception as e:
+        print(f"[BULK] {job['kind']} of {request.snapshot} failed: {e}")
+        job["state"], job["error"] = "failed", str(e)
+    finally:
+        report.finish()
+
+
+def start_job(kind: str, request: BulkRequest, sessions) -> dict:
+    with _jobs_lock:
+        if any(job["state"] == "running" for job in jobs.values()):
+            raise HTTPException(status_code=409, detail="A bulk job is already running")
+        report = BulkReport()
+        job = {"id": uuid.uuid4().hex, "kind": kind, "snapshot": request.snapshot, "state": "running", "error": None, "report": report}
+        jobs[job["id"]] = job
+        if len(jobs) > 100:
+            del jobs[next(iter(jobs))]
+    threading.Thread(target=_run, args=(job, report, request, sessions), daemon=True).start()
+    return job_status(job)
+
+
+def job_status(job: dict) -> dict:
+    return {**{k: v for k, v in job.items() if k != "report"}, **job["report"].as_dict()}
+
+
+@router.post("/bulk/export", status_code=202, dependencies=[Depends(require_admin)])
+def start_export(request: BulkRequest, sessions = Depends(get_sessions)):
+    return start_job("export", request, sessions)
+
+
+@router.post("/bulk/import", status_code=202, dependencies=[Depends(require_admin)])
+def start_import(request: BulkRequest, sessions = Depends(get_sessions)):
+    return start_job("import", request, sessions)
+
+
+@router.get("/bulk/jobs/{job_id}", dependencies=[Depends(require_admin)])
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
@@ -0,0 +1,111 @@
+from fastapi import HTTPException, Depends, Query, APIRouter, Request
+from typing import Optional, List
+from sqlalchemy import select
+
+from backend import database
+from backend.models import Tweet, Account
+from backend.schemas import TweetRead, TweetSearchRequest
+from backend.schemas.account import AccountRead
+from backend.search import search_page
+from backend.pagination import recent_page, recent_cursor, split_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from backend.routes.tweet_routes import (
+    tweet_cache, TWEET_GRAPH, cache_loaded_tweets, cache_tweet_payloads, tweets_response, list_cache_key, list_cache_tags,
+)
+from backend.fastjson import FAST_JSON, tweet_statements, tweet_payloads
+from backend.streaming import wants_stream, ndjson_response, get_async_read_sessions, tweet_stream, async_tweet_lines
+from backend.routes.account_routes import ACCOUNT_GRAPH, current_username, credentials_exception
+
+# Async versions of the hottest read endpoints, on the asyncio database engine.
+# Included ahead of the sync routers when DB_ASYNC is set, so they take over the same
+# paths; while a request waits on the database the event loop serves other requests
+# instead of holding one of the threadpool's workers.
+# Caching, pagination and response bodies are shared with the sync routes.
+
+router = APIRouter()
+
+async def get_async_read_db(request: Request):
+    request.app.state.db_accesses += 1
+    db = database.AsyncReadSessionLocal(request.headers.get("authorization"))
+    try:
+        yield db
+    finally:
+        await db.close()
+
+async def load_tweets(db, ids):
+    generation = tweet_cache.generation
+    payloads, missing = tweet_cache.get_tweets(ids)
+    if FAST_JSON:
+        loaded = {}
+        if missing:
+            tweets, hashtags, media = [(await db.execute(stmt)).all() for stmt in tweet_statements(missing)]
+            loaded = tweet_payloads(tweets, hashtags, media)
+        return cache_tweet_payloads(payloads, ids, loaded, generation)
+    rows = []
+    if missing:
+        result = await db.execute(select(Tweet).options(*TWEET_GRAPH).filter(Tweet.id.in_(missing)))
+        rows = result.scalars().all()
+    return cache_loaded_tweets(payloads, ids, rows, generation)
+
+async def tweet_page(db, q: Optional[str], cursor: Optional[str], limit: int):
+    cache_key = list_cache_key(q, cursor, limit)
+    generation = tweet_cache.generation
+    page = tweet_cache.get_page(cache_key)
+    if page is None:
+        if q:
+            built = search_page(q, db.bind.dialect.name, cursor, limit)
+        else:
+            built = recent_page(select(Tweet.id, Tweet.created_at), cursor, limit), recent_cursor
+        if built is None:
+            ids, next_cursor = [], None
+        else:
+            stmt, cursor_for = built
+            ids, next_cursor = split_page((await db.execute(stmt)).all(), limit, cursor_for)
+        tweet_cache.set_page(cache_key, ids, next_cursor, tags=list_cache_tags(q), generation=generation)
+        page = (ids, next_cursor)
+    return page
+
+# Timeline
+@router.get("/api/tweets", response_model=List[TweetRead])
+async def get_tweets(
+    request: Request,
+    q: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    stream: bool = Query(False),
+    db = Depends(get_async_read_db),
+    sessions = Depends(get_async_read_sessions),
+):
+    request.app.state.logs.append(f"DB Access: method='{request.method}' Get all tweets")
+    if wants_stream(request, stream):
+        return ndjson_response(async_tweet_lines(sessions, tweet_stream(db.bind.dialect.name, q, cursor)))
+    ids, next_cursor = await tweet_page(db, q, cursor, limit)
+
+    if not ids and cursor is None:
+        raise HTTPException(status_code=404, detail="No tweets found")
+
+    return tweets_response(request, await load_tweets(db, ids), next_cursor)
+
+# Tweet search
+@router.post("/api/tweets/search", response_model=List[TweetRead])
+async def search_tweets(
+    search: TweetSearchRequest,
+    request: Request,
+    stream: bool = Query(False),
+    db = Depends(get_async_read_db),
+    sessions = Depends(get_async_read_sessions),
+):
+    request.app.state.logs.append(f"DB Access: Search tweets with query '{search.query}'")
+    if wants_stream(request, stream):
+        return ndjson_response(async_tweet_lines(sessions, tweet_stream(db.bind.dialect.name, search.query, search.cursor)))
+    ids, next_cursor = await tweet_page(db, search.query, search.cursor, search.limit)
+    return tweets_response(request, await load_tweets(db, ids), next_cursor)
+
+# Current logged-in user's data
+@router.get("/api/accounts/me", response_model=AccountRead)
+async def get_current_account(request: Request, username: str = Depends(current_username), db = Depends(get_async_read_db)):
+    request.app.state.logs.append(f"DB Access: method='{request.method}' Fetch current user's account")
+    result = await db.execute(select(Account).options(*ACCOUNT_GRAPH).filter(Account.username == username))
+    user = result.scalars().first()
+    if user is None:
+        raise credentials_exception
+    return user
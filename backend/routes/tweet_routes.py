@@ -1,16 +1,19 @@
 from fastapi import FastAPI, HTTPException, Depends, Query, Path, APIRouter, Request
-from typing import Optional, List
-from sqlalchemy import func
+from typing import Optional, List, Literal
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 import sys
 import os
 from collections import defaultdict
 import time
-from backend.cachingsystem.cache import Cache
+from backend.tweet_cache import TweetCache, serialize_tweet, compose_list
+from backend.cachingsystem.invalidation import invalidation_bus, tweet_change_tags, TWEET_LISTS_TAG, TWEET_SEARCH_TAG
+from backend.cachingsystem.etags import conditional_response
 from backend.likebatcher.likebatcher import like_batcher, start_batcher
 
-# Initializing cache functionality
-cache = Cache()
+# Initializing cache functionality: tweets cached by id, lists cached as id lists
+tweet_cache = TweetCache(ttl=60)
+invalidation_bus.subscribe(tweet_cache.invalidate)
 
 # Start like batcher
 start_batcher()
@@ -19,12 +22,71 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from backend import database
 from backend.models import Tweet, Hashtag, Media, Account
-from backend.schemas import tweet, media, account, SearchRequest, TweetRead, HashtagRead
-from backend.routes.account_routes import get_current_user
-from sqlalchemy.orm import joinedload
+from backend.schemas import tweet, media, account, HashtagSearchRequest, TweetSearchRequest, TweetRead, HashtagRead, TrendingHashtag
+from backend.search import search_tweet_ids, search_hashtags as hashtag_matches
+from backend.typeahead import hashtag_index, account_index, hashtags_changed
+from backend.hashtags import set_tweet_hashtags, set_tweet_media
+from backend.timeline import fan_out, forget_tweet, timeline_page
+from backend.trending import trending, count_in_db
+from backend.fastjson import FAST_JSON, load_tweet_payloads
+from backend.pagination import paginate_tweet_ids, split_page, page_headers, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from backend.streaming import wants_stream, ndjson_response, get_read_sessions, tweet_stream, tweet_lines
+from backend.routes.account_routes import get_current_user, current_username, credentials_exception
+from backend.principals import Principal
+from sqlalchemy.orm import joinedload, selectinload
 
 router = APIRouter()
 
+# Everything TweetRead serializes, loaded up front
+TWEET_GRAPH = (joinedload(Tweet.account), selectinload(Tweet.hashtags), selectinload(Tweet.media))
+
+def cache_loaded_tweets(payloads, ids, rows, generation: int):
+    # Serializes freshly loaded rows into the entity cache; returns the list bodies in id order
+    return cache_tweet_payloads(payloads, ids, {row.id: serialize_tweet(row) for row in rows}, generation)
+
+def cache_tweet_payloads(payloads, ids, loaded, generation: int):
+    # generation: tweet_cache.generation from before the rows were read
+    tweet_cache.put_tweets(loaded, generation)
+    payloads.update(loaded)
+    # Keep list order; skip tweets deleted since the id list was cached
+    return [payloads[i] for i in ids if i in payloads]
+
+def load_tweets(db: Session, ids):
+    # Multi-get through the entity cache; only tweets missing from it are loaded
+    generation = tweet_cache.generation
+    payloads, missing = tweet_cache.get_tweets(ids)
+    if FAST_JSON:
+        return cache_tweet_payloads(payloads, ids, load_tweet_payloads(db, missing) if missing else {}, generation)
+    rows = db.query(Tweet).options(*TWEET_GRAPH).filter(Tweet.id.in_(missing)).all() if missing else []
+    return cache_loaded_tweets(payloads, ids, rows, generation)
+
+def list_cache_key(q: Optional[str], cursor: Optional[str], limit: int) -> str:
+    return f"tweets_{q}_{cursor}_{limit}"
+
+def list_cache_tags(q: Optional[str]) -> list:
+    return [TWEET_LISTS_TAG, TWEET_SEARCH_TAG] if q else [TWEET_LISTS_TAG]
+
+def tweets_response(request: Request, payloads, next_cursor: str = None):
+    # Same body response_model would produce, plus an ETag (304 on If-None-Match)
+    # and the cursor for the next page
+    return conditional_response(request.headers.get("if-none-match"), compose_list(payloads), headers=page_headers(next_cursor))
+
+def tweet_page(db: Session, q: Optional[str], cursor: Optional[str], limit: int):
+    # One page of tweet ids (matching q, if given) through the list cache; returns (ids, next_cursor)
+    cache_key = list_cache_key(q, cursor, limit)
+    generation = tweet_cache.generation
+    page = tweet_cache.get_page(cache_key)
+    if page is None:
+        # If not in cache, query the database for the matching ids only:
+        # full-text ranked matches when searching, newest first otherwise
+        if q:
+            ids, next_cursor = search_tweet_ids(db, q, cursor, limit)
+        else:
+            ids, next_cursor = paginate_tweet_ids(db, select(Tweet.id, Tweet.created_at), cursor, limit)
+        tweet_cache.set_page(cache_key, ids, next_cursor, tags=list_cache_tags(q), generation=generation)
+        page = (ids, next_cursor)
+    return page
+
 def get_db(request: Request):
     request.app.state.db_accesses += 1
     db = database.SessionLocal()
@@ -33,37 +95,61 @@ def get_db(request: Request):
     finally: 
         db.close()
 
+# Read-only database session: a replica when configured, unless this caller wrote recently
+def get_read_db(request: Request):
+    request.app.state.db_accesses += 1
+    db = database.ReadSessionLocal(request.headers.get("authorization"))
+    try:
+        yield db
+    finally: 
+        db.close()
+
 @router.get("/")
 def index(): 
     return {"name": "Homepage?"} #Maybe all tweets show up here idk
 
-# Get all tweets
+# Get all tweets, newest first, one page at a time
 @router.get("/api/tweets", response_model=List[tweet.TweetRead])
-def get_tweets(request: Request, q: Optional[str] = Query(None), db: Session = Depends(get_db)):
+def get_tweets(
+    request: Request,
+    q: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    stream: bool = Query(False),
+    db: Session = Depends(get_read_db),
+    sessions = Depends(get_read_sessions),
+):
     request.app.state.logs.append(f"DB Access: method='{request.method}' Get all tweets")
-    cache_key = f"tweets_{q}"
-    cached_tweets = cache.get(cache_key)
-    if cached_tweets:
-        return cached_tweets
-    # If not in cache, query the database
-    query = db.query(Tweet).options(joinedload(Tweet.account))
-
-    if q:
-        query = query.filter(Tweet.content.ilike(f"%{q}%"))
-
-    tweets = query.all()
+    if wants_stream(request, stream):
+        return ndjson_response(tweet_lines(sessions, tweet_stream(db.get_bind().dialect.name, q, cursor)))
+    ids, next_cursor = tweet_page(db, q, cursor, limit)
 
-    if not tweets:
+    if not ids and cursor is None:
         raise HTTPException(status_code=404, detail="No tweets found")
 
-    # Cache the result
-    cache.set(cache_key, tweets)
-    return tweets
+    return tweets_response(request, load_tweets(db, ids), next_cursor)
 
 
+# Home timeline: own tweets and those of followed accounts
+@router.get("/api/timeline", response_model=List[TweetRead])
+def get_timeline(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    username: str = Depends(current_username),
+    db: Session = Depends(get_read_db),
+):
+    request.app.state.logs.append(f"DB Access: method='{request.method}' Get home timeline")
+    account_id = db.query(Account.id).filter(Account.username == username).scalar()
+    if account_id is None:
+        raise credentials_exception
+    stmt, cursor_for = timeline_page(account_id, cursor, limit)
+    ids, next_cursor = split_page(db.execute(stmt).all(), limit, cursor_for)
+    return tweets_response(request, load_tweets(db, ids), next_cursor)
+
 #Edit tweet
 @router.put("/api/{account_id}/tweets/{tweet_id}", response_model=tweet.TweetRead)
-def edit_tweets(request: Request, account_id: int, tweet_id: int, edit_tweet: tweet.TweetUpdate, db: Session = Depends(get_db), current_account: Account = Depends(get_current_user)):
+def edit_tweets(request: Request, account_id: int, tweet_id: int, edit_tweet: tweet.TweetUpdate, db: Session = Depends(get_db), current_account: Principal = Depends(get_current_user)):
     request.app.state.logs.append(f"DB Access: method='{request.method}' Edit tweet")
     tweet = db.query(Tweet).filter(Tweet.id == tweet_id, Tweet.account_id == account_id).first()
 
@@ -82,42 +168,38 @@ def edit_tweets(request: Request, account_id: int, tweet_id: int, edit_tweet: tw
         raise HTTPException(status_code=404, detail="The tweet you wanted to update was not found")
     
     # Updates text
+    extra_tags = []
     if edit_tweet.content is not None:
         tweet.content = edit_tweet.content
+        extra_tags.append(TWEET_SEARCH_TAG)
+
+    # Remember the old hashtags so their cached entries get invalidated too
+    changed_tags = [h.tag for h in tweet.hashtags]
+    old_hashtags = [(h.id, h.tag) for h in tweet.hashtags]
 
     # Updates hashtags
+    new_hashtags = old_hashtags
     if edit_tweet.hashtags is not None: 
-        tweet.hashtags.clear()
-
-        for tag in edit_tweet.hashtags:
-            hashtag = db.query(Hashtag).filter(Hashtag.tag == tag).first()
-
-            if not hashtag:
-                hashtag = Hashtag(tag=tag)
-                db.add(hashtag)
-            tweet.hashtags.append(hashtag)
+        changed_tags.extend(edit_tweet.hashtags)
+        new_hashtags = set_tweet_hashtags(db, tweet.id, edit_tweet.hashtags, replace=True)
 
     # Update media
     if edit_tweet.media is not None:
-        
-        for m in tweet.media:
-            db.delete(m)
-        db.flush()
-
-        tweet.media.clear()
-
-        for url in edit_tweet.media:
-            new_media = Media(url=url, media_type="image", tweet=tweet)
-            db.add(new_media)
+        set_tweet_media(db, tweet.id, edit_tweet.media, replace=True)
 
     db.commit()
+    database.stick_to_primary(request.headers.get("authorization"))
+    invalidation_bus.publish(tags=tweet_change_tags(tweet_id, account_id, changed_tags) + extra_tags)
     db.refresh(tweet)
+    hashtags_changed(old_hashtags, new_hashtags)
+    trending.record({tag for _, tag in new_hashtags} - {tag for _, tag in old_hashtags}, tweet.created_at)
+    trending.record({tag for _, tag in old_hashtags} - {tag for _, tag in new_hashtags}, tweet.created_at, -1)
 
     return tweet
 
 # Delete tweet
 @router.delete("/api/{account_id}/tweets/{tweet_id}")
-def delete_tweets(request: Request, account_id: int, tweet_id: int, db: Session = Depends(get_db), current_account: Account = Depends(get_current_user)):
+def delete_tweets(request: Request, account_id: int, tweet_id: int, db: Session = Depends(get_db), current_account: Principal = Depends(get_current_user)):
     request.app.state.logs.append(f"DB Access: method='{request.method}' Delete tweet")
     if current_account.id != account_id:
         raise HTTPException(status_code=403, detail="You don't have access to post, edit, or delete tweets on this account")
@@ -127,23 +209,57 @@ def delete_tweets(request: Request, account_id: int, tweet_id: int, db: Session
     if not tweet:
         raise HTTPException(status_code=404, detail="Tweet not found")
     
+    changed_tags = [h.tag for h in tweet.hashtags]
+    old_hashtags = [(h.id, h.tag) for h in tweet.hashtags]
+    created_at = tweet.created_at
+    forget_tweet(db, tweet_id)
     db.delete(tweet)
     db.commit()
+    database.stick_to_primary(request.headers.get("authorization"))
+    invalidation_bus.publish(tags=tweet_change_tags(tweet_id, account_id, changed_tags) + [TWEET_LISTS_TAG])
+    hashtags_changed(before=old_hashtags)
+    trending.record([tag for _, tag in old_hashtags], created_at, -1)
+    account_index.bump(account_id, -1)
 
     return {"message": "Tweet Deleted"}
 
 # Search based on hashtags
 @router.post("/api/hashtags/search", response_model=List[HashtagRead])
-def search_hashtags(search: SearchRequest, db: Session = Depends(get_db), request: Request = None):
+def search_hashtags(search: HashtagSearchRequest, db: Session = Depends(get_read_db), request: Request = None):
+    # Prefix matches straight from memory; the database covers cold starts and "contains" matches
+    if hashtag_index.ready:
+        ids = hashtag_index.top(search.query, search.limit)
+        if ids:
+            return [{"id": i, "tag": hashtag_index.label(i)} for i in ids]
     request.app.state.logs.append(f"DB Access: Search hashtags with query '{search.query}'")
-    hashtags = db.query(Hashtag).filter(Hashtag.tag.ilike(f"%{search.query}%")).all()
-    return hashtags
+    return hashtag_matches(db, search.query, search.limit)
+
+# Most used hashtags over the last hour or day, counted in memory as tweets are written
+@router.get("/api/hashtags/trending", response_model=List[TrendingHashtag])
+def trending_hashtags(
+    request: Request,
+    window: Literal["1h", "24h"] = Query("1h"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+):
+    if trending.ready:
+        return [{"tag": tag, "uses": uses} for tag, uses in trending.top(window, limit)]
+    request.app.state.logs.append(f"DB Access: method='{request.method}' Count trending hashtags")
+    return [{"tag": tag, "uses": uses} for tag, uses in count_in_db(db, window, limit)]
 
 @router.post("/api/tweets/search", response_model=List[TweetRead])
-def search_tweets(search: SearchRequest, db: Session = Depends(get_db), request: Request = None):
+def search_tweets(
+    search: TweetSearchRequest,
+    stream: bool = Query(False),
+    db: Session = Depends(get_read_db),
+    sessions = Depends(get_read_sessions),
+    request: Request = None,
+):
     request.app.state.logs.append(f"DB Access: Search tweets with query '{search.query}'")
-    tweets = db.query(Tweet).options(joinedload(Tweet.account)).filter(Tweet.content.ilike(f"%{search.query}%")).all()
-    return tweets
+    if wants_stream(request, stream):
+        return ndjson_response(tweet_lines(sessions, tweet_stream(db.get_bind().dialect.name, search.query, search.cursor)))
+    ids, next_cursor = tweet_page(db, search.query, search.cursor, search.limit)
+    return tweets_response(request, load_tweets(db, ids), next_cursor)
 
 @router.post("/api/tweets/{tweet_id}/like")
 def like_tweet(request: Request, tweet_id: int, db: Session = Depends(get_db)):
@@ -162,6 +278,8 @@ def like_tweet(request: Request, tweet_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Tweet not found")
         tweet.likes = (tweet.likes or 0) + like_batcher[tweet_id]["likes"]
         db.commit()
+        database.stick_to_primary(request.headers.get("authorization"))
+        invalidation_bus.publish(tags=tweet_change_tags(tweet.id, tweet.account_id))
         del like_batcher[tweet_id]
 
     return {"message": "Like added"}
@@ -171,7 +289,7 @@ def create_tweet(
     tweet_data: tweet.TweetCreate,
     db: Session = Depends(get_db),
     request: Request = None,
-    current_account: Account = Depends(get_current_user)
+    current_account: Principal = Depends(get_current_user)
 ):
     request.app.state.logs.append(f"DB Access: method='{request.method}' Post tweet")
     # Create new Tweet instance
@@ -182,21 +300,16 @@ def create_tweet(
     db.add(new_tweet)
     db.flush()  # Get new_tweet.id before committing
 
-    # Handle hashtags
-    if tweet_data.hashtags:
-        for tag in tweet_data.hashtags:
-            hashtag = db.query(Hashtag).filter(Hashtag.tag == tag).first()
-            if not hashtag:
-                hashtag = Hashtag(tag=tag)
-                db.add(hashtag)
-            new_tweet.hashtags.append(hashtag)
-
-    # Handle media
-    if tweet_data.media:
-        for url in tweet_data.media:
-            new_media = Media(url=url, media_type="image", tweet=new_tweet)
-            db.add(new_media)
+    # Hashtags and media, each in one batch
+    new_hashtags = set_tweet_hashtags(db, new_tweet.id, tweet_data.hashtags or [])
+    set_tweet_media(db, new_tweet.id, tweet_data.media or [])
+    fan_out(db, new_tweet, current_account)
 
     db.commit()
+    database.stick_to_primary(request.headers.get("authorization"))
+    invalidation_bus.publish(tags=tweet_change_tags(new_tweet.id, current_account.id, tweet_data.hashtags or []) + [TWEET_LISTS_TAG])
     db.refresh(new_tweet)
+    hashtags_changed(after=new_hashtags)
+    trending.record([tag for _, tag in new_hashtags], new_tweet.created_at)
+    account_index.bump(current_account.id)
     return new_tweet
\ No newline at end of file
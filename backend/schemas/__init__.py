@@ -1,5 +1,6 @@
 #Schemas intit file
-from backend.schemas.account import AccountRead, AccountCreate, AccountBase
-from backend.schemas.tweet import TweetBase, TweetCreate, TweetRead, TweetUpdate, SearchRequest
-from backend.schemas.hashtag import HashtagBase, HashtagCreate, HashtagRead, SearchRequest
+from backend.schemas.account import AccountRead, AccountCreate, AccountBase, AccountSearchRequest
+from backend.schemas.tweet import TweetBase, TweetCreate, TweetRead, TweetUpdate, TweetSearchRequest, SearchRequest
+from backend.schemas.hashtag import HashtagBase, HashtagCreate, HashtagRead, HashtagSearchRequest, SearchRequest, TrendingHashtag
 from backend.schemas.media import MediaBase, MediaCreate, MediaRead
+from backend.schemas.bulk import BulkRequest
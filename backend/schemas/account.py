@@ -1,10 +1,13 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import List, Optional
 
 class SearchRequest(BaseModel):
     query: str
 
+class AccountSearchRequest(SearchRequest):
+    limit: int = Field(20, ge=1, le=100)
+
 class AccountBase(BaseModel):
     id: int
     username: str
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class BulkRequest(BaseModel):
+    # A snapshot directory name under BULK_DIR
+    snapshot: str = Field(pattern=r"^[\w.-]+$", max_length=100)
+    # Export only; BULK_CHUNK_ROWS when not given
+    chunk_rows: Optional[int] = Field(None, ge=1)
@@ -1,9 +1,12 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List
 
 class SearchRequest(BaseModel):
     query: str
 
+class HashtagSearchRequest(SearchRequest):
+    limit: int = Field(20, ge=1, le=100)
+
 class HashtagBase(BaseModel):
     tag: str
 
@@ -14,4 +17,8 @@ class HashtagRead(HashtagBase):
     id: int
     tag: str
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class TrendingHashtag(BaseModel):
+    tag: str
+    uses: int
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import List, Optional
 from .hashtag import HashtagRead
@@ -8,6 +8,10 @@ from .account import AccountMinimal
 class SearchRequest(BaseModel):
     query: str
 
+class TweetSearchRequest(SearchRequest):
+    limit: int = Field(50, ge=1, le=200)
+    cursor: Optional[str] = None # next_cursor from the previous page
+
 class TweetBase(BaseModel):
     content: str
     #created_time: datetime <- this is not needed as it will be set by the server
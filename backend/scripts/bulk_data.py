@@ -0,0 +1,52 @@
+# bulk_data.py
+# Export the database to a snapshot directory, or import one (see backend/bulk.py).
+# Both can be rerun after an interruption and pick up at the next chunk.
+#
+# Run with:
+#   python -m backend.scripts.bulk_data export <directory> [--chunk-rows N]
+#   python -m backend.scripts.bulk_data import <directory>
+import sys
+import argparse
+from backend.database import SessionLocal, engine
+from backend.migrations import upgrade_schema
+from backend.bulk import export_snapshot, import_snapshot, BulkReport, BulkError, CHUNK_ROWS
+
+
+def print_chunk(table, file, rows, seconds, skipped):
+    if skipped:
+        print(f"[BULK] {file}: already done, skipped")
+    else:
+        print(f"[BULK] {file}: {rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:.0f} rows/s)")
+
+
+def print_summary(report: BulkReport):
+    summary = report.as_dict()
+    for table, entry in summary["tables"].items():
+        rate = f"{entry['rows_per_sec']:.0f} rows/s" if entry["rows_per_sec"] else "-"
+        print(f"[BULK] {table:<14} {entry['rows']:>10} rows {entry['chunks']:>5} chunks {entry['skipped_chunks']:>5} skipped {rate:>16}")
+    print(f"[BULK] total {summary['rows']} rows in {summary['seconds']:.1f}s ({summary['rows_per_sec'] or 0:.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("directory")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    report = BulkReport(on_chunk=print_chunk)
+    try:
+        with SessionLocal() as db:
+            if args.command == "export":
+                export_snapshot(db, args.directory, args.chunk_rows, report)
+            else:
+                upgrade_schema(engine)
+                import_snapshot(db, args.directory, report)
+    except BulkError as e:
+        print(f"[BULK] {e}")
+        sys.exit(1)
+    print_summary(report)
+
+
+if __name__ == "__main__":
+    main()
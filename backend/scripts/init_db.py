@@ -1,10 +1,11 @@
 from backend.database import engine, Base
+from backend.migrations import upgrade_schema
 import backend.models  # Import all models via __init__.py to register with Base
 
 # Debug: print engine URL and tables
 print(f"Engine URL: {engine.url}")
 print(f"Tables to create: {Base.metadata.tables.keys()}")
 
-# Create all tables in the database
-Base.metadata.create_all(bind=engine)
+# Create all tables in the database, and upgrade the ones an older version created
+upgrade_schema(engine)
 print("All tables created.")
@@ -0,0 +1,135 @@
+import re
+from sqlalchemy import func, literal_column, table, column, select, and_, or_, cast, Float
+from sqlalchemy.orm import Session
+from backend.models import Tweet, Hashtag, Account
+from backend.models.association_model import tweet_hashtag_table
+from backend.pagination import recent_page, ranked_page, recent_cursor, rank_cursor, split_page, DEFAULT_PAGE_SIZE
+
+# Full-text search over tweet content, best matches first.
+# Uses the index created next to the Tweet model (see models/tweet_model.py):
+# - Postgres: tsvector column + GIN index, ranked with ts_rank
+# - SQLite: FTS5 table, ranked with bm25
+# Any other database falls back to a substring scan ordered by recency.
+#
+# Hashtag and account search are typeahead lookups on short strings: "starts with"
+# matches come first from a b-tree range scan; if they do not fill the page, the
+# rest is filled with "contains" matches (pg_trgm GIN index on Postgres).
+# Both paths are limited and ranked; see the indexes next to each model.
+
+# The FTS5 table; its rowid is the tweet id
+tweets_fts = table("tweets_fts", column("rowid"))
+
+
+def fts5_query(q: str) -> str:
+    # Quote every word so user input is matched as terms, never parsed as FTS5 syntax
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+
+
+def ranked_matches(q: str, dialect: str):
+    # Subquery of (id, rank) for tweets matching q, or None when the database has no index
+    if dialect == "postgresql":
+        vector = literal_column("tweets.search_vector")
+        tsquery = func.websearch_to_tsquery("english", q)
+        # ts_rank is a float4; as double precision the rank in a page cursor compares equal
+        # to the row's own, so the next page starts right after it instead of repeating ties
+        return (
+            select(Tweet.id.label("id"), cast(func.ts_rank(vector, tsquery), Float(53)).label("rank"))
+            .filter(vector.op("@@")(tsquery))
+            .subquery()
+        )
+    if dialect == "sqlite":
+        # bm25() is lower-is-better, so negate it to sort like ts_rank
+        match = literal_column("tweets_fts")
+        return (
+            select(tweets_fts.c.rowid.label("id"), (-func.bm25(match)).label("rank"))
+            .filter(match.op("MATCH")(fts5_query(q)))
+            .subquery()
+        )
+    return None
+
+
+def search_page(q: str, dialect: str, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    # (statement, cursor_for) for one page of matches, or None when q has no words to search for.
+    # Shared by the sync and async routes; run it and pass the rows to split_page.
+    if not re.search(r"\w", q):
+        return None
+    ranked = ranked_matches(q, dialect)
+    if ranked is None:
+        stmt = select(Tweet.id, Tweet.created_at).filter(Tweet.content.ilike(f"%{q}%"))
+        return recent_page(stmt, cursor, limit), recent_cursor
+    return ranked_page(ranked, cursor, limit), rank_cursor
+
+
+def search_tweet_ids(db: Session, q: str, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    # One page of matching tweet ids; returns (ids, next_cursor)
+    page = search_page(q, db.get_bind().dialect.name, cursor, limit)
+    if page is None:
+        return [], None
+    stmt, cursor_for = page
+    return split_page(db.execute(stmt).all(), limit, cursor_for)
+
+
+def like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def starts_with(expr, prefix: str, dialect: str):
+    if dialect == "postgresql":
+        # Served by the text_pattern_ops index on expr
+        return expr.like(f"{like_escape(prefix)}%", escape="\\")
+    # Same rows as LIKE 'prefix%', written as a range so SQLite can use the lower() index
+    return and_(expr >= prefix, expr < prefix + "\U0010ffff")
+
+
+def contains(expr, text: str):
+    return expr.like(f"%{like_escape(text)}%", escape="\\")
+
+
+def typeahead(db: Session, query, id_column, exprs, q: str, limit: int, order_by):
+    # Prefix matches first, then "contains" matches, at most limit rows in total.
+    # exprs are lower()-ed columns matching the search indexes.
+    q = q.strip().lower()
+    if not q:
+        return []
+    dialect = db.get_bind().dialect.name
+    rows = query.filter(or_(*(starts_with(e, q, dialect) for e in exprs))).order_by(*order_by).limit(limit).all()
+    if len(rows) >= limit:
+        return rows
+
+    rest = query.filter(or_(*(contains(e, q) for e in exprs)))
+    if rows:
+        rest = rest.filter(id_column.notin_([row.id for row in rows]))
+    if dialect == "postgresql":
+        # Closest trigram match first
+        rest = rest.order_by(func.greatest(*(func.similarity(e, q) for e in exprs)).desc(), *order_by)
+    else:
+        rest = rest.order_by(*order_by)
+    return rows + rest.limit(limit - len(rows)).all()
+
+
+def hashtag_uses():
+    # Number of tweets carrying the hashtag, used as its popularity
+    return (
+        select(func.count())
+        .select_from(tweet_hashtag_table)
+        .where(tweet_hashtag_table.c.hashtag_id == Hashtag.id)
+        .correlate(Hashtag)
+        .scalar_subquery()
+    )
+
+
+def search_hashtags(db: Session, q: str, limit: int = 20):
+    # Matching hashtags, most used first
+    return typeahead(
+        db, db.query(Hashtag), Hashtag.id, [func.lower(Hashtag.tag)], q, limit,
+        order_by=[hashtag_uses().desc(), Hashtag.tag],
+    )
+
+
+def search_accounts(db: Session, q: str, limit: int = 20, options=()):
+    # Accounts whose username or email matches, shortest (closest) username first
+    return typeahead(
+        db, db.query(Account).options(*options), Account.id,
+        [func.lower(Account.username), func.lower(Account.email)], q, limit,
+        order_by=[func.length(Account.username), Account.username],
+    )
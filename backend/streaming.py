@@ -0,0 +1,105 @@
+from itertools import groupby
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, false
+from backend import database
+from backend.cachingsystem.settings import env_int
+from backend.models import Account, Tweet
+from backend.search import search_page
+from backend.pagination import recent_page
+from backend.fastjson import (
+    dumps, tweet_statements, tweet_payloads, load_tweet_payloads, account_tweet, account_item,
+    ACCOUNT_COLUMNS, TWEET_COLUMNS,
+)
+
+# Streaming NDJSON for the large collections (/api/tweets, tweet search, /api/accounts).
+# Asked for with `Accept: application/x-ndjson` or `?stream=true`. Instead of building
+# one JSON array in memory, the rows are read through a server-side cursor
+# (yield_per: STREAM_BATCH_SIZE rows at a time), each batch is serialized and sent
+# as it is ready, one JSON object per line, so memory stays flat however many rows
+# match. Each line is exactly one element of the regular JSON response.
+# A streamed tweet collection starts at `cursor` (if given) and runs to the end;
+# `limit` does not apply. Streams skip the caches and ETags: both need the whole body.
+#
+# The regular session dependencies close their session before a streaming body is
+# sent, so the generators open their own from the factory get_read_sessions returns.
+
+NDJSON = "application/x-ndjson"
+BATCH_SIZE = env_int("STREAM_BATCH_SIZE", 1000)
+
+# Tells nginx not to buffer the stream
+STREAM_HEADERS = {"X-Accel-Buffering": "no"}
+
+
+def wants_stream(request: Request, stream: bool = False) -> bool:
+    return stream or NDJSON in request.headers.get("accept", "")
+
+
+def ndjson_response(lines) -> StreamingResponse:
+    return StreamingResponse(lines, media_type=NDJSON, headers=STREAM_HEADERS)
+
+
+# Session factories for streaming routes; the route's get_read_db already counted the access
+def get_read_sessions(request: Request):
+    caller = request.headers.get("authorization")
+    return lambda: database.ReadSessionLocal(caller)
+
+
+def get_async_read_sessions(request: Request):
+    caller = request.headers.get("authorization")
+    return lambda: database.AsyncReadSessionLocal(caller)
+
+
+def tweet_stream(dialect: str, q: str = None, cursor: str = None):
+    # Every tweet id from cursor on, matching q if given, in the order the pages use
+    if q:
+        built = search_page(q, dialect, cursor, None)
+        return built[0] if built else select(Tweet.id).filter(false())
+    return recent_page(select(Tweet.id, Tweet.created_at), cursor, None)
+
+
+def _lines(ids, payloads) -> bytes:
+    return b"".join(payloads[i] + b"\n" for i in ids if i in payloads)
+
+
+def tweet_lines(sessions, stmt):
+    # stmt selects tweet ids in response order (a recent_page/search_page statement)
+    with sessions() as db:
+        result = db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+        for rows in result.partitions():
+            ids = [row.id for row in rows]
+            yield _lines(ids, load_tweet_payloads(db, ids))
+
+
+async def async_tweet_lines(sessions, stmt):
+    async with sessions() as db:
+        result = await db.stream(stmt.execution_options(yield_per=BATCH_SIZE))
+        async for rows in result.partitions():
+            ids = [row.id for row in rows]
+            tweets, hashtags, media = [(await db.execute(s)).all() for s in tweet_statements(ids)]
+            yield _lines(ids, tweet_payloads(tweets, hashtags, media))
+
+
+def account_lines(sessions):
+    # One pass over accounts joined to their tweets, in account order, so each
+    # account's line is complete as soon as the next account's rows start
+    stmt = (
+        select(*ACCOUNT_COLUMNS, *TWEET_COLUMNS)
+        .outerjoin(Tweet, Tweet.account_id == Account.id)
+        .order_by(Account.id, Tweet.id)
+    )
+    width = len(ACCOUNT_COLUMNS)
+    with sessions() as db:
+        rows = db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+        chunk, chunk_rows = [], 0
+        for account, group in groupby(rows, key=lambda row: tuple(row[:width])):
+            group = list(group)
+            tweets = [account_tweet(*row[width:]) for row in group if row[width] is not None]
+            chunk.append(dumps(account_item(*account, tweets)) + b"\n")
+            # Flushed by rows read rather than accounts, so accounts with many tweets do not pile up
+            chunk_rows += len(group)
+            if chunk_rows >= BATCH_SIZE:
+                yield b"".join(chunk)
+                chunk, chunk_rows = [], 0
+        if chunk:
+            yield b"".join(chunk)
@@ -0,0 +1,114 @@
+import os
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+# Spawning hashing processes only slows the suite down; test_passwords_defs covers the process pool
+os.environ.setdefault("PASSWORD_HASH_POOL", "thread")
+
+import pytest
+from contextlib import contextmanager
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from datetime import timedelta
+
+from backend.auth import create_access_token
+from backend.database import Base
+from backend.models import Account, Tweet, Hashtag, Media
+
+# Shared fixtures for tests that need a real (SQLite, in-memory) database
+
+## Should create a fresh in-memory database with every table
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session_factory(sqlite_engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)
+
+## Should fill the database with a few accounts, tweets, hashtags and media
+@pytest.fixture
+def seeded(session_factory):
+    db = session_factory()
+    cats, dogs = Hashtag(tag="cats"), Hashtag(tag="dogs")
+    alice = Account(username="alice", handle="alice", email="alice@example.com", password="x")
+    bob = Account(username="bob", handle="bob", email="bob@example.com", password="x")
+    db.add_all([cats, dogs, alice, bob])
+    db.flush()
+    for i in range(3):
+        tweet = Tweet(content=f"alice tweet {i} about cats", account_id=alice.id, hashtags=[cats])
+        tweet.media.append(Media(url=f"/media/{i}.jpg", media_type="image"))
+        db.add(tweet)
+    db.add(Tweet(content="bob likes dogs", account_id=bob.id, hashtags=[cats, dogs]))
+    db.commit()
+    ids = {"alice": alice.id, "bob": bob.id}
+    db.close()
+    return ids
+
+## Should fail the test when a block issues more SQL statements than allowed (catches N+1 regressions)
+@pytest.fixture
+def max_queries(sqlite_engine):
+    @contextmanager
+    def check(limit: int):
+        statements = []
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(sqlite_engine, "before_cursor_execute", count)
+        try:
+            yield statements
+        finally:
+            event.remove(sqlite_engine, "before_cursor_execute", count)
+        assert len(statements) <= limit, f"{len(statements)} queries (max {limit}):\n" + "\n".join(statements)
+    return check
+
+## Should build the Authorization header of a logged-in account
+def auth_headers(username, minutes=None):
+    expires = timedelta(minutes=minutes) if minutes is not None else None
+    return {"Authorization": f"Bearer {create_access_token({'sub': username}, expires)}"}
+
+## Should give a TestClient for the API wired to the in-memory database
+@pytest.fixture
+def api_client(session_factory):
+    from backend.main import app
+    from backend.routes import tweet_routes, account_routes
+    from backend.typeahead import hashtag_index, account_index
+    from backend.trending import trending
+    from backend.principals import principal_cache
+    from backend.streaming import get_read_sessions
+
+    def get_test_db(request: Request):
+        request.app.state.db_accesses += 1
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[tweet_routes.get_db] = get_test_db
+    app.dependency_overrides[account_routes.get_db] = get_test_db
+    app.dependency_overrides[tweet_routes.get_read_db] = get_test_db
+    app.dependency_overrides[account_routes.get_read_db] = get_test_db
+    app.dependency_overrides[get_read_sessions] = lambda: session_factory
+
+    def get_test_principal_sessions(request: Request):
+        def open_session():
+            request.app.state.db_accesses += 1
+            return session_factory()
+        return open_session
+
+    app.dependency_overrides[account_routes.get_principal_sessions] = get_test_principal_sessions
+    tweet_routes.tweet_cache.clear()
+    principal_cache.clear()
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
+    tweet_routes.tweet_cache.clear()
+    hashtag_index.clear()
+    account_index.clear()
+    trending.clear()
+    principal_cache.clear()
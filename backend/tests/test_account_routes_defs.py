@@ -0,0 +1,56 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import pytest
+from backend.auth import create_access_token
+from backend.models import Account, Tweet, Hashtag, Media
+
+# Fixtures to reduce repetition
+## Should add enough accounts and tweets that a lazy load per row would show up in the query count
+@pytest.fixture
+def crowded(seeded, session_factory):
+    db = session_factory()
+    tag = db.query(Hashtag).filter(Hashtag.tag == "cats").one()
+    for i in range(5):
+        account = Account(username=f"user{i}", handle=f"user{i}", email=f"user{i}@example.com", password="x")
+        for j in range(3):
+            tweet = Tweet(content=f"user{i} tweet {j}", hashtags=[tag])
+            tweet.media.append(Media(url=f"/media/{i}-{j}.jpg", media_type="image"))
+            account.tweets.append(tweet)
+        db.add(account)
+    db.commit()
+    db.close()
+    return seeded
+
+# Routes
+## Should list every account with its tweets in two queries
+def test_get_all_accounts_query_count(api_client, crowded, max_queries):
+    with max_queries(2):
+        response = api_client.get("/api/accounts")
+    accounts = response.json()
+    assert len(accounts) == 7
+    assert sum(len(a["tweets"]) for a in accounts) == 19
+
+## Should load an account, its tweets, hashtags and media in a fixed number of queries
+def test_get_account_query_count(api_client, crowded, max_queries):
+    with max_queries(4):
+        response = api_client.get("/api/accounts/alice")
+    account = response.json()
+    assert len(account["tweets"]) == 3
+    assert account["tweets"][0]["hashtags"] == [{"id": account["tweets"][0]["hashtags"][0]["id"], "tag": "cats"}]
+    assert account["tweets"][0]["media"][0]["media_type"] == "image"
+
+## Should not lazy load per tweet when serializing the current account
+def test_get_current_account_query_count(api_client, crowded, max_queries):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user0'})}"}
+    with max_queries(5):
+        response = api_client.get("/api/accounts/me", headers=headers)
+    assert len(response.json()["tweets"]) == 3
+
+## Should not lazy load per account when serializing search results
+def test_search_accounts_query_count(api_client, crowded, max_queries):
+    # Prefix page and "contains" top-up, plus the three select-in loads
+    with max_queries(5):
+        response = api_client.post("/api/accounts/search", json={"query": "user"})
+    assert len(response.json()) == 5
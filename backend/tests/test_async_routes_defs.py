@@ -0,0 +1,83 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.auth import create_access_token
+from backend.database import Base, async_url
+from backend.pagination import NEXT_CURSOR_HEADER
+from backend.routes import async_routes, tweet_routes
+
+# Fixtures to reduce repetition
+## Should use a database file, so the sync seeding engine and the async engine see the same data
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+## Should give a TestClient for an app serving only the async routes
+@pytest.fixture
+def async_client(sqlite_engine, seeded):
+    async_engine = create_async_engine(async_url(str(sqlite_engine.url)))
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def get_test_db(request: Request):
+        request.app.state.db_accesses += 1
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.state.logs, app.state.db_accesses = [], 0
+    app.include_router(async_routes.router)
+    app.dependency_overrides[async_routes.get_async_read_db] = get_test_db
+    app.dependency_overrides[async_routes.get_async_read_sessions] = lambda: sessions
+    tweet_routes.tweet_cache.clear()
+    with TestClient(app) as client:
+        yield client
+    tweet_routes.tweet_cache.clear()
+
+# Unit tests
+## Should pick the async driver for each database
+def test_async_url():
+    assert async_url("postgresql://u:p@db:5432/twitter") == "postgresql+asyncpg://u:p@db:5432/twitter"
+    assert async_url("sqlite:///test.db") == "sqlite+aiosqlite:///test.db"
+
+# Routes
+## Should return the same timeline pages as the sync route
+def test_timeline_matches_sync_route(async_client, api_client):
+    first = async_client.get("/api/tweets", params={"limit": 3})
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    tweet_routes.tweet_cache.clear()
+    expected = api_client.get("/api/tweets", params={"limit": 3})
+    assert first.content == expected.content
+    assert cursor == expected.headers[NEXT_CURSOR_HEADER]
+    assert len(async_client.get("/api/tweets", params={"limit": 3, "cursor": cursor}).json()) == 1
+
+## Should rank and page search results like the sync route
+def test_search(async_client):
+    response = async_client.post("/api/tweets/search", json={"query": "dogs"})
+    assert [t["content"] for t in response.json()] == ["bob likes dogs"]
+    assert async_client.post("/api/tweets/search", json={"query": "!!!"}).json() == []
+
+## Should stream the same tweets and search results as the sync route
+def test_streams_match_sync_route(async_client, api_client):
+    for stream in (lambda c: c.get("/api/tweets", params={"stream": "true"}),
+                   lambda c: c.post("/api/tweets/search", json={"query": "cats"}, headers={"Accept": "application/x-ndjson"})):
+        assert stream(async_client).content == stream(api_client).content
+
+## Should return the current account with its tweets, and reject bad tokens
+def test_accounts_me(async_client):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'alice'})}"}
+    account = async_client.get("/api/accounts/me", headers=headers).json()
+    assert account["username"] == "alice"
+    assert len(account["tweets"]) == 3
+    assert account["tweets"][0]["hashtags"][0]["tag"] == "cats"
+
+    assert async_client.get("/api/accounts/me", headers={"Authorization": "Bearer nope"}).status_code == 401
@@ -0,0 +1,158 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import json
+import time
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import bulk
+from backend.bulk import export_snapshot, import_snapshot, read_manifest, secondary_indexes, BulkReport, BulkError, TABLES
+from backend.database import Base
+from backend.main import app
+from backend.models import BulkImport, Account, Follow, TimelineEntry
+from backend.routes import admin_routes
+
+# Fixtures to reduce repetition
+## Should give an empty database to import into
+@pytest.fixture
+def target_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def table_rows(factory):
+    with factory() as db:
+        return {
+            name: db.execute(select(*Base.metadata.tables[name].columns).order_by(*bulk.key_columns(Base.metadata.tables[name]))).all()
+            for name in TABLES
+        }
+
+def export(session_factory, directory, chunk_rows=2):
+    with session_factory() as db:
+        return export_snapshot(db, str(directory), chunk_rows)
+
+# Unit tests
+## Should copy every row of every table, and put the dropped indexes back
+def test_export_import_round_trip(session_factory, seeded, target_factory, tmp_path):
+    manifest = export(session_factory, tmp_path)
+    assert [chunk["rows"] for chunk in manifest["tables"]["tweets"]["chunks"]] == [2, 2]
+    with target_factory() as db:
+        indexes = {name: set(secondary_indexes(db, name)) for name in TABLES}
+        report = BulkReport()
+        import_snapshot(db, str(tmp_path), report)
+        assert {name: set(secondary_indexes(db, name)) for name in TABLES} == indexes
+        assert db.query(BulkImport).filter(BulkImport.item.startswith(bulk.INDEX_ITEM)).count() == 0
+    assert table_rows(target_factory) == table_rows(session_factory)
+    summary = report.as_dict()
+    assert summary["rows"] == sum(len(rows) for rows in table_rows(session_factory).values())
+    assert summary["tables"]["tweets"]["rows_per_sec"] > 0
+
+## Should bring follows along and rebuild timelines and follower counts from them
+def test_import_rebuilds_timelines(session_factory, seeded, target_factory, tmp_path):
+    with session_factory() as db:
+        db.add(Follow(follower_id=seeded["bob"], followee_id=seeded["alice"]))
+        db.commit()
+    export(session_factory, tmp_path)
+    with target_factory() as db:
+        import_snapshot(db, str(tmp_path))
+        entries = db.query(TimelineEntry.account_id, TimelineEntry.author_id).all()
+        assert sorted(entries) == sorted([(seeded["alice"], seeded["alice"])] * 3 + [(seeded["bob"], seeded["alice"])] * 3 + [(seeded["bob"], seeded["bob"])])
+        counts = dict(db.query(Account.username, Account.follower_count))
+        assert counts == {"alice": 1, "bob": 0}
+
+## Should continue an interrupted export after its last finished chunk
+def test_export_resumes(session_factory, seeded, tmp_path):
+    complete = export(session_factory, tmp_path / "complete")
+    export(session_factory, tmp_path / "partial")
+    manifest = read_manifest(tmp_path / "partial")
+    tweets = manifest["tables"]["tweets"]
+    tweets["chunks"], tweets["done"] = tweets["chunks"][:1], False
+    for name in TABLES[TABLES.index("tweets") + 1:]:
+        del manifest["tables"][name]
+    (tmp_path / "partial" / bulk.MANIFEST).write_text(json.dumps(manifest))
+
+    report = BulkReport()
+    with session_factory() as db:
+        resumed = export_snapshot(db, str(tmp_path / "partial"), 2, report)
+    assert resumed["tables"] == complete["tables"]
+    assert report.as_dict()["tables"]["tweets"]["chunks"] == 1
+
+## Should skip the chunks already imported when rerun after a failure, never loading one twice
+def test_import_resumes(session_factory, seeded, target_factory, tmp_path, monkeypatch):
+    export(session_factory, tmp_path)
+    insert_rows = bulk.insert_rows
+
+    def fail_on_media(db, table, columns, rows):
+        if table.name == "media":
+            raise RuntimeError("connection lost")
+        insert_rows(db, table, columns, rows)
+
+    monkeypatch.setattr(bulk, "insert_rows", fail_on_media)
+    with target_factory() as db, pytest.raises(RuntimeError):
+        import_snapshot(db, str(tmp_path))
+    monkeypatch.setattr(bulk, "insert_rows", insert_rows)
+
+    report = BulkReport()
+    with target_factory() as db:
+        assert secondary_indexes(db, "tweets")
+        import_snapshot(db, str(tmp_path), report)
+    assert table_rows(target_factory) == table_rows(session_factory)
+    tweets = report.as_dict()["tables"]["tweets"]
+    assert (tweets["rows"], tweets["skipped_chunks"]) == (0, 2)
+
+## Should raise the load's error even when putting the indexes back fails as well
+def test_import_failure_keeps_original_error(session_factory, seeded, target_factory, tmp_path, monkeypatch):
+    export(session_factory, tmp_path)
+
+    def fail(*args):
+        raise RuntimeError("connection lost")
+
+    def fail_rebuild(db, snapshot):
+        raise ValueError("rebuild failed")
+
+    monkeypatch.setattr(bulk, "insert_rows", fail)
+    monkeypatch.setattr(bulk, "rebuild_indexes", fail_rebuild)
+    with target_factory() as db, pytest.raises(RuntimeError, match="connection lost"):
+        import_snapshot(db, str(tmp_path))
+
+## Should refuse a directory without a finished export
+def test_import_needs_complete_snapshot(target_factory, tmp_path):
+    with target_factory() as db, pytest.raises(BulkError):
+        import_snapshot(db, str(tmp_path))
+
+## Should escape values for COPY's text format
+def test_copy_value():
+    assert bulk._copy_value(None) == "\\N"
+    assert bulk._copy_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+    assert bulk._copy_value(True) == "t"
+    assert bulk._copy_value(5) == "5"
+
+# Routes
+## Should hide the admin endpoints without ADMIN_TOKEN and check the token otherwise
+def test_admin_token(api_client, monkeypatch):
+    assert api_client.post("/admin/bulk/export", json={"snapshot": "s"}).status_code == 404
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", "secret")
+    assert api_client.post("/admin/bulk/export", json={"snapshot": "s"}, headers={"X-Admin-Token": "nope"}).status_code == 403
+    assert api_client.post("/admin/bulk/export", json={"snapshot": "../s"}, headers={"X-Admin-Token": "secret"}).status_code == 422
+
+## Should run an export job in the background and report its progress
+def test_admin_export_job(api_client, session_factory, seeded, tmp_path, monkeypatch):
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(admin_routes, "BULK_DIR", str(tmp_path))
+    app.dependency_overrides[admin_routes.get_sessions] = lambda: session_factory
+    headers = {"X-Admin-Token": "secret"}
+    job = api_client.post("/admin/bulk/export", json={"snapshot": "snap", "chunk_rows": 2}, headers=headers)
+    assert job.status_code == 202
+    for _ in range(100):
+        status = api_client.get(f"/admin/bulk/jobs/{job.json()['id']}", headers=headers).json()
+        if status["state"] != "running":
+            break
+        time.sleep(0.05)
+    assert status["state"] == "done"
+    assert status["tables"]["tweets"]["rows"] == 4
+    assert read_manifest(tmp_path / "snap")["tables"]["tweet_hashtag"]["done"]
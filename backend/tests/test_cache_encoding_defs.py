@@ -0,0 +1,88 @@
+import os
+os.environ["SECRET_KEY"] = "testsecret"
+
+import gzip
+import json
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.cachingsystem import cache as cache_module
+from backend.cachingsystem.encoding import build_cached_response, choose_encoding, brotli
+from backend.cachingsystem.upstream import UpstreamClient
+
+BIG_BODY = json.dumps([{"id": i, "content": "hello world " * 5} for i in range(200)]).encode()
+
+# Unit tests
+## Should build compressed variants for large bodies only
+def test_small_bodies_are_not_compressed():
+    cached = build_cached_response(b"[]", '"e"')
+    assert cached.gzip is None and cached.br is None
+    assert cached.size == 2
+
+def test_large_bodies_get_variants():
+    cached = build_cached_response(BIG_BODY, '"e"')
+    assert gzip.decompress(cached.gzip) == BIG_BODY
+    assert cached.size == len(BIG_BODY) + len(cached.gzip) + len(cached.br or b"")
+    if brotli is not None:
+        assert brotli.decompress(cached.br) == BIG_BODY
+
+## Should pick the best accepted encoding and respect q=0
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("identity", None),
+    (None, None),
+    ("*", "br"),
+])
+def test_choose_encoding(header, expected):
+    if brotli is None and expected == "br":
+        expected = "gzip"
+    assert choose_encoding(header, build_cached_response(BIG_BODY, '"e"')) == expected
+
+# Cache proxy
+## Should give a cache node whose upstream returns a large tweet list
+@pytest.fixture
+def client(monkeypatch):
+    def handler(request):
+        return httpx.Response(200, content=BIG_BODY, headers={"Content-Type": "application/json"})
+
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(handler)))
+    cache_module.cache.clear()
+    with TestClient(cache_module.app) as c:
+        yield c
+
+## Should serve the stored gzip variant byte for byte on a hit
+def test_hit_serves_precompressed_variant(client):
+    client.get("/api/tweets")
+    cached = cache_module.cache.get("tweets")
+    response = client.get("/api/tweets", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == json.loads(BIG_BODY)
+    assert response.headers["etag"] == cached.etag_for("gzip")
+
+## Should serve the stored body unchanged to clients without compression
+def test_hit_serves_identity_body(client):
+    client.get("/api/tweets")
+    response = client.get("/api/tweets", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.content == BIG_BODY
+
+## Should count the real stored bytes against the byte budget
+def test_memory_accounting_uses_byte_sizes(client):
+    client.get("/api/tweets")
+    assert cache_module.cache.total_bytes == cache_module.cache.get("tweets").size
+
+## Should show a cached response's identity body and metadata, and 404 for unknown keys
+def test_cache_debug_endpoint(client):
+    client.get("/api/tweets")
+    entry = client.get("/cache/tweets")
+    assert entry.status_code == 200
+    value = entry.json()["value"]
+    assert value["body"] == json.loads(BIG_BODY)
+    assert value["etag"] == cache_module.cache.get("tweets").etag
+    assert "gzip" in value["encodings"]
+    missing = client.get("/cache/nope")
+    assert (missing.status_code, missing.json()) == (404, {"error": "Key not found"})
@@ -0,0 +1,111 @@
+import pytest
+
+from backend.cachingsystem.engine import Cache, estimate_size
+
+# Fake clock so expiry can be tested without sleeping
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+# Unit tests
+## Should return stored values and None for unknown keys
+def test_get_and_set(clock):
+    cache = Cache(expiration_time=60, clock=clock)
+    cache.set("tweets", [1, 2, 3])
+    assert cache.get("tweets") == [1, 2, 3]
+    assert cache.get("accounts") is None
+
+## Should expire entries once their TTL has passed
+def test_entries_expire(clock):
+    cache = Cache(expiration_time=60, clock=clock)
+    cache.set("tweets", "data")
+    clock.now += 59
+    assert cache.get("tweets") == "data"
+    clock.now += 2
+    assert cache.get("tweets") is None
+    assert len(cache) == 0
+
+## Should drop expired entries from the timer wheel without them being read
+def test_timer_wheel_purges_unread_entries(clock):
+    cache = Cache(expiration_time=10, clock=clock)
+    for i in range(100):
+        cache.set(f"key{i}", i)
+    clock.now += 12
+    cache.set("fresh", "value")
+    assert len(cache) == 1
+    assert cache.total_bytes == estimate_size("value")
+
+## Should honour a per-entry TTL override
+def test_per_entry_ttl(clock):
+    cache = Cache(expiration_time=60, clock=clock)
+    cache.set("short", 1, ttl=5)
+    cache.set("long", 2)
+    clock.now += 6
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+## Should evict the least recently used entry when the entry budget is exceeded
+def test_lru_eviction_by_count(clock):
+    cache = Cache(max_entries=2, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+## Should evict entries until the byte budget is respected
+def test_lru_eviction_by_bytes(clock):
+    cache = Cache(max_bytes=10, sizeof=len, clock=clock)
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+    cache.set("c", b"123")
+    assert cache.get("a") is None
+    assert cache.total_bytes == 8
+
+## Should refuse values larger than the whole byte budget
+def test_oversized_value_is_not_stored(clock):
+    cache = Cache(max_bytes=4, sizeof=len, clock=clock)
+    cache.set("a", b"12")
+    cache.set("big", b"123456")
+    assert cache.get("big") is None
+    assert cache.get("a") == b"12"
+
+## Should keep byte accounting correct when overwriting and deleting keys
+def test_overwrite_and_delete_accounting(clock):
+    cache = Cache(sizeof=len, clock=clock)
+    cache.set("a", b"1234")
+    cache.set("a", b"12")
+    assert cache.total_bytes == 2
+    assert cache.delete("a") is True
+    assert cache.delete("a") is False
+    assert cache.total_bytes == 0
+
+## Should keep expired entries for their grace period, visible only through get_entry
+def test_stale_entries_kept_for_grace_period(clock):
+    cache = Cache(expiration_time=60, clock=clock)
+    cache.set("tweets", "data", stale_ttl=30)
+    clock.now += 70
+    assert cache.get("tweets") is None
+    entry = cache.get_entry("tweets")
+    assert entry.value == "data"
+    assert not entry.is_fresh(clock.now)
+    clock.now += 30
+    assert cache.get_entry("tweets") is None
+
+## Should return only fresh keys from a multi-get
+def test_get_many(clock):
+    cache = Cache(expiration_time=60, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+    clock.now += 10
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1}
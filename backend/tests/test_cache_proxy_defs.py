@@ -0,0 +1,207 @@
+import os
+os.environ["SECRET_KEY"] = "testsecret"
+
+import json
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.cachingsystem import cache as cache_module
+from backend.cachingsystem.upstream import UpstreamClient
+
+# Fixtures to reduce repetition
+## Should point the proxy at a stub upstream that records every request it receives
+@pytest.fixture
+def upstream_calls(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request)
+        if request.url.path == "/api/broken":
+            return httpx.Response(500, text="boom")
+        return httpx.Response(200, json={"path": request.url.path, "query": request.url.query.decode(), "body": request.content.decode()})
+
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(handler)))
+    cache_module.cache.clear()
+    cache_module.stats.clear()
+    return calls
+
+def body(response):
+    return json.loads(response.body)
+
+@pytest.fixture
+def client(upstream_calls):
+    with TestClient(cache_module.app) as c:
+        yield c
+
+# Unit tests
+## Should only contact the API once for repeated cached GETs
+def test_cached_route_fetches_once(client, upstream_calls):
+    first = client.get("/api/tweets")
+    second = client.get("/api/tweets")
+    assert first.status_code == 200
+    assert first.json() == second.json()
+    assert len(upstream_calls) == 1
+
+## Should forward method, body and query string for uncached routes
+def test_passthrough_forwards_request(client, upstream_calls):
+    response = client.post("/api/tweets/search?limit=5", json={"query": "cats"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["path"] == "/api/tweets/search"
+    assert data["query"] == "limit=5"
+    assert json.loads(data["body"]) == {"query": "cats"}
+    assert upstream_calls[0].method == "POST"
+
+## Should pass streamed responses through every time instead of caching them
+def test_stream_passthrough(client, upstream_calls):
+    for _ in range(2):
+        response = client.get("/api/tweets?stream=true")
+        assert response.json()["query"] == "stream=true"
+    response = client.post("/api/tweets/search", json={"query": "cats"}, headers={"Accept": "application/x-ndjson"})
+    assert json.loads(response.json()["body"]) == {"query": "cats"}
+    assert len(upstream_calls) == 3
+    assert len(cache_module.cache) == 0
+
+## Should return the upstream status code when the API errors
+def test_upstream_error_is_reported(client):
+    response = client.get("/api/broken")
+    assert response.status_code == 500
+
+## Should answer 502 when the API cannot be reached
+def test_unreachable_upstream_returns_502(monkeypatch):
+    def handler(request):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(handler)))
+    cache_module.cache.clear()
+    with TestClient(cache_module.app) as c:
+        response = c.get("/api/accounts")
+    assert response.status_code == 502
+
+## Should coalesce concurrent misses for the same key into one upstream call
+def test_concurrent_misses_are_coalesced(monkeypatch):
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=[{"id": 1}])
+
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(handler)))
+    cache_module.cache.clear()
+    cache_module.stats.clear()
+
+    async def burst():
+        try:
+            return await asyncio.gather(*(cache_module.cached_get("tweets", "tweets") for _ in range(20)))
+        finally:
+            await cache_module.upstream.aclose()
+
+    results = asyncio.run(burst())
+    assert all(body(r) == [{"id": 1}] for r in results)
+    assert len(calls) == 1
+    assert cache_module.stats["misses"] == 1
+    assert cache_module.stats["coalesced"] == 19
+
+## Should count hits once the value is cached
+def test_stats_endpoint_counts_hits(client):
+    client.get("/api/accounts")
+    client.get("/api/accounts")
+    stats = client.get("/cache/stats").json()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["entries"] == 1
+
+# Stale-while-revalidate / stale-if-error
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+## Should point the proxy at an upstream whose responses can be changed per test
+@pytest.fixture
+def scripted_upstream(monkeypatch):
+    state = {"status": 200, "payload": ["v1"], "calls": 0}
+
+    def handler(request):
+        state["calls"] += 1
+        if state["status"] != 200:
+            return httpx.Response(state["status"], text="down")
+        return httpx.Response(200, json=state["payload"])
+
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(cache_module.cache, "clock", clock)
+    cache_module.cache.clear()
+    cache_module.stats.clear()
+    state["clock"] = clock
+    return state
+
+def run_proxy(coro_fn):
+    async def runner():
+        try:
+            result = await coro_fn()
+            # Let background refreshes finish before closing the client
+            if cache_module.refresh_tasks:
+                await asyncio.gather(*cache_module.refresh_tasks)
+            return result
+        finally:
+            await cache_module.upstream.aclose()
+    return asyncio.run(runner())
+
+POLICY = cache_module.RoutePolicy(ttl=60, stale_while_revalidate=30, stale_if_error=300, refresh_ahead=0.2, hot_rate=0.5)
+
+## Should serve the stale value at once and refresh it in the background
+def test_stale_while_revalidate(scripted_upstream):
+    run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    scripted_upstream["payload"] = ["v2"]
+    scripted_upstream["clock"].now += 70
+
+    stale = run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    assert body(stale) == ["v1"]
+    assert cache_module.stats["stale_hits"] == 1
+    assert cache_module.stats["refreshes"] == 1
+    assert json.loads(cache_module.cache.get("tweets").body) == ["v2"]
+
+## Should keep serving stale data while the API returns 5xx
+def test_stale_if_error(scripted_upstream):
+    run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    scripted_upstream["status"] = 503
+    scripted_upstream["clock"].now += 200  # past the SWR window, inside stale-if-error
+
+    result = run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    assert body(result) == ["v1"]
+    assert cache_module.stats["stale_if_error"] == 1
+
+## Should return the API error once the stale-if-error window has passed
+def test_error_after_stale_window(scripted_upstream):
+    run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    scripted_upstream["status"] = 503
+    scripted_upstream["clock"].now += 400
+
+    result = run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    assert result.status_code == 503
+
+## Should refresh a hot key before it expires
+def test_refresh_ahead_for_hot_keys(scripted_upstream):
+    run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    for _ in range(50):
+        cache_module.cache.get_entry("tweets")
+    scripted_upstream["clock"].now += 55  # inside the last 20% of the TTL
+
+    result = run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    assert body(result) == ["v1"]
+    assert scripted_upstream["calls"] == 2
+    assert cache_module.stats["refreshes"] == 1
+
+## Should not refresh ahead for keys that are rarely read
+def test_no_refresh_ahead_for_cold_keys(scripted_upstream):
+    run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    scripted_upstream["clock"].now += 55
+
+    run_proxy(lambda: cache_module.cached_get("tweets", "tweets", policy=POLICY))
+    assert scripted_upstream["calls"] == 1
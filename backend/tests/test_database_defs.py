@@ -0,0 +1,112 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import time
+from itertools import cycle
+import pytest
+from fastapi import Request
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import database
+from backend.cachingsystem.invalidation import invalidation_bus
+from backend.routes import tweet_routes
+from backend.tests.conftest import auth_headers
+
+# Fixtures to reduce repetition
+## Should configure two in-memory replicas for the duration of a test
+@pytest.fixture
+def replicas(monkeypatch):
+    engines = [create_engine("sqlite://"), create_engine("sqlite://")]
+    monkeypatch.setattr(database, "replica_engines", engines)
+    monkeypatch.setattr(database, "_replica_sessions", cycle([sessionmaker(bind=e) for e in engines]))
+    monkeypatch.setattr(database, "_sticky", {})
+    return engines
+
+# Unit tests
+## Should read pool settings per role and keep SQL echo off by default
+def test_engine_options_per_role(monkeypatch):
+    monkeypatch.setenv("DB_REPLICA_POOL_SIZE", "30")
+    monkeypatch.setenv("DB_REPLICA_MAX_OVERFLOW", "5")
+    monkeypatch.setenv("DB_PRIMARY_POOL_PRE_PING", "false")
+    replica = database.engine_options("postgresql://u:p@replica/db", "REPLICA")
+    primary = database.engine_options("postgresql://u:p@primary/db", "PRIMARY")
+    assert (replica["pool_size"], replica["max_overflow"], replica["pool_pre_ping"]) == (30, 5, True)
+    assert (primary["pool_size"], primary["max_overflow"], primary["pool_pre_ping"]) == (10, 20, False)
+    assert primary["echo"] is False
+
+## Should pass a Postgres statement timeout as a connection option
+def test_statement_timeout(monkeypatch):
+    monkeypatch.setenv("DB_REPLICA_STATEMENT_TIMEOUT_MS", "2000")
+    options = database.engine_options("postgresql://u:p@replica/db", "REPLICA")
+    assert options["connect_args"] == {"options": "-c statement_timeout=2000"}
+    assert "connect_args" not in database.engine_options("postgresql://u:p@primary/db", "PRIMARY")
+
+## Should leave in-memory SQLite on its default pool, but size the pool of a SQLite file
+def test_sqlite_pool():
+    assert "pool_size" not in database.engine_options("sqlite://", "PRIMARY")
+    assert "pool_size" not in database.engine_options("sqlite:///:memory:", "PRIMARY")
+    assert database.engine_options("sqlite:///dev.db", "PRIMARY")["pool_size"] == 10
+
+## Should use the primary for reads when there are no replicas
+def test_reads_without_replicas_use_primary():
+    with database.ReadSessionLocal("Bearer x") as db:
+        assert db.get_bind() is database.engine
+
+## Should spread reads over the replicas
+def test_reads_round_robin_over_replicas(replicas):
+    binds = []
+    for _ in range(4):
+        with database.ReadSessionLocal() as db:
+            binds.append(db.get_bind())
+    assert binds == replicas + replicas
+
+## Should send a caller's reads to the primary right after they write, then back to replicas
+def test_read_your_writes(replicas, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+    database.stick_to_primary("Bearer alice")
+    with database.ReadSessionLocal("Bearer alice") as db:
+        assert db.get_bind() is database.engine
+    with database.ReadSessionLocal("Bearer bob") as db:
+        assert db.get_bind() in replicas
+
+    now[0] += database.STICKY_SECONDS + 1
+    with database.ReadSessionLocal("Bearer alice") as db:
+        assert db.get_bind() in replicas
+
+# Routes
+## Should keep a caller on the primary after they post a tweet
+def test_write_routes_mark_caller_sticky(api_client, seeded, replicas):
+    from backend.auth import create_access_token
+    auth = f"Bearer {create_access_token({'sub': 'bob'})}"
+    api_client.post("/api/tweets", json={"content": "hello"}, headers={"Authorization": auth})
+    assert database.is_sticky(auth)
+
+## Should evict a list another reader cached from a lagging replica once the replica has caught up
+def test_stale_replica_reads_are_evicted(api_client, sqlite_engine, seeded, monkeypatch):
+    replica = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    def replicate():
+        source, target = sqlite_engine.raw_connection(), replica.raw_connection()
+        source.driver_connection.backup(target.driver_connection)
+
+    def get_replica_db(request: Request):
+        request.app.state.db_accesses += 1
+        with sessionmaker(bind=replica)() as db:
+            yield db
+
+    api_client.app.dependency_overrides[tweet_routes.get_read_db] = get_replica_db
+    monkeypatch.setattr(invalidation_bus, "replay_after", 0.2)
+    replicate()
+    assert len(api_client.get("/api/tweets").json()) == 4
+
+    api_client.post("/api/tweets", json={"content": "hello"}, headers=auth_headers("bob"))
+    # Someone else reads before the replica has the tweet, and caches the old list
+    assert len(api_client.get("/api/tweets").json()) == 4
+    replicate()
+    assert len(api_client.get("/api/tweets").json()) == 4
+    time.sleep(0.3)
+    assert len(api_client.get("/api/tweets").json()) == 5
@@ -0,0 +1,94 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.cachingsystem import cache as cache_module
+from backend.cachingsystem.etags import make_etag, etag_matches
+from backend.cachingsystem.upstream import UpstreamClient
+
+# Unit tests
+## Should produce the same strong ETag for the same bytes only
+def test_make_etag_is_content_hash():
+    assert make_etag(b"[1]") == make_etag(b"[1]")
+    assert make_etag(b"[1]") != make_etag(b"[2]")
+    assert make_etag(b"[1]").startswith('"')
+
+## Should match If-None-Match lists, wildcards and weak validators
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('"x", "abc"', True),
+    ('W/"abc"', True),
+    ("*", True),
+    ('"other"', False),
+    (None, False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+# API routes
+## Should send an ETag for the tweet list and answer a matching If-None-Match with 304
+def test_tweets_conditional_get(api_client, seeded):
+    first = api_client.get("/api/tweets")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag == make_etag(first.content)
+
+    second = api_client.get("/api/tweets", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+
+## Should change the accounts ETag when the data changes
+def test_accounts_etag_changes_on_write(api_client, seeded):
+    etag = api_client.get("/api/accounts").headers["etag"]
+    assert api_client.get("/api/accounts", headers={"If-None-Match": etag}).status_code == 304
+
+    api_client.post("/api/accounts", json={"username": "carol", "handle": "carol", "email": "carol@example.com", "password": "pw"})
+    response = api_client.get("/api/accounts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+# Cache proxy
+## Should give a cache node whose upstream honours If-None-Match
+@pytest.fixture
+def node(monkeypatch):
+    state = {"body": b'[{"id":1}]', "requests": []}
+
+    def handler(request):
+        state["requests"].append(request)
+        etag = make_etag(state["body"])
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=state["body"], headers={"ETag": etag, "Content-Type": "application/json"})
+
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(handler)))
+    cache_module.cache.clear()
+    cache_module.stats.clear()
+    with TestClient(cache_module.app) as client:
+        yield client, state
+
+## Should answer If-None-Match from the cache without sending the body
+def test_proxy_returns_304_from_cache(node):
+    client, state = node
+    etag = client.get("/api/tweets").headers["etag"]
+    response = client.get("/api/tweets", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert len(state["requests"]) == 1
+
+## Should revalidate an expired entry with a conditional request instead of refetching it
+def test_proxy_revalidates_with_conditional_request(node, monkeypatch):
+    client, state = node
+    client.get("/api/tweets")
+    entry = cache_module.cache.get_entry("tweets")
+    monkeypatch.setattr(entry, "expires_at", entry.expires_at - 1000)
+    monkeypatch.setattr(entry, "stale_until", entry.stale_until + 1000)
+
+    response = client.get("/api/tweets")
+    assert response.json() == [{"id": 1}]
+    assert state["requests"][-1].headers["if-none-match"] == make_etag(state["body"])
+    assert cache_module.stats["revalidated"] == 1
+    assert cache_module.cache.get("tweets") is not None
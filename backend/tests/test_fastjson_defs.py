@@ -0,0 +1,34 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+from datetime import datetime
+from backend import fastjson
+from backend.tweet_cache import serialize_tweet
+from backend.fastjson import dumps, load_tweet_payloads
+from backend.models import Tweet
+from backend.routes import tweet_routes, account_routes
+
+# Unit tests
+## Should produce the same bytes as the Pydantic path for every tweet
+def test_tweet_payloads_match_schema(session_factory, seeded):
+    with session_factory() as db:
+        tweets = db.query(Tweet).options(*tweet_routes.TWEET_GRAPH).all()
+        expected = {tweet.id: serialize_tweet(tweet) for tweet in tweets}
+        assert load_tweet_payloads(db, list(expected)) == expected
+
+## Should encode like FastAPI with or without orjson
+def test_dumps_fallback(monkeypatch):
+    content = {"a": "æøå", "at": datetime(2025, 1, 2, 3, 4, 5, 6), "n": [1, None]}
+    fast = dumps(content)
+    monkeypatch.setattr(fastjson, "orjson", None)
+    assert dumps(content) == fast == '{"a":"æøå","at":"2025-01-02T03:04:05.000006","n":[1,null]}'.encode()
+
+# Routes
+## Should send identical timeline and account list bodies on both paths
+def test_routes_match(api_client, seeded, monkeypatch):
+    regular = [api_client.get("/api/tweets").content, api_client.get("/api/accounts").content]
+    monkeypatch.setattr(tweet_routes, "FAST_JSON", True)
+    monkeypatch.setattr(account_routes, "FAST_JSON", True)
+    tweet_routes.tweet_cache.clear()
+    assert [api_client.get("/api/tweets").content, api_client.get("/api/accounts").content] == regular
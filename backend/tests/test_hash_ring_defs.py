@@ -0,0 +1,130 @@
+import os
+os.environ["SECRET_KEY"] = "testsecret"
+
+import gzip
+import httpx
+import pytest
+from collections import Counter
+from fastapi.testclient import TestClient
+
+from backend.cachingsystem import cache as cache_module
+from backend.cachingsystem.ring import HashRing
+from backend.cachingsystem.upstream import UpstreamClient
+
+NODES = ["http://cache1:5000", "http://cache2:5000", "http://cache3:5000"]
+KEYS = [f"tweets_{i}" for i in range(20_000)]
+
+# Unit tests
+## Should spread keys roughly evenly over the nodes
+def test_ring_balances_keys():
+    ring = HashRing(NODES)
+    counts = Counter(ring.owner(key) for key in KEYS)
+    assert set(counts) == set(NODES)
+    for count in counts.values():
+        assert abs(count - len(KEYS) / 3) < len(KEYS) * 0.06
+
+## Should move only about 1/N of the keys when a fourth node joins
+def test_adding_node_moves_few_keys():
+    ring = HashRing(NODES)
+    before = {key: ring.owner(key) for key in KEYS}
+    ring.add("http://cache4:5000")
+    moved = [key for key in KEYS if ring.owner(key) != before[key]]
+    assert all(ring.owner(key) == "http://cache4:5000" for key in moved)
+    assert 0.18 < len(moved) / len(KEYS) < 0.32
+
+## Should give keys back to their old owners when a node leaves
+def test_removing_node_restores_owners():
+    ring = HashRing(NODES)
+    before = {key: ring.owner(key) for key in KEYS[:2000]}
+    ring.add("http://cache4:5000")
+    ring.remove("http://cache4:5000")
+    assert {key: ring.owner(key) for key in KEYS[:2000]} == before
+
+## Should return None for an empty ring
+def test_empty_ring_has_no_owner():
+    assert HashRing().owner("tweets") is None
+
+# Forwarding between nodes
+# Forwarding relays the owner's raw (still encoded) body, which httpx only hands out
+# unread: MockTransport and Response(content=...) both read it first
+class PeerTransport(httpx.AsyncBaseTransport):
+    def __init__(self, handler):
+        self.handler = handler
+
+    async def handle_async_request(self, request):
+        return self.handler(request)
+
+def peer_response(body: bytes, headers: dict = None):
+    return httpx.Response(200, stream=httpx.ByteStream(body), headers={"Content-Type": "application/json", **(headers or {})})
+
+## Should set this node up as cache1 of a three node ring with stub peers and API
+@pytest.fixture
+def node(monkeypatch):
+    calls = {"api": 0, "peer": []}
+
+    def api_handler(request):
+        calls["api"] += 1
+        return httpx.Response(200, json=["from api"])
+
+    def peer_handler(request):
+        calls["peer"].append(request)
+        return peer_response(b'["from owner"]')
+
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(api_handler)))
+    monkeypatch.setattr(cache_module, "ring", HashRing(NODES))
+    monkeypatch.setattr(cache_module, "SELF_NODE", NODES[0])
+    monkeypatch.setattr(cache_module, "peers", {
+        n: UpstreamClient(n, transport=PeerTransport(peer_handler)) for n in NODES[1:]
+    })
+    cache_module.cache.clear()
+    cache_module.stats.clear()
+    with TestClient(cache_module.app) as client:
+        yield client, calls
+
+## Should forward keys owned by another node instead of caching them locally
+def test_non_owner_forwards_to_owner(node):
+    client, calls = node
+    owner = cache_module.ring.owner("accounts")
+    if owner == NODES[0]:
+        pytest.skip("accounts happens to be owned by this node")
+    response = client.get("/api/accounts")
+    assert response.json() == ["from owner"]
+    assert calls["api"] == 0
+    assert calls["peer"][0].headers[cache_module.PEER_HEADER] == NODES[0]
+    assert cache_module.cache.get("accounts") is None
+
+## Should let the owner pick the client's encoding and relay its compressed body and headers
+def test_forwarding_keeps_owner_encoding(node, monkeypatch):
+    client, calls = node
+
+    def gzip_handler(request):
+        calls["peer"].append(request)
+        headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding", "ETag": '"abc-gzip"'}
+        return peer_response(gzip.compress(b'["from owner"]'), headers)
+
+    monkeypatch.setattr(cache_module, "peers", {n: UpstreamClient(n, transport=PeerTransport(gzip_handler)) for n in NODES[1:]})
+    monkeypatch.setattr(cache_module, "owner_of", lambda key: NODES[1])
+    response = client.get("/api/accounts", headers={"Accept-Encoding": "gzip"})
+    assert calls["peer"][0].headers["accept-encoding"] == "gzip"
+    assert (response.headers["content-encoding"], response.headers["vary"], response.headers["etag"]) == ("gzip", "Accept-Encoding", '"abc-gzip"')
+    assert response.json() == ["from owner"]
+
+## Should serve a forwarded request itself rather than forwarding again
+def test_forwarded_request_is_served_locally(node):
+    client, calls = node
+    response = client.get("/api/accounts", headers={cache_module.PEER_HEADER: NODES[1]})
+    assert response.json() == ["from api"]
+    assert calls["peer"] == []
+
+## Should fall back to the API when the owner is unreachable
+def test_unreachable_owner_falls_back(node, monkeypatch):
+    client, calls = node
+
+    def down(request):
+        raise httpx.ConnectError("owner down")
+
+    monkeypatch.setattr(cache_module, "peers", {n: UpstreamClient(n, transport=httpx.MockTransport(down)) for n in NODES[1:]})
+    monkeypatch.setattr(cache_module, "owner_of", lambda key: NODES[1])
+    response = client.get("/api/tweets")
+    assert response.json() == ["from api"]
+    assert cache_module.stats["peer_errors"] == 1
@@ -0,0 +1,72 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+from backend.tests.conftest import auth_headers
+from backend.hashtags import resolve_hashtags
+from backend.models import Hashtag, Media
+
+def media_urls(session_factory, tweet_id):
+    with session_factory() as db:
+        return [url for url, in db.query(Media.url).filter(Media.tweet_id == tweet_id).order_by(Media.id)]
+
+# Unit tests
+## Should return existing and new tags in the given order, once each
+def test_resolve_hashtags(session_factory, seeded):
+    db = session_factory()
+    resolved = resolve_hashtags(db, ["new", "cats", "new", "other"])
+    assert [tag for _, tag in resolved] == ["new", "cats", "other"]
+    assert resolved[1][0] == db.query(Hashtag.id).filter(Hashtag.tag == "cats").scalar()
+    assert db.query(Hashtag).count() == 4
+    db.close()
+
+## Should pick up a tag created by a concurrent post instead of failing on the unique constraint
+def test_resolve_hashtags_race(session_factory, seeded, monkeypatch):
+    from backend import hashtags
+    other = session_factory()
+    lookup = hashtags._lookup
+
+    def lookup_then_race(db, tags):
+        found = lookup(db, tags)
+        if "racy" in tags and "racy" not in found:
+            other.add(Hashtag(tag="racy"))
+            other.commit()
+        return found
+
+    monkeypatch.setattr(hashtags, "_lookup", lookup_then_race)
+    db = session_factory()
+    (racy_id, tag), = resolve_hashtags(db, ["racy"])
+    assert racy_id == other.query(Hashtag.id).filter(Hashtag.tag == "racy").scalar()
+    db.close()
+    other.close()
+
+## Should resolve any number of tags in a fixed number of queries
+def test_resolve_hashtags_batched(session_factory, seeded, max_queries):
+    db = session_factory()
+    with max_queries(2):
+        resolve_hashtags(db, ["cats"] + [f"tag{i}" for i in range(20)])
+    db.close()
+
+# Routes
+## Should store a new tweet's hashtags and media in batches
+def test_create_tweet_batches(api_client, seeded, max_queries, session_factory):
+    tags = ["cats"] + [f"tag{i}" for i in range(10)]
+    with max_queries(12):
+        tweet = api_client.post(
+            "/api/tweets",
+            json={"content": "hi", "hashtags": tags + ["cats"], "media": ["/a.jpg", "/b.jpg"]},
+            headers=auth_headers("bob"),
+        ).json()
+    assert [h["tag"] for h in tweet["hashtags"]] == tags
+    assert media_urls(session_factory, tweet["id"]) == ["/a.jpg", "/b.jpg"]
+
+## Should replace a tweet's hashtags and media on edit
+def test_edit_tweet_replaces(api_client, seeded, session_factory):
+    tweet_id = api_client.get("/api/tweets").json()[0]["id"]
+    tweet = api_client.put(
+        f"/api/{seeded['bob']}/tweets/{tweet_id}",
+        json={"hashtags": ["dogs", "fresh"], "media": ["/c.jpg"]},
+        headers=auth_headers("bob"),
+    ).json()
+    assert sorted(h["tag"] for h in tweet["hashtags"]) == ["dogs", "fresh"]
+    assert media_urls(session_factory, tweet_id) == ["/c.jpg"]
@@ -0,0 +1,109 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import time
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.cachingsystem import cache as cache_module
+from backend.cachingsystem.engine import Cache
+from backend.cachingsystem.upstream import UpstreamClient
+from backend.cachingsystem.invalidation import InvalidationBus, tweet_change_tags, response_tags, TWEETS_TAG, TWEET_LISTS_TAG, invalidation_bus
+from backend.routes import tweet_routes
+
+# Fixtures to reduce repetition
+## Should give a cache node whose upstream always answers with a small tweet list
+@pytest.fixture
+def cache_node(monkeypatch):
+    def handler(request):
+        return httpx.Response(200, json=[{"id": 1, "content": "hello"}])
+
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(handler)))
+    cache_module.cache.clear()
+    cache_module.stats.clear()
+    with TestClient(cache_module.app) as client:
+        yield client
+
+## Should give a bus wired to the cache node the way HttpFanout would be
+@pytest.fixture
+def bus(cache_node):
+    bus = InvalidationBus()
+    bus.subscribe(lambda keys, tags: cache_node.post("/cache/invalidate", json={"keys": keys, "tags": tags}))
+    return bus
+
+# Unit tests
+## Should drop every key carrying an invalidated tag and leave the rest
+def test_engine_invalidates_by_tag():
+    cache = Cache()
+    cache.set("tweets_None", [1], tags=["tweets"])
+    cache.set("tweets_cats", [2], tags=["tweets", "hashtag:cats"])
+    cache.set("accounts", [3], tags=["accounts"])
+    assert cache.invalidate(tags=["tweets"]) == 2
+    assert cache.get("accounts") == [3]
+    assert cache.get("tweets_cats") is None
+
+## Should cover lists, author and hashtags in the tags published for a tweet
+def test_tweet_change_tags():
+    tags = tweet_change_tags(7, 3, ["cats"])
+    assert set(tags) == {"tweets", "accounts", "tweet:7", "account:3", "hashtag:cats"}
+
+## Should tag accounts/me entries by account id
+def test_response_tags_for_me():
+    assert response_tags("accounts/me", {"id": 3}) == ["account:3"]
+    assert response_tags("tweets", []) == ["tweets"]
+
+## Should keep publishing when one subscriber fails
+def test_failing_subscriber_does_not_break_publish():
+    bus = InvalidationBus()
+    received = []
+
+    def broken(keys, tags):
+        raise RuntimeError("down")
+
+    bus.subscribe(broken)
+    bus.subscribe(lambda keys, tags: received.append(tags))
+    bus.publish(tags=["tweets"])
+    assert received == [["tweets"]]
+
+## Should deliver every message again once replay_after has passed
+def test_bus_replays_after_delay():
+    bus = InvalidationBus(replay_after=0.1)
+    seen = []
+    bus.subscribe(lambda keys, tags: seen.append((keys, tags)))
+    bus.publish(keys=["k"], tags=["t"])
+    assert seen == [(["k"], ["t"])]
+    time.sleep(0.3)
+    assert seen == [(["k"], ["t"])] * 2
+
+## Should evict the cached tweet list on every cache node after a tweet event
+def test_event_evicts_cached_list_on_node(cache_node, bus):
+    cache_node.get("/api/tweets")
+    assert cache_module.cache.get("tweets") is not None
+
+    bus.publish(tags=tweet_change_tags(1, 1))
+    assert cache_module.cache.get("tweets") is None
+    assert cache_module.stats["invalidated_entries"] == 1
+
+    cache_node.get("/api/tweets")
+    assert cache_module.stats["misses"] == 2
+
+## Should evict the API's in-process tweet cache through the shared bus
+def test_in_process_route_cache_is_subscribed():
+    tweet_routes.tweet_cache.set_page("tweets_None", [1], tags=[TWEET_LISTS_TAG])
+    invalidation_bus.publish(tags=tweet_change_tags(2, 1) + [TWEET_LISTS_TAG])
+    assert tweet_routes.tweet_cache.get_page("tweets_None") is None
+
+## Should not store a response fetched while an invalidation came in
+def test_fetch_racing_invalidation_is_not_stored(monkeypatch):
+    def handler(request):
+        # The write lands while this request is in flight
+        cache_module.cache.invalidate(tags=[TWEETS_TAG])
+        return httpx.Response(200, json=["old"])
+
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(handler)))
+    cache_module.cache.clear()
+    with TestClient(cache_module.app) as client:
+        assert client.get("/api/tweets").json() == ["old"]
+    assert cache_module.cache.get("tweets") is None
@@ -0,0 +1,45 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+from sqlalchemy import inspect, text
+
+from backend.migrations import upgrade_schema
+
+ADDED_INDEXES = (
+    "ix_tweets_created_at_id", "ix_tweet_hashtag_hashtag_id", "ix_hashtags_tag_lower",
+    "ix_accounts_username_lower", "ix_accounts_email_lower",
+)
+
+def schema_objects(engine):
+    with engine.connect() as conn:
+        return set(conn.execute(text("SELECT name FROM sqlite_master")).scalars())
+
+# Fixtures to reduce repetition
+## Should turn the seeded database back into one created before follows, search and the list indexes
+def downgrade(engine):
+    with engine.begin() as conn:
+        for name in ("tweets_fts_insert", "tweets_fts_delete", "tweets_fts_update"):
+            conn.execute(text(f"DROP TRIGGER {name}"))
+        conn.execute(text("DROP TABLE tweets_fts"))
+        for name in ADDED_INDEXES:
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(text("DROP TABLE timeline_entries"))
+        conn.execute(text("DROP TABLE follows"))
+        conn.execute(text("ALTER TABLE accounts DROP COLUMN follower_count"))
+
+# Unit tests
+## Should add the missing column, tables, indexes and search objects to an older database, and be rerunnable
+def test_upgrade_schema(sqlite_engine, seeded):
+    current = schema_objects(sqlite_engine)
+    downgrade(sqlite_engine)
+    upgrade_schema(sqlite_engine)
+    upgrade_schema(sqlite_engine)
+    assert schema_objects(sqlite_engine) == current
+    assert "follower_count" in {column["name"] for column in inspect(sqlite_engine).get_columns("accounts")}
+    with sqlite_engine.begin() as conn:
+        # Tweets from before the upgrade are searchable, and new ones are indexed by the triggers
+        assert conn.execute(text("SELECT rowid FROM tweets_fts WHERE tweets_fts MATCH 'dogs'")).all()
+        conn.execute(text("INSERT INTO tweets (content, account_id) VALUES ('parrots', :id)"), {"id": seeded["bob"]})
+        assert conn.execute(text("SELECT rowid FROM tweets_fts WHERE tweets_fts MATCH 'parrots'")).all()
+        assert conn.execute(text("SELECT follower_count FROM accounts")).scalars().all() == [0, 0]
@@ -0,0 +1,82 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+from datetime import datetime
+import httpx
+from fastapi.testclient import TestClient
+
+from backend.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+from backend.cachingsystem import cache as cache_module
+from backend.cachingsystem.upstream import UpstreamClient
+
+# Unit tests
+## Should decode a cursor back to the (created_at, id) it was made from
+def test_cursor_round_trip():
+    created_at = datetime(2025, 1, 2, 3, 4, 5)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+# Routes
+## Should walk every tweet exactly once, newest first, following the cursor header
+def test_pages_cover_every_tweet_once(api_client, seeded):
+    everything = [t["id"] for t in api_client.get("/api/tweets").json()]
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = api_client.get("/api/tweets", params=params)
+        assert response.status_code == 200
+        seen += [t["id"] for t in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+    assert seen == everything
+    assert len(seen) == 4
+
+## Should keep later pages stable when a new tweet is posted
+def test_new_tweet_does_not_shift_next_page(api_client, seeded):
+    from backend.auth import create_access_token
+    first = api_client.get("/api/tweets", params={"limit": 2})
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bob'})}"}
+    api_client.post("/api/tweets", json={"content": "brand new"}, headers=headers)
+    second = api_client.get("/api/tweets", params={"limit": 2, "cursor": cursor}).json()
+    assert not {t["id"] for t in second} & {t["id"] for t in first.json()}
+    assert all(t["content"] != "brand new" for t in second)
+
+## Should reject a cursor it did not issue
+def test_invalid_cursor_is_rejected(api_client, seeded):
+    response = api_client.get("/api/tweets", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+## Should page search results the same way
+def test_search_is_paginated(api_client, seeded):
+    first = api_client.post("/api/tweets/search", json={"query": "cats", "limit": 2})
+    assert len(first.json()) == 2
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    rest = api_client.post("/api/tweets/search", json={"query": "cats", "limit": 2, "cursor": cursor})
+    assert len(rest.json()) == 1
+    assert NEXT_CURSOR_HEADER not in rest.headers
+
+# Cache proxy
+## Should cache each page under its own key and replay the cursor header on hits
+def test_proxy_caches_pages_separately(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request)
+        cursor = request.url.params.get("cursor")
+        headers = {} if cursor else {NEXT_CURSOR_HEADER: "page2"}
+        return httpx.Response(200, json=[{"page": cursor or "page1"}], headers=headers)
+
+    monkeypatch.setattr(cache_module, "upstream", UpstreamClient("http://api", transport=httpx.MockTransport(handler)))
+    cache_module.cache.clear()
+    with TestClient(cache_module.app) as client:
+        first = client.get("/api/tweets?limit=2")
+        again = client.get("/api/tweets?limit=2")
+        second = client.get("/api/tweets?limit=2&cursor=page2")
+        reordered = client.get("/api/tweets?cursor=page2&limit=2")
+
+    assert again.headers[NEXT_CURSOR_HEADER] == first.headers[NEXT_CURSOR_HEADER] == "page2"
+    assert second.json() == reordered.json() == [{"page": "page2"}]
+    assert NEXT_CURSOR_HEADER not in second.headers
+    assert len(calls) == 2
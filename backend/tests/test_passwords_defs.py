@@ -0,0 +1,94 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import sys
+import types
+import asyncio
+import importlib
+import multiprocessing
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from backend.passwords import PasswordHasher, HashPoolSaturated
+from backend.routes import account_routes
+
+# Fixtures to reduce repetition
+## Should give a small thread-based hasher and shut it down afterwards
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_queue=0, kind="thread")
+    yield hasher
+    hasher.shutdown()
+
+# Unit tests
+## Should hash and verify passwords on the pool and time queue wait and hash separately
+def test_hash_and_verify(hasher):
+    async def run():
+        hashed = await hasher.hash("secret")
+        return await hasher.verify("secret", hashed), await hasher.verify("wrong", hashed)
+    assert asyncio.run(run()) == (True, False)
+    stats = hasher.stats()
+    assert stats["completed"] == 3
+    assert stats["hash_time_p50"] > 0
+    assert stats["queue_wait_p99"] >= 0
+
+## Should hash in worker processes
+def test_process_pool():
+    hasher = PasswordHasher(workers=1, kind="process")
+    try:
+        hashed = asyncio.run(hasher.hash("secret"))
+        assert asyncio.run(hasher.verify("secret", hashed))
+    finally:
+        hasher.shutdown()
+
+## Should start workers without re-running the parent's __main__ module (backend.main when the API runs)
+def test_workers_skip_main_module(tmp_path, monkeypatch):
+    marker = tmp_path / "imported"
+    (tmp_path / "fake_api_main.py").write_text(f"open({str(marker)!r}, 'w').close()\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # As if started with `python -m fake_api_main`
+    main = types.ModuleType("__main__")
+    main.__spec__ = importlib.util.find_spec("fake_api_main")
+    monkeypatch.setitem(sys.modules, "__main__", main)
+
+    # A plain spawn pool does re-run it
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pool.submit(len, "x").result()
+    assert marker.exists()
+    marker.unlink()
+
+    hasher = PasswordHasher(workers=1, kind="process")
+    try:
+        asyncio.run(hasher.hash("secret"))
+    finally:
+        hasher.shutdown()
+    assert not marker.exists()
+    assert sys.modules["__main__"] is main
+
+## Should reject calls past workers + max_queue instead of queueing them
+def test_rejects_when_saturated(hasher):
+    async def run():
+        return await asyncio.gather(hasher.hash("a"), hasher.hash("b"), return_exceptions=True)
+    first, second = asyncio.run(run())
+    assert isinstance(first, str)
+    assert isinstance(second, HashPoolSaturated)
+    assert hasher.stats()["rejected"] == 1
+
+# Routes
+## Should sign up and log in through the pool
+def test_signup_and_login(api_client):
+    account = {"username": "carol", "handle": "carol", "email": "carol@example.com", "password": "pw"}
+    assert api_client.post("/api/accounts", json=account).json()["username"] == "carol"
+    response = api_client.post("/api/accounts/login", data={"username": "carol", "password": "pw"})
+    assert response.json()["token_type"] == "bearer"
+    assert api_client.post("/api/accounts/login", data={"username": "carol", "password": "nope"}).status_code == 400
+    assert api_client.get("/stats/passwords").json()["completed"] >= 3
+
+## Should answer 503 with Retry-After when the pool is saturated
+def test_login_busy(api_client, seeded, monkeypatch):
+    full = PasswordHasher(workers=1, max_queue=0, kind="thread")
+    full._in_flight = 1
+    monkeypatch.setattr(account_routes, "password_hasher", full)
+    response = api_client.post("/api/accounts/login", data={"username": "alice", "password": "x"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
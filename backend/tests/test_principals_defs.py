@@ -0,0 +1,73 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import time
+from sqlalchemy import event
+from backend.tests.conftest import auth_headers
+from backend.principals import Principal, load_principal, principal_cache
+from backend.routes.account_routes import get_current_user
+
+def account_lookups(sqlite_engine, action):
+    statements = []
+    def count(conn, cursor, statement, *args):
+        if "WHERE accounts.username" in statement:
+            statements.append(statement)
+    event.listen(sqlite_engine, "before_cursor_execute", count)
+    try:
+        action()
+    finally:
+        event.remove(sqlite_engine, "before_cursor_execute", count)
+    return len(statements)
+
+# Unit tests
+## Should load an account once per token and return the same immutable record after that
+def test_load_principal(session_factory, seeded):
+    expires = int(time.time()) + 60
+    principal = load_principal(session_factory, "alice", expires)
+    assert principal == Principal(seeded["alice"], "alice", "alice", 0)
+    assert load_principal(session_factory, "alice", expires) is principal
+    assert load_principal(session_factory, "nobody", expires) is None
+    principal_cache.clear()
+
+## Should not open a session when the principal is cached
+def test_cached_principal_needs_no_session(session_factory, seeded):
+    expires = int(time.time()) + 60
+    load_principal(session_factory, "alice", expires)
+
+    def no_session():
+        raise AssertionError("opened a session on a cache hit")
+
+    assert get_current_user(("alice", expires), no_session).username == "alice"
+    principal_cache.clear()
+
+## Should not keep a principal past its token's expiry
+def test_principal_ttl_capped_by_token(session_factory, seeded):
+    load_principal(session_factory, "alice", int(time.time()) - 1)
+    assert len(principal_cache) == 0
+
+# Routes
+## Should skip the account lookup on repeated authenticated writes
+def test_authenticated_writes_hit_cache(api_client, seeded, sqlite_engine):
+    headers = auth_headers("bob")
+    post = lambda: api_client.post("/api/tweets", json={"content": "hi"}, headers=headers)
+    assert account_lookups(sqlite_engine, post) == 1
+    assert account_lookups(sqlite_engine, post) == 0
+    # A new token is a new cache entry
+    assert account_lookups(sqlite_engine, lambda: api_client.post("/api/tweets", json={"content": "hi"}, headers=auth_headers("bob", 10))) == 1
+
+## Should refresh a principal after a follow changes its follower count
+def test_follow_invalidates_followee(api_client, seeded):
+    api_client.post("/api/tweets", json={"content": "warm the cache"}, headers=auth_headers("alice"))
+    assert [key.split(":")[0] for key in principal_cache.cache] == ["alice"]
+    api_client.post("/api/accounts/alice/follow", headers=auth_headers("bob"))
+    assert [key.split(":")[0] for key in principal_cache.cache] == ["bob"]
+
+## Should reject tokens for accounts that do not exist
+def test_unknown_account(api_client, seeded):
+    response = api_client.post("/api/tweets", json={"content": "hi"}, headers=auth_headers("ghost"))
+    assert response.status_code == 401
+
+## Should answer 404 on /me for a valid token whose account is gone, as before principals
+def test_me_for_missing_account(api_client, seeded):
+    assert api_client.get("/api/accounts/me", headers=auth_headers("ghost")).status_code == 404
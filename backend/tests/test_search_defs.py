@@ -0,0 +1,134 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql
+
+from backend.tests.conftest import auth_headers
+from backend.models import Tweet, Hashtag, Account
+from backend.pagination import NEXT_CURSOR_HEADER
+from backend.search import fts5_query, ranked_matches, search_tweet_ids, starts_with
+
+def add_tweets(session_factory, account_id, contents):
+    db = session_factory()
+    db.add_all([Tweet(content=content, account_id=account_id) for content in contents])
+    db.commit()
+    db.close()
+
+# Unit tests
+## Should quote user input so it can never be parsed as FTS5 syntax
+def test_fts5_query_quotes_terms():
+    assert fts5_query('cats OR "dogs') == '"cats" "OR" "dogs"'
+
+## Should rank tweets that match the query more strongly first
+def test_results_are_ranked(seeded, session_factory):
+    add_tweets(session_factory, seeded["bob"], ["dogs dogs dogs, only dogs"])
+    db = session_factory()
+    try:
+        ids, _ = search_tweet_ids(db, "dogs")
+        first = db.get(Tweet, ids[0])
+        assert first.content == "dogs dogs dogs, only dogs"
+        assert len(ids) == 2
+    finally:
+        db.close()
+
+## Should match word forms through stemming, not only exact substrings
+def test_search_matches_stems(seeded, session_factory):
+    db = session_factory()
+    try:
+        assert len(search_tweet_ids(db, "dog")[0]) == 1
+        assert search_tweet_ids(db, "!!!") == ([], None)
+    finally:
+        db.close()
+
+## Should build the Postgres query on the tsvector index
+def test_postgres_query_uses_tsvector():
+    ranked = ranked_matches("cats", "postgresql")
+    sql = str(ranked.compile(dialect=postgresql.dialect()))
+    assert "tweets.search_vector @@ websearch_to_tsquery" in sql
+    assert "CAST(ts_rank(tweets.search_vector" in sql
+    assert "AS FLOAT(53))" in sql
+
+# Routes
+## Should find edited content and forget deleted tweets
+def test_index_follows_edits_and_deletes(api_client, seeded):
+    tweet = api_client.post("/api/tweets/search", json={"query": "dogs"}).json()[0]
+    api_client.put(
+        f"/api/{seeded['bob']}/tweets/{tweet['id']}",
+        json={"content": "bob likes parrots"},
+        headers=auth_headers("bob"),
+    )
+    assert api_client.post("/api/tweets/search", json={"query": "dogs"}).json() == []
+    assert api_client.post("/api/tweets/search", json={"query": "parrots"}).json()[0]["id"] == tweet["id"]
+
+    api_client.delete(f"/api/{seeded['bob']}/tweets/{tweet['id']}", headers=auth_headers("bob"))
+    assert api_client.post("/api/tweets/search", json={"query": "parrots"}).json() == []
+
+## Should page ranked results without repeating or skipping any
+def test_ranked_pages_cover_every_match(api_client, seeded, session_factory):
+    add_tweets(session_factory, seeded["bob"], [f"cats {'cats ' * i}forever" for i in range(5)])
+    everything = [t["id"] for t in api_client.get("/api/tweets", params={"q": "cats", "limit": 200}).json()]
+    seen, cursor = [], None
+    while True:
+        params = {"q": "cats", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = api_client.get("/api/tweets", params=params)
+        seen += [t["id"] for t in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+    assert seen == everything
+    assert len(seen) == 8
+
+# Hashtag and account typeahead
+def add_hashtags(session_factory, uses):
+    # uses: {tag: number of tweets carrying it}
+    db = session_factory()
+    account = db.query(Account).first()
+    for tag, count in uses.items():
+        hashtag = Hashtag(tag=tag)
+        db.add_all([Tweet(content=f"about {tag}", account_id=account.id, hashtags=[hashtag]) for _ in range(count)])
+        db.add(hashtag)
+    db.commit()
+    db.close()
+
+## Should list prefix matches first, most used first, then "contains" matches
+def test_hashtag_search_ranks_prefix_then_popularity(api_client, seeded, session_factory):
+    add_hashtags(session_factory, {"pythonic": 1, "python": 3, "ilovepython": 5})
+    tags = [h["tag"] for h in api_client.post("/api/hashtags/search", json={"query": "Py"}).json()]
+    assert tags == ["python", "pythonic", "ilovepython"]
+
+## Should return at most limit results
+def test_hashtag_search_is_limited(api_client, seeded, session_factory):
+    add_hashtags(session_factory, {f"tag{i}": 0 for i in range(30)})
+    assert len(api_client.post("/api/hashtags/search", json={"query": "tag"}).json()) == 20
+    assert len(api_client.post("/api/hashtags/search", json={"query": "tag", "limit": 5}).json()) == 5
+
+## Should treat LIKE wildcards in the query as plain characters
+def test_hashtag_search_escapes_wildcards(api_client, seeded, session_factory):
+    add_hashtags(session_factory, {"snake_case": 0, "snakecase": 0})
+    tags = [h["tag"] for h in api_client.post("/api/hashtags/search", json={"query": "e_c"}).json()]
+    assert tags == ["snake_case"]
+
+## Should answer the prefix case from the lower(tag) index, not a table scan
+def test_prefix_search_uses_index(seeded, session_factory):
+    db = session_factory()
+    try:
+        query = db.query(Hashtag).filter(starts_with(func.lower(Hashtag.tag), "ca", "sqlite"))
+        sql = str(query.statement.compile(compile_kwargs={"literal_binds": True}))
+        plan = " ".join(str(row) for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert "ix_hashtags_tag_lower" in plan
+    finally:
+        db.close()
+
+## Should rank accounts by closest username and match on email too
+def test_account_search(api_client, seeded, session_factory):
+    db = session_factory()
+    db.add_all([
+        Account(username="alicewonder", handle="aw", email="aw@example.com", password="x"),
+        Account(username="carol", handle="carol", email="carol@alice.dev", password="x"),
+    ])
+    db.commit()
+    db.close()
+    names = [a["username"] for a in api_client.post("/api/accounts/search", json={"query": "ALICE"}).json()]
+    assert names == ["alice", "alicewonder", "carol"]
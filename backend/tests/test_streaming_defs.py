@@ -0,0 +1,56 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import json
+from backend import streaming
+from backend.models import Account
+from backend.streaming import NDJSON, tweet_lines, tweet_stream, account_lines
+
+def lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+# Unit tests
+## Should send every tweet, newest first, with one query set per batch
+def test_tweet_lines_batches(session_factory, seeded, monkeypatch, max_queries):
+    monkeypatch.setattr(streaming, "BATCH_SIZE", 2)
+    with max_queries(1 + 3 * 2):
+        chunks = list(tweet_lines(session_factory, tweet_stream("sqlite")))
+    assert len(chunks) == 2
+    ids = [json.loads(line)["id"] for chunk in chunks for line in chunk.splitlines()]
+    assert ids == sorted(ids, reverse=True) and len(ids) == 4
+
+## Should give accounts without tweets an empty list
+def test_account_lines_without_tweets(session_factory, seeded):
+    with session_factory() as db:
+        db.add(Account(username="carol", handle="carol", email="carol@example.com", password="x"))
+        db.commit()
+    accounts = [json.loads(line) for chunk in account_lines(session_factory) for line in chunk.splitlines()]
+    assert [(a["username"], len(a["tweets"])) for a in accounts] == [("alice", 3), ("bob", 1), ("carol", 0)]
+
+# Routes
+## Should stream the same tweets as the JSON list, asked for with Accept or stream=true
+def test_tweets_stream(api_client, seeded):
+    expected = api_client.get("/api/tweets").json()
+    by_header = api_client.get("/api/tweets", headers={"Accept": NDJSON})
+    assert by_header.headers["content-type"] == NDJSON
+    assert "etag" not in by_header.headers
+    assert lines(by_header) == expected
+    assert lines(api_client.get("/api/tweets", params={"stream": "true", "q": "cats"})) == api_client.get("/api/tweets", params={"q": "cats"}).json()
+
+## Should stream from the cursor to the end, ignoring limit
+def test_tweets_stream_from_cursor(api_client, seeded):
+    first = api_client.get("/api/tweets", params={"limit": 1})
+    rest = api_client.get("/api/tweets", params={"cursor": first.headers["x-next-cursor"], "limit": 1, "stream": "true"})
+    assert [tweet["id"] for tweet in first.json() + lines(rest)] == [tweet["id"] for tweet in api_client.get("/api/tweets").json()]
+
+## Should stream search results in rank order
+def test_search_stream(api_client, seeded):
+    expected = api_client.post("/api/tweets/search", json={"query": "cats"}).json()
+    assert lines(api_client.post("/api/tweets/search?stream=true", json={"query": "cats"})) == expected
+    assert api_client.post("/api/tweets/search", json={"query": "!!"}, headers={"Accept": NDJSON}).text == ""
+
+## Should stream the same accounts as the JSON list
+def test_accounts_stream(api_client, seeded):
+    expected = api_client.get("/api/accounts").json()
+    assert lines(api_client.get("/api/accounts", headers={"Accept": NDJSON})) == expected
@@ -0,0 +1,77 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+from backend import timeline
+from backend.tests.conftest import auth_headers
+from backend.models import TimelineEntry
+from backend.pagination import NEXT_CURSOR_HEADER
+
+def post(api_client, username, content):
+    return api_client.post("/api/tweets", json={"content": content}, headers=auth_headers(username)).json()["id"]
+
+def home(api_client, username, **params):
+    return [t["content"] for t in api_client.get("/api/timeline", params=params, headers=auth_headers(username)).json()]
+
+def entries(session_factory, account_id):
+    with session_factory() as db:
+        return db.query(TimelineEntry).filter(TimelineEntry.account_id == account_id).count()
+
+# Unit tests
+## Should keep only the newest TIMELINE_LENGTH entries of a timeline
+def test_trim(api_client, seeded, session_factory, monkeypatch):
+    for i in range(4):
+        post(api_client, "bob", f"bob {i}")
+    monkeypatch.setattr(timeline, "TIMELINE_LENGTH", 2)
+    with session_factory() as db:
+        timeline.trim(db, [seeded["bob"]])
+        db.commit()
+    assert entries(session_factory, seeded["bob"]) == 2
+    assert home(api_client, "bob") == ["bob 3", "bob 2"]
+
+# Routes
+## Should show the followed account's recent tweets, then new ones as they are posted
+def test_follow_backfills_and_fans_out(api_client, seeded):
+    assert home(api_client, "bob") == []
+    api_client.post("/api/accounts/alice/follow", headers=auth_headers("bob"))
+    assert home(api_client, "bob") == [f"alice tweet {i} about cats" for i in (2, 1, 0)]
+
+    post(api_client, "alice", "fresh")
+    post(api_client, "bob", "own")
+    assert home(api_client, "bob")[:2] == ["own", "fresh"]
+    assert home(api_client, "alice") == ["fresh"]
+
+## Should page through the timeline with the cursor header
+def test_timeline_pages(api_client, seeded):
+    api_client.post("/api/accounts/alice/follow", headers=auth_headers("bob"))
+    first = api_client.get("/api/timeline", params={"limit": 2}, headers=auth_headers("bob"))
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    second = api_client.get("/api/timeline", params={"limit": 2, "cursor": cursor}, headers=auth_headers("bob"))
+    assert len(first.json()) == 2 and len(second.json()) == 1
+    assert NEXT_CURSOR_HEADER not in second.headers
+
+## Should drop the account's tweets from the timeline on unfollow, and deleted tweets everywhere
+def test_unfollow_and_delete(api_client, seeded, session_factory):
+    api_client.post("/api/accounts/alice/follow", headers=auth_headers("bob"))
+    tweet_id = post(api_client, "bob", "gone soon")
+    api_client.delete(f"/api/{seeded['bob']}/tweets/{tweet_id}", headers=auth_headers("bob"))
+    assert "gone soon" not in home(api_client, "bob")
+
+    api_client.delete("/api/accounts/alice/follow", headers=auth_headers("bob"))
+    assert home(api_client, "bob") == []
+    assert entries(session_factory, seeded["bob"]) == 0
+
+## Should not fan out accounts over the follower threshold, but merge their tweets in at read time
+def test_high_follower_accounts_are_pulled(api_client, seeded, session_factory, monkeypatch):
+    monkeypatch.setattr(timeline, "FANOUT_MAX_FOLLOWERS", 0)
+    api_client.post("/api/accounts/alice/follow", headers=auth_headers("bob"))
+    post(api_client, "alice", "celebrity tweet")
+    post(api_client, "bob", "own")
+    assert entries(session_factory, seeded["bob"]) == 1
+    assert home(api_client, "bob") == ["own", "celebrity tweet"] + [f"alice tweet {i} about cats" for i in (2, 1, 0)]
+
+## Should reject following yourself, unknown accounts and anonymous callers
+def test_follow_errors(api_client, seeded):
+    assert api_client.post("/api/accounts/bob/follow", headers=auth_headers("bob")).status_code == 400
+    assert api_client.post("/api/accounts/nobody/follow", headers=auth_headers("bob")).status_code == 404
+    assert api_client.get("/api/timeline").status_code == 401
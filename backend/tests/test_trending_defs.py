@@ -0,0 +1,114 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import pytest
+from backend import trending as trending_module
+from backend.tests.conftest import auth_headers
+from backend.trending import CountMinSketch, SlidingWindow, TrendingEngine, trending, recent_uses, window_start
+
+# Fixtures to reduce repetition
+## Should recompute rankings on every read, so tests see each write
+@pytest.fixture(autouse=True)
+def no_refresh_delay(monkeypatch):
+    monkeypatch.setattr(trending_module, "REFRESH_SECONDS", 0)
+
+## Should load the engine from the seeded database, as startup does
+@pytest.fixture
+def loaded(api_client, seeded, session_factory):
+    with session_factory() as db:
+        trending.load(recent_uses(db, window_start("24h")))
+    return seeded
+
+# Unit tests
+## Should never undercount, and count exactly when keys do not collide
+def test_count_min_sketch():
+    sketch = CountMinSketch(width=64, depth=4)
+    for i in range(200):
+        sketch.add(f"tag{i % 20}")
+    assert all(sketch.estimate(f"tag{i}") >= 10 for i in range(20))
+    exact = CountMinSketch()
+    exact.add("cats", 3)
+    exact.add("cats", -1)
+    assert exact.estimate("cats") == 2
+    assert exact.estimate("dogs") == 0
+
+## Should rank by uses within the window and forget buckets that slide out of it
+def test_sliding_window():
+    window = SlidingWindow(length=3600, bucket_length=300, k=10)
+    now = 1_000_000.0
+    for _ in range(3):
+        window.add("old", now - 3000, now=now)
+    for _ in range(2):
+        window.add("new", now - 10, now=now)
+    window.add("other", now - 10, now=now)
+    window.add("ancient", now - 4000, now=now)
+    assert window.top(10, now=now) == [("old", 3), ("new", 2), ("other", 1)]
+    assert window.top(1, now=now + 700) == [("new", 2)]
+
+## Should keep the most used tags of a bucket when there are more than k
+def test_bucket_keeps_heavy_hitters():
+    window = SlidingWindow(length=3600, bucket_length=300, k=2)
+    now = 1_000_000.0
+    for i in range(50):
+        window.add(f"rare{i}", now, now=now)
+    for _ in range(5):
+        window.add("hot", now, now=now)
+        window.add("warm", now, now=now)
+    assert [tag for tag, _ in window.top(2, now=now)] == ["hot", "warm"]
+
+## Should count uses in both windows and take them back
+def test_engine_record():
+    engine = TrendingEngine()
+    engine.record(["cats", "dogs"])
+    engine.record(["cats"])
+    engine.record(["dogs"], count=-1)
+    assert engine.top("1h", 10) == [("cats", 2)]
+    assert engine.top("24h", 10) == [("cats", 2)]
+
+## Should keep the uses recorded while a load is reading the database
+def test_engine_load_keeps_concurrent_records():
+    engine = TrendingEngine()
+
+    def uses():
+        yield "cats", None
+        engine.record(["dogs"])
+        yield "cats", None
+
+    engine.load(uses())
+    assert engine.top("1h", 10) == [("cats", 2), ("dogs", 1)]
+
+## Should not count twice a use recorded before the load's snapshot that its rows include
+def test_engine_load_skips_records_before_snapshot():
+    engine = TrendingEngine()
+    engine.snapshot()
+    engine.record(["cats"])
+    engine.load([("cats", None)], engine.snapshot())
+    assert engine.top("1h", 10) == [("cats", 1)]
+
+# Routes
+## Should count in the database until the engine has loaded
+def test_trending_before_load(api_client, seeded):
+    trending.clear()
+    assert api_client.get("/api/hashtags/trending").json() == [{"tag": "cats", "uses": 4}, {"tag": "dogs", "uses": 1}]
+
+## Should serve the same ranking from memory after loading, and follow new, edited and deleted tweets
+def test_trending_follows_writes(api_client, loaded):
+    assert api_client.get("/api/hashtags/trending", params={"window": "24h"}).json() == [
+        {"tag": "cats", "uses": 4}, {"tag": "dogs", "uses": 1},
+    ]
+    tweet = api_client.post("/api/tweets", json={"content": "x", "hashtags": ["dogs", "birds"]}, headers=auth_headers("bob")).json()
+    api_client.post("/api/tweets", json={"content": "y", "hashtags": ["birds"]}, headers=auth_headers("bob"))
+    assert api_client.get("/api/hashtags/trending", params={"limit": 2}).json() == [
+        {"tag": "cats", "uses": 4}, {"tag": "birds", "uses": 2},
+    ]
+
+    api_client.put(f"/api/{loaded['bob']}/tweets/{tweet['id']}", json={"hashtags": ["birds", "fish"]}, headers=auth_headers("bob"))
+    api_client.delete(f"/api/{loaded['bob']}/tweets/{tweet['id']}", headers=auth_headers("bob"))
+    assert api_client.get("/api/hashtags/trending").json() == [
+        {"tag": "cats", "uses": 4}, {"tag": "birds", "uses": 1}, {"tag": "dogs", "uses": 1},
+    ]
+
+## Should reject unknown windows
+def test_trending_window_validation(api_client):
+    assert api_client.get("/api/hashtags/trending", params={"window": "7d"}).status_code == 422
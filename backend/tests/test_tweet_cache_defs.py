@@ -0,0 +1,135 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+
+import json
+
+from backend.tests.conftest import auth_headers
+from backend.tweet_cache import TweetCache, compose_list
+from backend.routes import tweet_routes
+from backend.cachingsystem.invalidation import invalidation_bus, tweet_tag, TWEET_LISTS_TAG
+
+# Unit tests
+## Should report which ids are cached and which must be loaded
+def test_multi_get_splits_found_and_missing():
+    cache = TweetCache()
+    cache.put_tweets({1: b'{"id":1}', 3: b'{"id":3}'})
+    payloads, missing = cache.get_tweets([1, 2, 3])
+    assert payloads == {1: b'{"id":1}', 3: b'{"id":3}'}
+    assert missing == [2]
+
+## Should evict one entity without touching the id lists
+def test_entity_invalidation_keeps_lists():
+    cache = TweetCache()
+    cache.set_page("tweets_None", [1, 2], tags=["tweet_lists"])
+    cache.put_tweets({1: b'{"id":1}', 2: b'{"id":2}'})
+    cache.invalidate(tags=["tweet:1"])
+    assert cache.get_page("tweets_None") == ((1, 2), None)
+    assert cache.get_tweets([1, 2]) == ({2: b'{"id":2}'}, [1])
+
+## Should compose cached payloads into one JSON array
+def test_compose_list():
+    assert json.loads(compose_list([b'{"id":1}', b'{"id":2}'])) == [{"id": 1}, {"id": 2}]
+    assert compose_list([]) == b"[]"
+
+# Routes
+FIRST_PAGE = "tweets_None_None_50"
+
+## Should build the list from cached entities and keep the id order
+def test_get_tweets_composes_from_entities(api_client, seeded):
+    response = api_client.get("/api/tweets")
+    assert response.status_code == 200
+    ids = [t["id"] for t in response.json()]
+    assert ids == sorted(ids, reverse=True)
+    assert tweet_routes.tweet_cache.get_page(FIRST_PAGE) == (tuple(ids), None)
+    assert tweet_routes.tweet_cache.get_tweets(ids)[1] == []
+
+## Should keep the TweetRead response shape
+def test_get_tweets_response_shape(api_client, seeded):
+    tweet = api_client.get("/api/tweets").json()[-1]
+    assert set(tweet) == {"id", "content", "created_at", "account", "likes", "hashtags", "media"}
+    assert tweet["account"] == {"id": seeded["alice"]}
+    assert tweet["hashtags"][0]["tag"] == "cats"
+    assert tweet["media"][0]["media_type"] == "image"
+
+## Should touch only the edited tweet's entity entry on edit
+def test_edit_only_evicts_one_entity(api_client, seeded):
+    tweets = api_client.get("/api/tweets").json()
+    target = tweets[-1]
+    response = api_client.put(
+        f"/api/{seeded['alice']}/tweets/{target['id']}",
+        json={"hashtags": ["dogs"]},
+        headers=auth_headers("alice"),
+    )
+    assert response.status_code == 200
+    assert tweet_routes.tweet_cache.get_page(FIRST_PAGE) is not None
+    _, missing = tweet_routes.tweet_cache.get_tweets([t["id"] for t in tweets])
+    assert missing == [target["id"]]
+
+    updated = api_client.get("/api/tweets").json()
+    assert updated[-1]["hashtags"][0]["tag"] == "dogs"
+
+## Should not store ids or tweets read before an invalidation that landed during the request
+def test_invalidation_during_read_skips_store(api_client, seeded, monkeypatch):
+    paginate, load = tweet_routes.paginate_tweet_ids, tweet_routes.load_tweet_payloads
+
+    def paginate_then_write(*args):
+        page = paginate(*args)
+        invalidation_bus.publish(tags=[TWEET_LISTS_TAG])
+        return page
+
+    def load_then_write(db, ids):
+        payloads = load(db, ids)
+        invalidation_bus.publish(tags=[tweet_tag(ids[0])])
+        return payloads
+
+    monkeypatch.setattr(tweet_routes, "FAST_JSON", True)
+    monkeypatch.setattr(tweet_routes, "paginate_tweet_ids", paginate_then_write)
+    monkeypatch.setattr(tweet_routes, "load_tweet_payloads", load_then_write)
+    ids = [t["id"] for t in api_client.get("/api/tweets").json()]
+    assert len(ids) == 4
+    assert tweet_routes.tweet_cache.get_page(FIRST_PAGE) is None
+    assert tweet_routes.tweet_cache.get_tweets(ids) == ({}, ids)
+
+## Should refresh the lists when a tweet is created
+def test_create_invalidates_lists(api_client, seeded):
+    before = api_client.get("/api/tweets").json()
+    api_client.post("/api/tweets", json={"content": "new one"}, headers=auth_headers("bob"))
+    after = api_client.get("/api/tweets").json()
+    assert len(after) == len(before) + 1
+
+## Should drop search lists when a tweet's content changes
+def test_content_edit_invalidates_search_lists(api_client, seeded):
+    assert len(api_client.get("/api/tweets", params={"q": "dogs"}).json()) == 1
+    alice_tweet = api_client.get("/api/tweets").json()[-1]
+    api_client.put(
+        f"/api/{seeded['alice']}/tweets/{alice_tweet['id']}",
+        json={"content": "now about dogs"},
+        headers=auth_headers("alice"),
+    )
+    assert len(api_client.get("/api/tweets", params={"q": "dogs"}).json()) == 2
+
+## Should serve a cache hit without issuing any SQL
+def test_cache_hit_issues_zero_sql(api_client, seeded, max_queries):
+    first = api_client.get("/api/tweets")
+    with max_queries(0):
+        second = api_client.get("/api/tweets")
+    assert second.content == first.content
+
+## Should produce exactly the bytes response_model serialization would
+def test_composed_body_matches_response_model(api_client, seeded, session_factory):
+    from typing import List
+    from pydantic import TypeAdapter
+    from backend.models import Tweet
+    from backend.schemas import TweetRead
+
+    body = api_client.get("/api/tweets").content
+    db = session_factory()
+    try:
+        tweets = db.query(Tweet).order_by(Tweet.created_at.desc(), Tweet.id.desc()).all()
+        adapter = TypeAdapter(List[TweetRead])
+        expected = adapter.dump_json(adapter.validate_python(tweets, from_attributes=True))
+    finally:
+        db.close()
+    assert body == expected
@@ -0,0 +1,105 @@
+import os
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["SECRET_KEY"] = "testsecret"
+
+import pytest
+from backend.tests.conftest import auth_headers
+from backend.typeahead import PrefixIndex, build_indexes, hashtag_index, account_index
+
+# Fixtures to reduce repetition
+## Should load both indexes from the seeded database, as startup does
+@pytest.fixture
+def indexed(api_client, seeded, session_factory):
+    db = session_factory()
+    try:
+        build_indexes(db)
+    finally:
+        db.close()
+    return seeded
+
+# Unit tests
+## Should return the most used items for a prefix, ties in key order
+def test_top_ranks_by_usage():
+    index = PrefixIndex()
+    index.load([(1, "cats", ["cats"], 2), (2, "catnip", ["catnip"], 5), (3, "cattle", ["cattle"], 2), (4, "dogs", ["dogs"], 9)])
+    assert index.top("CAT", 10) == [2, 1, 3]
+    assert index.top("cat", 1) == [2]
+    assert index.top("x", 10) == []
+    assert index.top("  ", 10) == []
+
+## Should list an item matched by several keys only once
+def test_item_with_several_keys_is_listed_once():
+    index = PrefixIndex()
+    index.load([(1, "alice", ["alice", "alice_h"], 0)])
+    assert index.top("ali", 10) == [1]
+
+## Should see new items and count changes right away, even for cached prefixes
+def test_updates_are_visible_immediately():
+    index = PrefixIndex()
+    index.load([(1, "cats", ["cats"], 1)])
+    assert index.top("ca", 10) == [1]
+    index.add(2, "cars", ["cars"])
+    index.bump(2, 5)
+    assert index.top("ca", 10) == [2, 1]
+
+## Should keep cached results for prefixes an update cannot affect
+def test_unrelated_update_keeps_cached_prefix():
+    index = PrefixIndex()
+    index.load([(1, "cats", ["cats"], 1), (2, "dogs", ["dogs"], 1)])
+    index.top("ca", 10)
+    index.bump(2)
+    assert "ca" in index._top
+    index.bump(1)
+    assert "ca" not in index._top
+
+## Should keep items added while a load reads its rows, without replaying writes from before its snapshot
+def test_load_keeps_concurrent_writes():
+    index = PrefixIndex()
+
+    def rows():
+        yield 1, "cats", ["cats"], 1
+        index.add(2, "cars", ["cars"])
+        index.bump(2, 3)
+
+    index.load(rows())
+    assert index.top("ca", 10) == [2, 1]
+    assert index._counts[2] == 3
+
+    index.snapshot()
+    index.add(3, "cows", ["cows"])
+    index.bump(3, 4)
+    # The rows already include the writes above
+    index.load([(3, "cows", ["cows"], 4)], index.snapshot())
+    assert index._counts[3] == 4
+
+# Routes
+## Should answer hashtag search from memory without touching the database
+def test_hashtag_search_served_from_index(indexed, api_client, max_queries):
+    with max_queries(0):
+        response = api_client.post("/api/hashtags/search", json={"query": "ca"})
+    assert [h["tag"] for h in response.json()] == ["cats"]
+
+## Should fall back to the database when the index has no prefix match
+def test_hashtag_search_falls_back_to_database(indexed, api_client):
+    response = api_client.post("/api/hashtags/search", json={"query": "og"})
+    assert [h["tag"] for h in response.json()] == ["dogs"]
+
+## Should index hashtags and accounts created after startup
+def test_new_entries_are_indexed(indexed, api_client):
+    api_client.post("/api/tweets", json={"content": "hi", "hashtags": ["catnip", "cats"]}, headers=auth_headers("bob"))
+    api_client.post("/api/tweets", json={"content": "hi", "hashtags": ["catnip"]}, headers=auth_headers("bob"))
+    assert [hashtag_index.label(i) for i in hashtag_index.top("cat", 10)] == ["cats", "catnip"]
+
+    api_client.post("/api/accounts", json={"username": "alfred", "handle": "alf", "email": "alf@example.com", "password": "pw"})
+    response = api_client.post("/api/accounts/search", json={"query": "al"})
+    assert [a["username"] for a in response.json()] == ["alice", "alfred"]
+
+## Should keep usage counts in step with edits and deletes
+def test_edit_and_delete_update_counts(indexed, api_client):
+    tweet = api_client.post("/api/tweets", json={"content": "x", "hashtags": ["dogs"]}, headers=auth_headers("bob")).json()
+    dogs = tweet["hashtags"][0]["id"]
+    assert hashtag_index._counts[dogs] == 2
+    api_client.put(f"/api/{indexed['bob']}/tweets/{tweet['id']}", json={"hashtags": ["cats"]}, headers=auth_headers("bob"))
+    assert hashtag_index._counts[dogs] == 1
+    api_client.delete(f"/api/{indexed['bob']}/tweets/{tweet['id']}", headers=auth_headers("bob"))
+    assert account_index._counts[indexed["bob"]] == 1
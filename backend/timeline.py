@@ -0,0 +1,159 @@
+from sqlalchemy import select, insert, delete, update, union, union_all, func, literal, tuple_, DateTime
+from sqlalchemy.orm import Session
+from backend.cachingsystem.settings import env_int
+from backend.models import Account, Tweet, Follow, TimelineEntry
+from backend.pagination import recent_page, recent_cursor, DEFAULT_PAGE_SIZE
+
+# Precomputed home timelines (fan-out on write).
+# When a tweet is created, one INSERT ... SELECT adds it to the timeline of its
+# author and of every follower, in the tweet's own transaction. A home timeline
+# page is then one range scan of timeline_entries plus a multi-get of the tweets
+# through the entity cache.
+# Accounts with more than TIMELINE_FANOUT_MAX_FOLLOWERS followers are not fanned out,
+# since one tweet would write that many rows; their followers pull those tweets at
+# read time, merged into the page on (created_at, id).
+# Timelines are bounded to TIMELINE_LENGTH entries. Fan-outs trim the timelines they
+# touch once every TIMELINE_TRIM_EVERY tweets, so a timeline can briefly run over.
+
+TIMELINE_LENGTH = env_int("TIMELINE_LENGTH", 800)
+FANOUT_MAX_FOLLOWERS = env_int("TIMELINE_FANOUT_MAX_FOLLOWERS", 10_000)
+TRIM_EVERY = env_int("TIMELINE_TRIM_EVERY", 50)
+
+TIMELINE_COLUMNS = ["account_id", "tweet_id", "created_at", "author_id"]
+
+
+def fans_out(account: Account) -> bool:
+    return account.follower_count <= FANOUT_MAX_FOLLOWERS
+
+
+def followers_of(account_id: int):
+    return select(Follow.follower_id).where(Follow.followee_id == account_id)
+
+
+def trim(db: Session, account_ids):
+    # Drops everything past the newest TIMELINE_LENGTH entries of each timeline
+    entries = TimelineEntry.__table__
+    position = func.row_number().over(
+        partition_by=entries.c.account_id,
+        order_by=(entries.c.created_at.desc(), entries.c.tweet_id.desc()),
+    )
+    ranked = (
+        select(entries.c.account_id, entries.c.tweet_id, position.label("position"))
+        .where(entries.c.account_id.in_(account_ids))
+        .subquery()
+    )
+    overflow = select(ranked.c.account_id, ranked.c.tweet_id).where(ranked.c.position > TIMELINE_LENGTH)
+    db.execute(delete(entries).where(tuple_(entries.c.account_id, entries.c.tweet_id).in_(overflow)))
+
+
+def fan_out(db: Session, tweet: Tweet, author):
+    # author: an Account or the author's Principal. Call after the tweet is flushed
+    # (it needs its id and created_at)
+    receivers = select(literal(author.id).label("account_id"))
+    if fans_out(author):
+        receivers = union_all(receivers, followers_of(author.id))
+    receivers = receivers.subquery()
+    rows = select(
+        receivers.c.account_id,
+        literal(tweet.id),
+        literal(tweet.created_at, DateTime),
+        literal(author.id),
+    )
+    db.execute(insert(TimelineEntry.__table__).from_select(TIMELINE_COLUMNS, rows))
+    if tweet.id % TRIM_EVERY == 0:
+        trim(db, select(receivers.c.account_id))
+
+
+def forget_tweet(db: Session, tweet_id: int):
+    # Before the tweet itself is deleted
+    db.execute(delete(TimelineEntry.__table__).where(TimelineEntry.tweet_id == tweet_id))
+
+
+def follow(db: Session, follower_id: int, followee: Account) -> bool:
+    # False if already following; otherwise records the follow and backfills the
+    # followee's recent tweets into the follower's timeline
+    if db.get(Follow, (follower_id, followee.id)) is not None:
+        return False
+    db.add(Follow(follower_id=follower_id, followee_id=followee.id))
+    db.execute(
+        update(Account.__table__)
+        .where(Account.id == followee.id)
+        .values(follower_count=Account.follower_count + 1)
+    )
+    db.refresh(followee, ["follower_count"])
+    if fans_out(followee):
+        recent = (
+            select(literal(follower_id), Tweet.id, Tweet.created_at, Tweet.account_id)
+            .where(Tweet.account_id == followee.id)
+            .order_by(Tweet.created_at.desc(), Tweet.id.desc())
+            .limit(TIMELINE_LENGTH)
+        )
+        db.execute(insert(TimelineEntry.__table__).from_select(TIMELINE_COLUMNS, recent))
+        trim(db, [follower_id])
+    return True
+
+
+def unfollow(db: Session, follower_id: int, followee: Account) -> bool:
+    # False if not following; otherwise removes the followee's tweets from the timeline
+    existing = db.get(Follow, (follower_id, followee.id))
+    if existing is None:
+        return False
+    db.delete(existing)
+    db.execute(
+        update(Account.__table__)
+        .where(Account.id == followee.id)
+        .values(follower_count=Account.follower_count - 1)
+    )
+    db.execute(
+        delete(TimelineEntry.__table__)
+        .where(TimelineEntry.account_id == follower_id, TimelineEntry.author_id == followee.id)
+    )
+    return True
+
+
+def rebuild_timelines(db: Session):
+    # Recomputes every follower count from follows and every home timeline from scratch,
+    # as fan-out would have built them (after a bulk import, which loads neither)
+    followers = select(func.count()).where(Follow.followee_id == Account.id).scalar_subquery()
+    db.execute(update(Account.__table__).values(follower_count=followers))
+    db.execute(delete(TimelineEntry.__table__))
+    received = union_all(
+        select(
+            Tweet.account_id.label("account_id"), Tweet.id.label("tweet_id"),
+            Tweet.created_at.label("created_at"), Tweet.account_id.label("author_id"),
+        ),
+        select(Follow.follower_id, Tweet.id, Tweet.created_at, Tweet.account_id)
+        .join(Tweet, Tweet.account_id == Follow.followee_id)
+        .join(Account, Account.id == Follow.followee_id)
+        .where(Account.follower_count <= FANOUT_MAX_FOLLOWERS),
+    ).subquery()
+    position = func.row_number().over(
+        partition_by=received.c.account_id,
+        order_by=(received.c.created_at.desc(), received.c.tweet_id.desc()),
+    )
+    ranked = select(received, position.label("position")).subquery()
+    rows = select(*(ranked.c[name] for name in TIMELINE_COLUMNS)).where(ranked.c.position <= TIMELINE_LENGTH)
+    db.execute(insert(TimelineEntry.__table__).from_select(TIMELINE_COLUMNS, rows))
+
+
+def timeline_page(account_id: int, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    # (statement, cursor_for) for one page of the account's home timeline, newest first.
+    # Pushed entries and the tweets pulled from followed accounts that are not fanned out
+    # are each paged on their own index, then merged; UNION drops a tweet found both ways
+    # (posted before its author crossed the threshold).
+    pushed = recent_page(
+        select(TimelineEntry.tweet_id.label("id"), TimelineEntry.created_at)
+        .where(TimelineEntry.account_id == account_id),
+        cursor, limit, created_at=TimelineEntry.created_at, id=TimelineEntry.tweet_id,
+    ).subquery()
+    pulled_from = (
+        select(Follow.followee_id)
+        .join(Account, Account.id == Follow.followee_id)
+        .where(Follow.follower_id == account_id, Account.follower_count > FANOUT_MAX_FOLLOWERS)
+    )
+    pulled = recent_page(
+        select(Tweet.id, Tweet.created_at).where(Tweet.account_id.in_(pulled_from)), cursor, limit
+    ).subquery()
+    feed = union(select(pushed.c.id, pushed.c.created_at), select(pulled.c.id, pulled.c.created_at)).subquery()
+    stmt = recent_page(select(feed.c.id, feed.c.created_at), None, limit, created_at=feed.c.created_at, id=feed.c.id)
+    return stmt, recent_cursor
@@ -0,0 +1,237 @@
+import time
+import hashlib
+import threading
+from array import array
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import func
+from backend import database
+from backend.cachingsystem.settings import env_int
+from backend.models import Tweet, Hashtag
+from backend.models.association_model import tweet_hashtag_table
+
+# Trending hashtags, counted in memory as tweets are written.
+# Each window (1h, 24h) is a ring of time buckets. A bucket holds a count-min sketch
+# of tag uses plus its top-K tags, so memory stays fixed however many distinct tags
+# show up. The window also keeps the sum of its buckets' sketches (a bucket is
+# subtracted when it slides out), so a tag's count over the window is one sketch
+# lookup; the ranking is taken over the union of the buckets' top-K tags and kept
+# for TRENDING_REFRESH_SECONDS.
+# The windows are rebuilt from the last 24h of tweets in a background thread at
+# startup and kept current by the routes that create, edit and delete tweets;
+# until then, the endpoint counts in the database.
+
+TOP_K = env_int("TRENDING_TOP_K", 100)
+REFRESH_SECONDS = env_int("TRENDING_REFRESH_SECONDS", 5)
+
+# name: (window length, bucket length), in seconds
+WINDOWS = {"1h": (3600, 300), "24h": (86400, 3600)}
+
+
+def timestamp(at) -> float:
+    # Tweet times are UTC; SQLite hands them back without a timezone
+    if at is None:
+        return time.time()
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=ZoneInfo("UTC"))
+    return at.timestamp()
+
+
+class CountMinSketch:
+    # Overestimates a key's count by at most ~2/width of the total, with high probability
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width, self.depth = width, depth
+        self.rows = [array("q", bytes(8 * width)) for _ in range(depth)]
+
+    def _cells(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[4 * i:4 * i + 4], "little") % self.width for i in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        estimate = None
+        for row, cell in zip(self.rows, self._cells(key)):
+            row[cell] += count
+            estimate = row[cell] if estimate is None else min(estimate, row[cell])
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[cell] for row, cell in zip(self.rows, self._cells(key)))
+
+    def merge(self, other: "CountMinSketch", sign: int = 1):
+        for row, other_row in zip(self.rows, other.rows):
+            for i, value in enumerate(other_row):
+                if value:
+                    row[i] += sign * value
+
+
+class Bucket:
+    def __init__(self, k: int):
+        self.k = k
+        self.sketch = CountMinSketch()
+        # Heaviest tags seen in this bucket: tag -> estimate when last counted
+        self.top = {}
+
+    def add(self, key: str, count: int) -> int:
+        estimate = self.sketch.add(key, count)
+        if key in self.top or len(self.top) < self.k:
+            self.top[key] = estimate
+        else:
+            lightest = min(self.top, key=self.top.__getitem__)
+            if estimate > self.top[lightest]:
+                del self.top[lightest]
+                self.top[key] = estimate
+        return estimate
+
+
+class SlidingWindow:
+    def __init__(self, length: int, bucket_length: int, k: int = TOP_K):
+        self.length, self.bucket_length, self.k = length, bucket_length, k
+        self.buckets = {}
+        self.total = CountMinSketch()
+        self._ranking = None
+
+    def _expire(self, now: float):
+        oldest = int((now - self.length) // self.bucket_length) + 1
+        for index in [i for i in self.buckets if i < oldest]:
+            self.total.merge(self.buckets.pop(index).sketch, sign=-1)
+            self._ranking = None
+
+    def add(self, key: str, at: float, count: int = 1, now: float = None):
+        now = time.time() if now is None else now
+        self._expire(now)
+        if not now - self.length < at <= now + self.bucket_length:
+            return
+        index = int(at // self.bucket_length)
+        bucket = self.buckets.get(index)
+        if bucket is None:
+            bucket = self.buckets[index] = Bucket(self.k)
+        bucket.add(key, count)
+        self.total.add(key, count)
+
+    def top(self, n: int, now: float = None) -> list:
+        # [(tag, count)] for the n most used tags in the window, most used first
+        now = time.time() if now is None else now
+        self._expire(now)
+        if self._ranking is None or now - self._ranking[0] >= REFRESH_SECONDS:
+            candidates = set()
+            for bucket in self.buckets.values():
+                candidates.update(bucket.top)
+            counts = [(key, self.total.estimate(key)) for key in candidates]
+            ranked = sorted((c for c in counts if c[1] > 0), key=lambda c: (-c[1], c[0]))[:self.k]
+            self._ranking = (now, ranked)
+        return self._ranking[1][:n]
+
+
+class TrendingEngine:
+    def __init__(self, windows=WINDOWS, k: int = TOP_K):
+        self._settings = (windows, k)
+        self.ready = False
+        self._windows = self._fresh()
+        # Writes are numbered; during a load they are also kept, with their number,
+        # to be replayed onto the loaded windows (None when no load is running)
+        self._seq = 0
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def _fresh(self):
+        windows, k = self._settings
+        return {name: SlidingWindow(length, bucket, k) for name, (length, bucket) in windows.items()}
+
+    def snapshot(self) -> int:
+        # Call right before reading the uses to load: writes from now on are replayed onto them
+        with self._lock:
+            if self._pending is None:
+                self._pending = []
+            return self._seq
+
+    def record(self, tags, at=None, count: int = 1):
+        # count -1 takes back uses (a tag removed by an edit, a deleted tweet)
+        seconds, tags = timestamp(at), list(tags)
+        with self._lock:
+            self._seq += 1
+            if self._pending is not None:
+                self._pending.append((self._seq, tags, seconds, count))
+            self._add(self._windows, tags, seconds, count)
+
+    @staticmethod
+    def _add(windows, tags, seconds: float, count: int):
+        for window in windows.values():
+            for tag in tags:
+                window.add(tag, seconds, count)
+
+    def load(self, uses, since: int = None):
+        # uses: (tag, created_at) for every hashtag use of the last day; replaces all counts.
+        # since: snapshot() taken before uses were read; by default, when load starts (the
+        # query behind a lazy `uses` runs after that). Only later writes are replayed, so
+        # the ones the query already saw are not counted twice.
+        since = self.snapshot() if since is None else since
+        try:
+            windows = self._fresh()
+            now = time.time()
+            for tag, at in uses:
+                seconds = timestamp(at)
+                for window in windows.values():
+                    window.add(tag, seconds, now=now)
+            with self._lock:
+                for seq, tags, seconds, count in self._pending:
+                    if seq > since:
+                        self._add(windows, tags, seconds, count)
+                self._windows = windows
+                self.ready = True
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def top(self, window: str, n: int) -> list:
+        with self._lock:
+            return self._windows[window].top(n)
+
+    def clear(self):
+        with self._lock:
+            self.ready = False
+            self._windows = self._fresh()
+
+
+trending = TrendingEngine()
+
+
+def window_start(window: str) -> datetime:
+    return datetime.now(ZoneInfo("UTC")) - timedelta(seconds=WINDOWS[window][0])
+
+
+def recent_uses(db, since: datetime):
+    return (
+        db.query(Hashtag.tag, Tweet.created_at)
+        .join(tweet_hashtag_table, tweet_hashtag_table.c.hashtag_id == Hashtag.id)
+        .join(Tweet, Tweet.id == tweet_hashtag_table.c.tweet_id)
+        .filter(Tweet.created_at > since)
+        .yield_per(10_000)
+    )
+
+
+def count_in_db(db, window: str, n: int) -> list:
+    # The slow path, for before the engine has loaded
+    return (
+        db.query(Hashtag.tag, func.count().label("uses"))
+        .join(tweet_hashtag_table, tweet_hashtag_table.c.hashtag_id == Hashtag.id)
+        .join(Tweet, Tweet.id == tweet_hashtag_table.c.tweet_id)
+        .filter(Tweet.created_at > window_start(window))
+        .group_by(Hashtag.tag)
+        .order_by(func.count().desc(), Hashtag.tag)
+        .limit(n)
+        .all()
+    )
+
+
+def _build_in_background():
+    try:
+        with database.SessionLocal() as db:
+            trending.load(recent_uses(db, window_start("24h")))
+        print("[TRENDING] Loaded hashtag counts for the last 24h")
+    except Exception as e:
+        # Trending keeps counting in the database
+        print(f"[TRENDING] Could not load hashtag counts: {e}")
+
+
+def start_trending():
+    threading.Thread(target=_build_in_background, daemon=True).start()
@@ -0,0 +1,67 @@
+from backend.schemas.tweet import TweetRead
+from backend.cachingsystem.engine import Cache
+from backend.cachingsystem.invalidation import tweet_tag
+
+# Two-level tweet cache for the API process.
+# - entities: one TweetRead payload per tweet as finished JSON bytes, keyed "tweet:<id>".
+#   Bytes are immutable and need no ORM session or Pydantic validation on a hit.
+# - lists: one page per query/cursor, as an ordered tuple of ids plus the next cursor
+# A list response is built by multi-getting its ids from the entity level, so an
+# edit or like only evicts one entity and a tweet is stored once however many
+# lists it appears in.
+
+
+def entity_key(tweet_id: int) -> str:
+    return tweet_tag(tweet_id)
+
+
+def serialize_tweet(tweet) -> bytes:
+    # Must be called while the tweet's session is open so relationships can load
+    return TweetRead.model_validate(tweet, from_attributes=True).model_dump_json().encode("utf-8")
+
+
+def compose_list(payloads) -> bytes:
+    # JSON array of already serialized tweets, identical to serializing the list at once
+    return b"[" + b",".join(payloads) + b"]"
+
+
+class TweetCache:
+    def __init__(self, ttl: int = 60, max_tweets: int = 50_000, max_lists: int = 1024):
+        self.entities = Cache(expiration_time=ttl, max_entries=max_tweets)
+        self.lists = Cache(expiration_time=ttl, max_entries=max_lists)
+
+    @property
+    def generation(self) -> int:
+        # Moves on every invalidation; read it before a DB read and pass it to the store
+        return self.entities.generation + self.lists.generation
+
+    def get_page(self, list_key: str):
+        # Returns (ids, next_cursor) or None
+        return self.lists.get(list_key)
+
+    def set_page(self, list_key: str, ids, next_cursor: str = None, tags=(), generation: int = None):
+        # Skipped if an invalidation ran since `generation` was read: the ids may predate it
+        if generation is not None and generation != self.generation:
+            return
+        self.lists.set(list_key, (tuple(ids), next_cursor), tags=tags)
+
+    def get_tweets(self, ids):
+        # Returns ({id: payload} for cached tweets, [ids that must be loaded])
+        found = self.entities.get_many([entity_key(i) for i in ids])
+        payloads = {i: found[entity_key(i)] for i in ids if entity_key(i) in found}
+        missing = [i for i in ids if i not in payloads]
+        return payloads, missing
+
+    def put_tweets(self, payloads: dict, generation: int = None):
+        if generation is not None and generation != self.generation:
+            return
+        for tweet_id, payload in payloads.items():
+            key = entity_key(tweet_id)
+            self.entities.set(key, payload, tags=[key])
+
+    def invalidate(self, keys=(), tags=()):
+        return self.entities.invalidate(keys, tags) + self.lists.invalidate(keys, tags)
+
+    def clear(self):
+        self.entities.clear()
+        self.lists.clear()
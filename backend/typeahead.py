@@ -0,0 +1,185 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from sqlalchemy import func
+from backend import database
+from backend.models import Account, Tweet, Hashtag
+from backend.models.association_model import tweet_hashtag_table
+
+# In-process typeahead indexes for the search box.
+# Every searchable string is kept lower-cased in one sorted array of (key, item_id),
+# so all keys starting with a prefix sit in one contiguous slice found with two
+# bisects. Items are ranked by a usage count (tweets per hashtag / per account).
+# The indexes are loaded in a background thread at startup and kept current by the
+# routes that create tweets and accounts; until loaded, searches go to the database.
+
+# Upper bound for "every string starting with prefix"
+_PREFIX_END = "\U0010ffff"
+
+
+class PrefixIndex:
+    def __init__(self, cache_size: int = 4096):
+        self.ready = False
+        self._keys = []
+        self._labels = {}
+        self._item_keys = {}
+        self._counts = Counter()
+        # top() results by prefix, then k; a change only drops the prefixes of the changed item's keys
+        self._cache_size = cache_size
+        self._top = {}
+        # Writes are numbered; during a load they are also kept, with their number,
+        # to be replayed onto the loaded index (None when no load is running)
+        self._seq = 0
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> int:
+        # Call right before reading the rows to load: writes from now on are replayed onto them
+        with self._lock:
+            if self._pending is None:
+                self._pending = []
+            return self._seq
+
+    def load(self, entries, since: int = None):
+        # entries: (item_id, label, keys, count); replaces the whole index at once.
+        # since: snapshot() taken before entries were read; by default, when load starts.
+        since = self.snapshot() if since is None else since
+        try:
+            keys, labels, item_keys, counts = [], {}, {}, Counter()
+            for item_id, label, own_keys, count in entries:
+                labels[item_id] = label
+                counts[item_id] = count
+                item_keys[item_id] = {key.lower() for key in own_keys}
+                keys.extend((key, item_id) for key in item_keys[item_id])
+            keys.sort()
+            with self._lock:
+                self._keys, self._labels, self._item_keys, self._counts = keys, labels, item_keys, counts
+                self._top.clear()
+                for seq, write, args in self._pending:
+                    if seq > since:
+                        write(*args)
+                self.ready = True
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def _record(self, write, *args):
+        # Applies a write to the live index, keeping it for a running load
+        self._seq += 1
+        if self._pending is not None:
+            self._pending.append((self._seq, write, args))
+        write(*args)
+
+    def add(self, item_id, label, keys, count: int = 0):
+        with self._lock:
+            self._record(self._add, item_id, label, tuple(keys), count)
+
+    def _add(self, item_id, label, keys, count):
+        if item_id in self._labels:
+            return
+        self._labels[item_id] = label
+        self._counts[item_id] = count
+        self._item_keys[item_id] = {key.lower() for key in keys}
+        for key in self._item_keys[item_id]:
+            insort(self._keys, (key, item_id))
+        self._forget(item_id)
+
+    def bump(self, item_id, delta: int = 1):
+        with self._lock:
+            self._record(self._bump, item_id, delta)
+
+    def _bump(self, item_id, delta):
+        if item_id in self._labels:
+            self._counts[item_id] += delta
+            self._forget(item_id)
+
+    def _forget(self, item_id):
+        # Drop cached results for every prefix the item can appear under
+        for key in self._item_keys[item_id]:
+            for end in range(1, len(key) + 1):
+                self._top.pop(key[:end], None)
+
+    def clear(self):
+        with self._lock:
+            self.ready = False
+            self._keys, self._labels, self._item_keys, self._counts = [], {}, {}, Counter()
+            self._top.clear()
+
+    def __contains__(self, item_id):
+        return item_id in self._labels
+
+    def label(self, item_id):
+        return self._labels.get(item_id)
+
+    def top(self, prefix: str, k: int) -> list:
+        # Ids of the k most used items with a key starting with prefix; ties in key order
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            cached = self._top.get(prefix, {}).get(k)
+            if cached is not None:
+                return cached
+            lo = bisect_left(self._keys, (prefix,))
+            hi = bisect_left(self._keys, (prefix + _PREFIX_END,), lo)
+            # dict keeps the first (alphabetical) position of items matched by several keys
+            matches = dict.fromkeys(item_id for _, item_id in self._keys[lo:hi])
+            result = heapq.nlargest(k, matches, key=self._counts.__getitem__)
+            if len(self._top) >= self._cache_size:
+                self._top.clear()
+            self._top.setdefault(prefix, {})[k] = result
+            return result
+
+    def __len__(self):
+        return len(self._labels)
+
+
+hashtag_index = PrefixIndex()
+account_index = PrefixIndex()
+
+
+def hashtag_entries(db):
+    # Generators: the queries run inside load(), after its snapshot, so writes made meanwhile are kept
+    uses = dict(
+        db.query(tweet_hashtag_table.c.hashtag_id, func.count())
+        .group_by(tweet_hashtag_table.c.hashtag_id)
+        .all()
+    )
+    for hashtag_id, tag in db.query(Hashtag.id, Hashtag.tag):
+        yield hashtag_id, tag, (tag,), uses.get(hashtag_id, 0)
+
+
+def account_entries(db):
+    tweets = dict(db.query(Tweet.account_id, func.count()).group_by(Tweet.account_id).all())
+    for account_id, username, handle in db.query(Account.id, Account.username, Account.handle):
+        yield account_id, username, (username, handle), tweets.get(account_id, 0)
+
+
+def build_indexes(db):
+    hashtag_index.load(hashtag_entries(db))
+    account_index.load(account_entries(db))
+
+
+def _build_in_background():
+    try:
+        with database.SessionLocal() as db:
+            build_indexes(db)
+        print(f"[TYPEAHEAD] Indexed {len(hashtag_index)} hashtags and {len(account_index)} accounts")
+    except Exception as e:
+        # Searches keep using the database
+        print(f"[TYPEAHEAD] Could not build indexes: {e}")
+
+
+def start_typeahead():
+    threading.Thread(target=_build_in_background, daemon=True).start()
+
+
+def hashtags_changed(before=(), after=()):
+    # before/after: (id, tag) pairs a tweet carried before and after a write
+    before, after = set(before), set(after)
+    for hashtag_id, tag in after - before:
+        hashtag_index.add(hashtag_id, tag, (tag,))
+        hashtag_index.bump(hashtag_id)
+    for hashtag_id, _ in before - after:
+        hashtag_index.bump(hashtag_id, -1)